@@ -2,6 +2,11 @@ from flask import Flask
 from datetime import timedelta
 from app.config.settings import SECRET_KEY
 from app.core.ai_clients.openai_client import OpenAIClient
+from app.core.config import init_unit_of_work
+from app.core.query_stats import init_query_stats
+from app.core.slow_query import init_slow_query_log
+from app.core.auth.session_purge import init_session_purge
+from app.core.migrate import init_migrations
 
 def create_app(config=None):
     app = Flask(__name__, 
@@ -16,9 +21,25 @@ def create_app(config=None):
     app.permanent_session_lifetime = timedelta(days=30)
     app.secret_key = SECRET_KEY
 
+    # Statements slower than SLOW_QUERY_THRESHOLD_MS go to their own log
+    init_slow_query_log(app)
+
+    # Bring the schema up to date before anything reads from it
+    init_migrations(app)
+
     # Initialize AI client (now loads key from DB)
     app.ai_client = OpenAIClient(banned_keywords=[])
     
+    # Count each request's statements, DB time and connections (registered
+    # first so its after_request hook runs last and sees all of them)
+    init_query_stats(app)
+
+    # Run each request's database work in a single connection and transaction
+    init_unit_of_work(app)
+
+    # Purge expired sessions (CLI command; run it with --every in one process per deployment)
+    init_session_purge(app)
+
     # Register routes
     from app.api import routes
     app.register_blueprint(routes.bp)
@@ -1,18 +1,46 @@
-from flask import Blueprint, render_template, request, jsonify, current_app, redirect, url_for, session
+from flask import Blueprint, render_template, request, jsonify, current_app, redirect, url_for, session, g, Response, stream_with_context
+import json
 import logging
-from app.core.auth.decorators import authorize_any, authorize
+from datetime import datetime
+from app.core.auth.decorators import authorize_any, authorize, get_current_user
 from app.core.auth.auth import auth_service
+from app.core.auth.passwords import PasswordHasherBusy
 from app.core.model.user import User
 from app.core.settings.settings import Settings
-import bcrypt
 from app.core.model.api_key import ApiKey
 from app.core.model.banned_word import BannedWord
 from app.core.model.conversation import Conversation
 from app.core.model.message import Message
+from app.core.config import call_after_commit, begin_unit_of_work, commit_unit_of_work, rollback_unit_of_work
+from app.core.ai_clients.summarizer import summarizer, placeholder_summary
+from app.core import idempotency
 
 # Create blueprint
 bp = Blueprint('main', __name__)
 
+# Page sizes for keyset-paginated listings
+CONVERSATIONS_PAGE_SIZE = 30
+MESSAGES_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def _page_args(default_limit):
+    """Parse the ?before_id=&limit= keyset pagination arguments."""
+    before_id = request.args.get('before_id', type=int)
+    limit = request.args.get('limit', default_limit, type=int)
+    return before_id, max(1, min(limit, MAX_PAGE_SIZE))
+
+def _conversation_cursor(conv) -> str:
+    """Sidebar keyset cursor: the (last_message_at, id) the next page seeks from."""
+    last_message_at = conv.last_message_at
+    if isinstance(last_message_at, datetime):
+        last_message_at = last_message_at.isoformat()
+    return f"{last_message_at}_{conv.id}"
+
+def _parse_conversation_cursor(value):
+    """Inverse of _conversation_cursor; raises ValueError for anything else."""
+    last_message_at, _, conv_id = value.rpartition('_')
+    return datetime.fromisoformat(last_message_at), int(conv_id)
+
 @bp.route("/")
 def index():
     # Redirect to setup if no users exist
@@ -22,7 +50,7 @@ def index():
     if 'user_id' not in session:
         return redirect(url_for('main.show_login'))
     
-    user = User.get_by_id(session['user_id'])
+    user = get_current_user()
     if not user:
         session.clear()
         return redirect(url_for('main.show_login'))
@@ -86,51 +114,202 @@ def show_login():
         return redirect(url_for('main.index'))
     return render_template("login.html")
 
-@authorize_any()
-@bp.route("/chat", methods=["POST"])
-def chat():
-    if 'user_id' not in session:
-        return jsonify({"error": "Not authenticated"}), 401
+def _begin_chat_turn(user_id):
+    """
+    Shared first half of /chat and /chat/stream: validate the request, create or
+    load the conversation, queue a summary for a first message and save the user's message.
+    Returns (error_response, None) or (None, (msg, persona_id, conversation_id)).
+    """
     data = request.json
     msg = data.get("message", "").strip()
     persona_id = data.get("persona_id")
     conversation_id = data.get("conversation_id")
-    user_id = session['user_id']
     if not persona_id:
-        return jsonify({"error": "Missing persona selection"}), 400
+        return (jsonify({"error": "Missing persona selection"}), 400), None
     # Conversation logic
     if not conversation_id:
         conv = Conversation(id=None, user_id=user_id)
         conv.save()
         conversation_id = conv.id
-        # Save summary for new conversation
-        if msg:
-            summary = current_app.ai_client.summarize_text(msg)
-            conv.summary = summary
-            conv.save()
+        first_message = True
     else:
         conv = Conversation.get_by_id(conversation_id)
         if not conv or conv.user_id != user_id:
-            return jsonify({"error": "Invalid conversation"}), 400
-        # If this is the first user message, save summary
-        messages = Message.get_by_conversation_id(conversation_id)
-        user_msgs = [m for m in messages if m.sender == 'user']
-        if len(user_msgs) == 0 and msg:
-            summary = current_app.ai_client.summarize_text(msg)
-            conv.summary = summary
-            conv.save()
+            return (jsonify({"error": "Invalid conversation"}), 400), None
+        first_message = conv.first_user_message_id is None
     # Save user message
     user_msg = Message(id=None, conversation_id=conversation_id, sender='user', content=msg)
     user_msg.save()
-    # Get bot response
-    response = current_app.ai_client.get_chat_response(msg, int(user_id), int(persona_id), int(conversation_id) if conversation_id else None)
-    # Save bot message
-    bot_msg = Message(id=None, conversation_id=conversation_id, sender='assistant', content=response)
-    bot_msg.save()
-    user = User.get_by_id(user_id)
-    username = user.get_username() if user else 'unknown'
-    logging.info(f"{username} - persona:{persona_id}: {msg} => {response}")
-    return jsonify({"response": response, "conversation_id": conversation_id})
+    # Summarize the first message in the background once the conversation is committed
+    if first_message and msg:
+        _queue_summary(conversation_id, msg)
+    return None, (msg, persona_id, conversation_id)
+
+def _queue_summary(conversation_id, text):
+    ai_client = current_app.ai_client
+    call_after_commit(lambda: summarizer.submit(ai_client, conversation_id, text))
+
+def _release_idempotency_key(user_id, key):
+    """
+    Give up key after a turn that kept nothing. The request's unit of work is
+    rolled back first, so the release's own connection is never checked out
+    while the unit still holds one.
+    """
+    rollback_unit_of_work()
+    idempotency.release(user_id, key)
+
+def _claim_idempotency_key(user_id, replay):
+    """
+    Honour an Idempotency-Key header on a chat turn. Returns (key, None) to
+    run the turn (key is None when the header is absent), or (None, response)
+    for a repeat: replay(stored_body) once the first attempt has finished,
+    or an error if it is still running or the key was used for another request.
+    """
+    key = request.headers.get("Idempotency-Key")
+    if not key:
+        return None, None
+    if len(key) > idempotency.MAX_KEY_LENGTH:
+        return None, (jsonify({"error": "Idempotency-Key is too long"}), 400)
+    fingerprint = idempotency.request_fingerprint(request.path, request.get_data())
+    # The claim commits on its own connection; end the request's unit of work
+    # first so the request never holds two pooled connections at once
+    if not commit_unit_of_work():
+        return None, (jsonify({"error": "Failed to save changes"}), 500)
+    outcome, body = idempotency.claim(user_id, key, fingerprint)
+    begin_unit_of_work()
+    if outcome == idempotency.CLAIMED:
+        return key, None
+    if outcome == idempotency.DONE:
+        response = replay(body)
+        response.headers["Idempotent-Replayed"] = "true"
+        return None, response
+    if outcome == idempotency.MISMATCH:
+        return None, (jsonify({"error": "Idempotency-Key was already used for a different message"}), 422)
+    if outcome == idempotency.IN_PROGRESS:
+        return None, (jsonify({"error": "This message is still being answered"}), 409, {"Retry-After": "1"})
+    # The key store is unavailable; answering beats refusing
+    logging.warning("Idempotency key store unavailable, running chat turn unprotected")
+    return None, None
+
+@bp.route("/chat", methods=["POST"])
+@authorize_any()
+def chat():
+    if 'user_id' not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    user_id = session['user_id']
+    key, replayed = _claim_idempotency_key(user_id, jsonify)
+    if replayed:
+        return replayed
+    try:
+        error, turn = _begin_chat_turn(user_id)
+        if error:
+            if key:
+                _release_idempotency_key(user_id, key)
+            return error
+        msg, persona_id, conversation_id = turn
+        # Commit the user's message before the model call, which can take many
+        # seconds, so no transaction, row lock or pooled connection is held during it
+        if not commit_unit_of_work():
+            if key:
+                _release_idempotency_key(user_id, key)
+            return jsonify({"error": "Failed to save changes"}), 500
+        # Get bot response
+        response = current_app.ai_client.get_chat_response(msg, int(user_id), int(persona_id), int(conversation_id) if conversation_id else None)
+        # Save bot message in a second, short unit of work
+        begin_unit_of_work()
+        bot_msg = Message(id=None, conversation_id=conversation_id, sender='assistant', content=response)
+        bot_msg.save()
+    except Exception:
+        if key:
+            _release_idempotency_key(user_id, key)
+        raise
+    logging.info(f"{g.current_user.get_username()} - persona:{persona_id}: {msg} => {response}")
+    body = {"response": response, "conversation_id": conversation_id}
+    if key:
+        # Committed together with the reply by the unit of work
+        idempotency.complete(user_id, key, body)
+    # Commit here rather than after the request, so that if it fails the key
+    # is released instead of answering every retry 409 until it times out
+    if not commit_unit_of_work():
+        if key:
+            _release_idempotency_key(user_id, key)
+        return jsonify({"error": "Failed to save changes"}), 500
+    return jsonify(body)
+
+def _sse(event: dict) -> str:
+    return f"data: {json.dumps(event)}\n\n"
+
+def _replay_stream(body: dict) -> Response:
+    """A finished /chat/stream turn, sent again as a single "replace" event."""
+    events = [
+        {"type": "start", "conversation_id": body["conversation_id"]},
+        {"type": "replace", "content": body["response"]},
+        {"type": "done", "conversation_id": body["conversation_id"], "message_id": body.get("message_id")},
+    ]
+    return Response("".join(_sse(event) for event in events), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache"})
+
+@bp.route("/chat/stream", methods=["POST"])
+@authorize_any()
+def chat_stream():
+    """
+    Streaming variant of /chat. Replies are sent as Server-Sent Events:
+    "start" with the conversation id, then "delta"/"replace" events as tokens
+    arrive, then "done" once the assistant message has been saved.
+    """
+    user_id = session['user_id']
+    key, replayed = _claim_idempotency_key(user_id, _replay_stream)
+    if replayed:
+        return replayed
+    try:
+        error, turn = _begin_chat_turn(user_id)
+    except Exception:
+        if key:
+            _release_idempotency_key(user_id, key)
+        raise
+    if error:
+        if key:
+            _release_idempotency_key(user_id, key)
+        return error
+    msg, persona_id, conversation_id = turn
+    username = g.current_user.get_username()
+    ai_client = current_app.ai_client
+
+    def generate():
+        # Runs after the request's unit of work has committed the user's
+        # message, so the history read below already includes it
+        yield _sse({"type": "start", "conversation_id": conversation_id})
+        parts = []
+        message_id = None
+        try:
+            for event in ai_client.stream_chat_response(msg, int(user_id), int(persona_id), int(conversation_id)):
+                if event["type"] == "replace":
+                    parts = [event["content"]]
+                else:
+                    parts.append(event["content"])
+                yield _sse(event)
+        finally:
+            # Persist whatever the child saw, even if they navigated away mid-stream
+            response = "".join(parts)
+            if response:
+                bot_msg = Message(id=None, conversation_id=conversation_id, sender='assistant', content=response)
+                bot_msg.save()
+                message_id = bot_msg.id
+                logging.info(f"{username} - persona:{persona_id}: {msg} => {response}")
+            if key:
+                # A retry replays what was saved rather than asking the model again
+                if response:
+                    idempotency.complete(user_id, key, {"response": response, "conversation_id": conversation_id,
+                                                        "message_id": message_id})
+                else:
+                    idempotency.release(user_id, key)
+        yield _sse({"type": "done", "conversation_id": conversation_id, "message_id": message_id})
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        # Keep reverse proxies from buffering the stream
+        "X-Accel-Buffering": "no",
+    })
 
 @bp.route("/auth/login", methods=["POST"])
 def login():
@@ -143,7 +322,7 @@ def login():
     password = data.get("password")
     remember = data.get("remember", False)
     
-    success, message = auth_service.authenticate(username, password, remember)
+    success, message = auth_service.authenticate(username, password, remember, ip=request.remote_addr)
     
     if success:
         return jsonify({"message": message})
@@ -183,12 +362,17 @@ def admin():
             if not all([username, text_name, password, role]):
                 error = "All user fields are required."
             else:
-                password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
-                user = User(id=None, username=username, password_hash=password_hash, text_name=text_name, role=role)
-                if user.save():
-                    message = f"User '{username}' created successfully."
-                else:
-                    error = f"Failed to create user '{username}'."
+                try:
+                    password_hash = auth_service.hash_password(password)
+                except PasswordHasherBusy:
+                    password_hash = None
+                    error = "The server is busy, please try again."
+                if password_hash:
+                    user = User(id=None, username=username, password_hash=password_hash, text_name=text_name, role=role)
+                    if user.save():
+                        message = f"User '{username}' created successfully."
+                    else:
+                        error = f"Failed to create user '{username}'."
         elif action == "set_instructions":
             instructions = request.form.get("system_instructions", "")
             settings.set_global_system_instructions(instructions)
@@ -208,12 +392,12 @@ def admin():
             else:
                 error = "Please enter a new OpenAI API key."
     current_instructions = settings.get_global_system_instructions()
-    return render_template("admin.html", user=User.get_by_id(session['user_id']), message=message, error=error, system_instructions=current_instructions, censored_openai_key=censored_openai_key)
+    return render_template("admin.html", user=g.current_user, message=message, error=error, system_instructions=current_instructions, censored_openai_key=censored_openai_key)
 
 @bp.route("/settings", methods=["GET", "POST"])
 @authorize_any()
 def settings_page():
-    user = User.get_by_id(session['user_id'])
+    user = g.current_user
     if user.role not in ('admin-parent', 'user-parent'):
         return redirect(url_for('main.index'))
     settings = Settings()
@@ -268,18 +452,20 @@ def settings_page():
             old_password = request.form.get("old_password")
             new_password = request.form.get("new_password") 
             new_password_confirm = request.form.get("new_password_confirm")
-            if new_password != new_password_confirm:
-                error = "Change Password Failed: New passwords do not match."
-                logging.info("Change password failed, new passwords do not match")
-            elif not bcrypt.checkpw(old_password.encode(), user.password_hash.encode()):
-                error = "Change Password Failed: Old password is incorrect."
-                logging.info("Change password failed, old password is incorrect")
-            else:
-                password_hash = bcrypt.hashpw(new_password.encode(), bcrypt.gensalt()).decode()
-                user.password_hash = password_hash
-                user.save()
-                message = "Password changed successfully."
-                logging.info(f"Password changed for user: {user.username}")
+            try:
+                if new_password != new_password_confirm:
+                    error = "Change Password Failed: New passwords do not match."
+                    logging.info("Change password failed, new passwords do not match")
+                elif not auth_service.verify_password(old_password, user.password_hash):
+                    error = "Change Password Failed: Old password is incorrect."
+                    logging.info("Change password failed, old password is incorrect")
+                else:
+                    user.password_hash = auth_service.hash_password(new_password)
+                    user.save()
+                    message = "Password changed successfully."
+                    logging.info(f"Password changed for user: {user.username}")
+            except PasswordHasherBusy:
+                error = "Change Password Failed: The server is busy, please try again."
     # Load data for rendering
     system_instructions = settings.get_child_instructions(user.id)
     personas = settings.get_personas(None)  # global personas
@@ -302,39 +488,46 @@ def get_conversations():
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     user_id = session['user_id']
-    # Get all conversations, sorted by started_at DESC (most recent first)
-    conversations = Conversation.get_by_user_id(user_id)
-    # Identify the latest conversation (most recent by started_at)
-    latest_conv_id = conversations[0].id if conversations else None
+    _, limit = _page_args(CONVERSATIONS_PAGE_SIZE)
+    before = request.args.get('before')
+    if before is not None:
+        try:
+            before = _parse_conversation_cursor(before)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+    # Get one page of conversations, sorted by last_message_at DESC (most recently active first).
+    # One extra row tells us whether another page follows.
+    conversations = Conversation.get_recent_by_user_id(user_id, before=before, limit=limit + 1)
+    has_more = len(conversations) > limit
+    conversations = conversations[:limit]
+    next_before = _conversation_cursor(conversations[-1]) if has_more else None
+    # Identify the latest conversation (most recently active); only the first page has it
+    latest_conv_id = conversations[0].id if conversations and before is None else None
     # Delete all empty conversations except the latest one
-    for conv in conversations:
-        if conv.id == latest_conv_id:
-            continue
-        messages = Message.get_by_conversation_id(conv.id)
-        if not messages:
-            conv.delete()
-    # Reload conversations after deletion
-    conversations = Conversation.get_by_user_id(user_id)
+    empty_ids = {conv.id for conv in conversations if conv.id != latest_conv_id and not conv.message_count}
+    if empty_ids and Conversation.delete_empty_by_ids(list(empty_ids), user_id):
+        conversations = [conv for conv in conversations if conv.id not in empty_ids]
+    # Look up the first user message of every conversation still missing a summary in one query
+    first_user_msgs = Message.get_first_user_messages([conv.id for conv in conversations if not conv.summary])
     summaries = []
     for conv in conversations:
         summary = conv.summary
+        pending = False
         if not summary:
-            # Only fetch messages and generate summary if missing
-            messages = Message.get_by_conversation_id(conv.id)
-            first_user_msg = next((m.content for m in messages if m.sender == 'user'), '')
+            # Show a placeholder now and let the background summarizer fill it in
+            first_user_msg = first_user_msgs.get(conv.id, '')
+            summary = placeholder_summary(first_user_msg)
             if first_user_msg:
-                summary = current_app.ai_client.summarize_text(first_user_msg)
-            else:
-                summary = 'New Conversation'
-            # Save summary to conversation
-            conv.summary = summary
-            conv.save()
+                _queue_summary(conv.id, first_user_msg)
+                pending = True
         summaries.append({
             'id': conv.id,
             'started_at': conv.started_at,
-            'snippet': summary
+            'last_message_at': conv.last_message_at,
+            'snippet': summary,
+            'summary_pending': pending
         })
-    return jsonify({'conversations': summaries})
+    return jsonify({'conversations': summaries, 'has_more': has_more, 'next_before': next_before})
 
 @bp.route('/conversations/<int:conversation_id>', methods=['GET'])
 @authorize_any()
@@ -344,10 +537,18 @@ def get_conversation_messages(conversation_id):
     conv = Conversation.get_by_id(conversation_id)
     if not conv or conv.user_id != session['user_id']:
         return jsonify({'error': 'Not found'}), 404
-    messages = Message.get_by_conversation_id(conversation_id)
-    return jsonify({'messages': [
-        {'id': m.id, 'sender': m.sender, 'content': m.content, 'created_at': m.created_at} for m in messages
-    ]})
+    before_id, limit = _page_args(MESSAGES_PAGE_SIZE)
+    # Newest page of messages older than before_id, plus one to detect an older page
+    messages = Message.get_by_conversation_id(conversation_id, before_id=before_id, limit=limit + 1, read_only=True)
+    has_more = len(messages) > limit
+    messages = messages[-limit:]
+    return jsonify({
+        'messages': [
+            {'id': m.id, 'sender': m.sender, 'content': m.content, 'created_at': m.created_at} for m in messages
+        ],
+        'has_more': has_more,
+        'next_before_id': messages[0].id if has_more else None
+    })
 
 @bp.route('/conversations', methods=['POST'])
 @authorize_any()
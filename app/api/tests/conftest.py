@@ -0,0 +1,116 @@
+"""Shared fixtures for the route tests: a Flask app wired like create_app() over a fake MySQL."""
+import itertools
+import pytest
+from unittest.mock import MagicMock
+from flask import Flask
+from mysql.connector import Error
+from app.api import routes
+from app.config.settings import SECRET_KEY
+from app.core import config
+from app.core.ai_clients.openai_client import OpenAIClient
+from app.core.ai_clients.prompts import prompt_cache
+from app.core.auth.auth import auth_service
+from app.core.filters.banned_words import matcher_cache
+from app.core.model.user import user_cache
+from app.core.query_stats import init_query_stats
+from app.core.settings.cache import settings_cache
+from app.core.settings.settings import Settings
+
+
+class FakeCursor:
+    """Answers SELECTs from the FakeDatabase's canned rows."""
+
+    def __init__(self, db):
+        self._db = db
+        self._rows = []
+        self.rowcount = 0
+        self.lastrowid = None
+
+    def execute(self, sql, params=()):
+        if self._db.fails(sql):
+            raise Error("injected failure")
+        self._rows = self._db.answer(sql)
+        self.rowcount = max(len(self._rows), 1)
+        if sql.lstrip().upper().startswith("INSERT"):
+            self.lastrowid = next(self._db.ids)
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    """
+    Stand-in for mysql.connector.connect(): rows are picked by SQL substring.
+    Set fails to a predicate on the SQL to make matching statements raise.
+    """
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.ids = itertools.count(100)
+        self.fails = lambda sql: False
+
+    def answer(self, sql):
+        for fragment, rows in self.answers:
+            if fragment in sql:
+                return rows
+        return []
+
+    def connect(self, **kwargs):
+        raw = MagicMock()
+        raw.in_transaction = False
+        raw.is_connected.return_value = True
+        raw.cursor.side_effect = lambda *args, **kw: FakeCursor(self)
+        return raw
+
+
+CHILD = (1, "kid", "Kid", "hash", "child", 0, None)
+CONVERSATION = (5, 1, None, "Dinosaurs", 2, None, 10, None, None)
+HISTORY = [(10, 5, "user", "Tell me about dinosaurs", None),
+           (11, 5, "assistant", "They were big!", None)]
+
+
+@pytest.fixture
+def fake_db():
+    return FakeDatabase([
+        ("FROM global_settings", [("1",)]),
+        ("FROM sessions", [(1, 3600)]),
+        ("FROM users u", [CHILD]),
+        ("FROM conversations", [CONVERSATION]),
+        ("FROM messages", HISTORY),
+        ("FROM personas", [(1, "Helper", "Be helpful.", None)]),
+        ("FROM user_model_settings", [("",)]),
+    ])
+
+
+@pytest.fixture
+def chat_client(monkeypatch, fake_db):
+    monkeypatch.setattr(config.mysql.connector, "connect", fake_db.connect)
+    monkeypatch.setattr(config, "_pool", config.ConnectionPool(size=2))
+    for cache in (prompt_cache, matcher_cache, settings_cache, user_cache, auth_service.session_cache):
+        cache.clear()
+
+    app = Flask(__name__)
+    app.secret_key = SECRET_KEY
+    init_query_stats(app)
+    config.init_unit_of_work(app)
+    app.register_blueprint(routes.bp)
+    ai_client = OpenAIClient.__new__(OpenAIClient)
+    ai_client.settings = Settings()
+    ai_client.api_key_missing = False
+    ai_client.client = MagicMock()
+    ai_client.client.chat.completions.create.return_value.choices = [
+        MagicMock(message=MagicMock(content="Roar!"))
+    ]
+    app.ai_client = ai_client
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = 1
+        sess["session_token"] = "token"
+    return client
@@ -0,0 +1,108 @@
+import itertools
+import json
+from unittest.mock import patch
+from app.core import config, idempotency
+
+CHAT = {"message": "What did they eat?", "persona_id": 1, "conversation_id": 5}
+
+
+def post(client, path="/chat", key="key-1", body=CHAT):
+    headers = {"Idempotency-Key": key} if key else {}
+    return client.post(path, json=body, headers=headers)
+
+def sse_events(resp):
+    return [json.loads(chunk[len("data: "):]) for chunk in resp.get_data(as_text=True).split("\n\n") if chunk]
+
+@patch('app.api.routes.idempotency.claim')
+def test_chat_without_key_is_not_tracked(mock_claim, chat_client):
+    resp = post(chat_client, key=None)
+    assert resp.status_code == 200
+    mock_claim.assert_not_called()
+
+@patch('app.api.routes.idempotency.complete')
+@patch('app.api.routes.idempotency.claim', return_value=(idempotency.CLAIMED, None))
+def test_chat_stores_reply_for_claimed_key(mock_claim, mock_complete, chat_client):
+    resp = post(chat_client)
+    assert resp.status_code == 200
+    user_id, key, fingerprint = mock_claim.call_args[0]
+    assert (user_id, key) == (1, "key-1")
+    assert len(fingerprint) == 64
+    mock_complete.assert_called_once_with(1, "key-1", {"response": "Roar!", "conversation_id": 5})
+
+@patch('app.api.routes.idempotency.claim', return_value=(idempotency.DONE, {"response": "Roar!", "conversation_id": 5}))
+def test_chat_replays_finished_key_without_calling_model(mock_claim, chat_client):
+    resp = post(chat_client)
+    assert resp.status_code == 200
+    assert resp.get_json() == {"response": "Roar!", "conversation_id": 5}
+    assert resp.headers["Idempotent-Replayed"] == "true"
+    chat_client.application.ai_client.client.chat.completions.create.assert_not_called()
+
+@patch('app.api.routes.idempotency.claim', return_value=(idempotency.IN_PROGRESS, None))
+def test_chat_key_still_running_returns_409(mock_claim, chat_client):
+    resp = post(chat_client)
+    assert resp.status_code == 409
+    assert resp.headers["Retry-After"] == "1"
+    chat_client.application.ai_client.client.chat.completions.create.assert_not_called()
+
+@patch('app.api.routes.idempotency.claim', return_value=(idempotency.MISMATCH, None))
+def test_chat_key_reused_for_other_message_returns_422(mock_claim, chat_client):
+    assert post(chat_client).status_code == 422
+
+@patch('app.api.routes.idempotency.claim', return_value=(idempotency.UNAVAILABLE, None))
+def test_chat_runs_when_key_store_unavailable(mock_claim, chat_client):
+    resp = post(chat_client)
+    assert resp.status_code == 200
+    assert resp.get_json()["response"] == "Roar!"
+
+@patch('app.api.routes.idempotency.complete')
+def test_chat_claims_key_without_a_second_connection(mock_complete, monkeypatch, chat_client):
+    # On a one-connection pool a nested checkout would time out and the turn
+    # would run unprotected, never storing its reply
+    monkeypatch.setattr(config, "_pool", config.ConnectionPool(size=1, timeout=0.1))
+    assert post(chat_client).status_code == 200
+    mock_complete.assert_called_once()
+
+def test_chat_rejects_overlong_key(chat_client):
+    assert post(chat_client, key="k" * 256).status_code == 400
+
+@patch('app.api.routes.idempotency.release')
+@patch('app.api.routes.idempotency.claim', return_value=(idempotency.CLAIMED, None))
+def test_chat_releases_key_when_turn_is_rejected(mock_claim, mock_release, chat_client):
+    resp = post(chat_client, body={"message": "hi", "conversation_id": 5})
+    assert resp.status_code == 400
+    mock_release.assert_called_once_with(1, "key-1")
+
+@patch('app.api.routes.idempotency.release')
+@patch('app.api.routes.idempotency.claim', return_value=(idempotency.CLAIMED, None))
+def test_chat_releases_key_when_reply_cannot_be_saved(mock_claim, mock_release, chat_client, fake_db):
+    inserts = itertools.count(1)
+    # The user's message saves; the assistant's reply does not
+    fake_db.fails = lambda sql: "INSERT INTO messages" in sql and next(inserts) == 2
+    resp = post(chat_client)
+    assert resp.status_code == 500
+    assert resp.get_json() == {"error": "Failed to save changes"}
+    mock_release.assert_called_once_with(1, "key-1")
+
+@patch('app.api.routes.idempotency.claim', return_value=(idempotency.DONE, {"response": "Roar!", "conversation_id": 5,
+                                                                         "message_id": 12}))
+def test_stream_replays_finished_key_as_events(mock_claim, chat_client):
+    resp = post(chat_client, path="/chat/stream")
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/event-stream"
+    assert sse_events(resp) == [
+        {"type": "start", "conversation_id": 5},
+        {"type": "replace", "content": "Roar!"},
+        {"type": "done", "conversation_id": 5, "message_id": 12},
+    ]
+
+@patch('app.api.routes.idempotency.complete')
+@patch('app.api.routes.idempotency.claim', return_value=(idempotency.CLAIMED, None))
+def test_stream_stores_reply_once_streamed(mock_claim, mock_complete, chat_client):
+    ai_client = chat_client.application.ai_client
+    with patch.object(ai_client, 'stream_chat_response',
+                      return_value=iter([{"type": "delta", "content": "Ro"}, {"type": "delta", "content": "ar!"}])):
+        resp = post(chat_client, path="/chat/stream")
+        events = sse_events(resp)
+    assert events[-1]["type"] == "done"
+    mock_complete.assert_called_once_with(1, "key-1", {"response": "Roar!", "conversation_id": 5,
+                                                       "message_id": events[-1]["message_id"]})
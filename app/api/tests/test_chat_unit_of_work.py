@@ -0,0 +1,13 @@
+import itertools
+
+
+def post_chat(client):
+    return client.post("/chat", json={"message": "What did they eat?", "persona_id": 1, "conversation_id": 5})
+
+def test_chat_fails_when_reply_cannot_be_saved(chat_client, fake_db):
+    inserts = itertools.count(1)
+    # The user's message saves; the assistant's reply does not
+    fake_db.fails = lambda sql: "INSERT INTO messages" in sql and next(inserts) == 2
+    resp = post_chat(chat_client)
+    assert resp.status_code == 500
+    assert resp.get_json() == {"error": "Failed to save changes"}
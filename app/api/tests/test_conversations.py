@@ -0,0 +1,18 @@
+from datetime import datetime
+
+NEWER = (8, 1, None, "Volcanoes", 3, datetime(2026, 10, 17, 9, 45), 20, None, None)
+OLDER = (7, 1, None, "Dinosaurs", 2, datetime(2026, 10, 17, 9, 30), 10, None, None)
+
+
+def test_conversations_cursor_carries_sort_values(chat_client, fake_db):
+    fake_db.answers.insert(0, ("FROM conversations c", [NEWER, OLDER]))
+    resp = chat_client.get("/conversations?limit=1")
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert [c["id"] for c in data["conversations"]] == [8]
+    assert data["has_more"] is True
+    assert data["next_before"] == "2026-10-17T09:45:00_8"
+    assert chat_client.get("/conversations", query_string={"before": data["next_before"]}).status_code == 200
+
+def test_conversations_rejects_malformed_cursor(chat_client):
+    assert chat_client.get("/conversations?before=7").status_code == 400
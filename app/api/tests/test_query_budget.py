@@ -0,0 +1,27 @@
+"""
+Query budgets for the hot routes. Each test runs a route against a fake
+MySQL connection (see conftest.py) and fails, listing every statement, when
+the route starts issuing more queries than its budget (typically a new N+1 loop).
+"""
+from app.core.query_stats import query_budget
+
+# Statements per warm request (caches filled by an earlier request):
+# conversation lookup, user message INSERT + conversations UPDATE, settings
+# version, conversation + history for the prompt, reply INSERT + UPDATE
+CHAT_BUDGET = 8
+# Pool checkouts: the unit that saves the user's message, one short checkout
+# per prompt read while no unit is open, and the unit that saves the reply
+CHAT_CONNECTIONS = 5
+
+
+def post_chat(client):
+    return client.post("/chat", json={"message": "What did they eat?", "persona_id": 1, "conversation_id": 5})
+
+def test_chat_query_budget(chat_client):
+    # The first request fills the per-worker caches, as any real worker would have
+    assert post_chat(chat_client).status_code == 200
+    with query_budget(CHAT_BUDGET, max_connections=CHAT_CONNECTIONS):
+        resp = post_chat(chat_client)
+    assert resp.status_code == 200
+    assert resp.get_json()["response"] == "Roar!"
+    assert f'queries, {CHAT_CONNECTIONS} connections' in resp.headers["Server-Timing"]
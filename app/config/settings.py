@@ -7,4 +7,91 @@ import os
 SECRET_KEY = os.getenv("FLASK_SECRET_KEY", "your-secret-key-here-please-change-in-production")
 
 # OpenAI API configuration
-# OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "your-api-key-here") 
\ No newline at end of file
+# OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "your-api-key-here") 
+
+# Banned-word matching
+# BANNED_WORDS_NFKC: fold Unicode look-alikes (full-width letters, ligatures) before matching
+# BANNED_WORDS_LEET: fold leet-speak substitutions (b4d -> bad) before matching
+# BANNED_WORDS_WHOLE_WORDS: only match whole words instead of any substring
+BANNED_WORDS_NFKC = os.getenv("BANNED_WORDS_NFKC", "false").lower() == "true"
+BANNED_WORDS_LEET = os.getenv("BANNED_WORDS_LEET", "false").lower() == "true"
+BANNED_WORDS_WHOLE_WORDS = os.getenv("BANNED_WORDS_WHOLE_WORDS", "false").lower() == "true"
+
+# Background conversation summaries
+# SUMMARY_WORKERS: threads per worker process that generate conversation titles
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "2"))
+
+# Chat context window
+# CONTEXT_TOKEN_BUDGET: estimated prompt tokens (system prompt + summary + recent turns) sent per turn
+# CONTEXT_FOLD_RATIO: once history overflows, older turns are folded into the rolling summary
+#   until the recent turns fit in this fraction of the budget, so folding doesn't run every turn
+# CONTEXT_SUMMARY_MAX_TOKENS: length cap for the rolling summary
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+CONTEXT_FOLD_RATIO = float(os.getenv("CONTEXT_FOLD_RATIO", "0.5"))
+CONTEXT_SUMMARY_MAX_TOKENS = int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", "300"))
+
+# Signed-in user lookups
+# USER_CACHE_TTL: seconds each worker may reuse a loaded user between requests (0 disables)
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "5"))
+
+# Server-side session validation
+# SESSION_CACHE_TTL: seconds a worker trusts a valid session token before looking it up again
+# SESSION_CACHE_NEGATIVE_TTL: seconds a worker remembers that a token is invalid
+# SESSION_REVOCATION_CHECK: seconds between checks of the logout counter; a logout on
+#   any worker takes effect everywhere within this long
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "60"))
+SESSION_CACHE_NEGATIVE_TTL = float(os.getenv("SESSION_CACHE_NEGATIVE_TTL", "10"))
+SESSION_REVOCATION_CHECK = float(os.getenv("SESSION_REVOCATION_CHECK", "2"))
+
+# Expired-session purge (`flask --app run purge-sessions`, see session_purge.py)
+# SESSION_PURGE_BATCH_SIZE: rows deleted per statement, keeping each transaction short
+SESSION_PURGE_BATCH_SIZE = int(os.getenv("SESSION_PURGE_BATCH_SIZE", "1000"))
+
+# Password hashing
+# BCRYPT_ROUNDS: bcrypt cost for new hashes; existing hashes are upgraded on the next login
+# PASSWORD_HASH_WORKERS: processes per worker that run bcrypt (0 runs it inline)
+# PASSWORD_HASH_QUEUE_LIMIT: hashes allowed to wait for a free process before logins are turned away
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "16"))
+
+# Sign-in throttling (per worker, checked before touching the database)
+# LOGIN_USERNAME_BURST / LOGIN_USERNAME_PER_MINUTE: attempts allowed back to back for one
+#   username, and how fast that allowance refills
+# LOGIN_IP_BURST / LOGIN_IP_PER_MINUTE: the same for one client address; keep this roomy,
+#   since a whole household usually shares one address
+# LOGIN_THROTTLE_MAX_KEYS: buckets remembered per limiter before idle ones are dropped
+LOGIN_USERNAME_BURST = float(os.getenv("LOGIN_USERNAME_BURST", "10"))
+LOGIN_USERNAME_PER_MINUTE = float(os.getenv("LOGIN_USERNAME_PER_MINUTE", "5"))
+LOGIN_IP_BURST = float(os.getenv("LOGIN_IP_BURST", "30"))
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", "20"))
+LOGIN_THROTTLE_MAX_KEYS = int(os.getenv("LOGIN_THROTTLE_MAX_KEYS", "10000"))
+
+# Schema migrations
+# MIGRATE_ON_STARTUP: apply pending scripts from migrations/ when the app starts
+#   (`flask --app run migrate` does the same from the command line)
+#   (startup.sh migrates once before gunicorn starts and turns this off for the workers)
+# MIGRATE_LOCK_TIMEOUT: seconds to wait while another process migrates; keep it below
+#   gunicorn's worker timeout (30s by default) or a waiting worker is killed and restarted
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() == "true"
+MIGRATE_LOCK_TIMEOUT = float(os.getenv("MIGRATE_LOCK_TIMEOUT", "20"))
+
+# Request metrics (statement count, DB time and connections per request, see query_stats.py)
+# SERVER_TIMING: add a Server-Timing header to every response
+# ACCESS_LOG: log one line per request with its timings
+SERVER_TIMING = os.getenv("SERVER_TIMING", "true").lower() == "true"
+ACCESS_LOG = os.getenv("ACCESS_LOG", "true").lower() == "true"
+
+# Slow query log (see slow_query.py)
+# SLOW_QUERY_THRESHOLD_MS: statements slower than this are logged (0 disables)
+# SLOW_QUERY_LOG: file the JSON records go to (falls back to the main log if it cannot be opened)
+# SLOW_QUERY_EXPLAIN_RATE: fraction of slow SELECT/UPDATE/DELETE statements that also get an EXPLAIN
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "logs/slow_queries.log")
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", "0.1"))
+
+# Idempotency-Key support for /chat and /chat/stream (see idempotency.py)
+# IDEMPOTENCY_KEY_TTL: seconds a finished reply is kept for replay
+# IDEMPOTENCY_PENDING_TIMEOUT: seconds after which an unfinished claim counts as abandoned
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+IDEMPOTENCY_PENDING_TIMEOUT = int(os.getenv("IDEMPOTENCY_PENDING_TIMEOUT", "300"))
@@ -0,0 +1,51 @@
+from typing import List, Sequence, Tuple
+
+# Rough per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate, no tokenizer needed. English BPE averages about
+    four characters per token; non-ASCII text is counted by UTF-8 bytes
+    instead, which keeps CJK and emoji-heavy text from being undercounted.
+    """
+    if not text:
+        return 0
+    if text.isascii():
+        return (len(text) + 3) // 4
+    return (len(text.encode("utf-8")) + 2) // 3
+
+
+def estimate_message_tokens(content: str) -> int:
+    return estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def select_context(messages: Sequence, available: int, fold_ratio: float = 0.5) -> Tuple[List, List]:
+    """
+    Split chronologically ordered messages (anything with .content) into
+    (recent, to_fold).
+
+    recent is the newest run of messages that fits in `available` tokens and
+    is what gets sent this turn; the newest message is always kept. to_fold
+    is empty while everything fits. Once something has to be dropped, every
+    message older than the newest run fitting in available * fold_ratio is
+    returned for folding into the rolling summary, so the summary is updated
+    in occasional batches rather than on every turn.
+    """
+    low_water = available * min(fold_ratio, 1.0)
+    total = 0
+    keep_from = len(messages)
+    fold_before = None
+    for i in range(len(messages) - 1, -1, -1):
+        total += estimate_message_tokens(messages[i].content)
+        if total > low_water and fold_before is None:
+            fold_before = i + 1
+        if total > available and keep_from < len(messages):
+            break
+        keep_from = i
+    if keep_from == 0:
+        return list(messages), []
+    # Always fold at least what was dropped, and never the newest message
+    fold_before = max(keep_from, min(fold_before, len(messages) - 1))
+    return list(messages[keep_from:]), list(messages[:fold_before])
@@ -1,10 +1,16 @@
 from openai import OpenAI
 import logging
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Union
+from app.config.settings import CONTEXT_TOKEN_BUDGET, CONTEXT_FOLD_RATIO, CONTEXT_SUMMARY_MAX_TOKENS
 from app.core.settings.settings import Settings
 from app.core.model.banned_word import BannedWord
 from app.core.model.api_key import ApiKey
 from app.core.model.message import Message
+from app.core.model.conversation import Conversation
+from app.core.filters.banned_words import BannedWordMatcher, BannedWordStreamScanner, as_matcher, matcher_cache
+from app.core.ai_clients.context import estimate_message_tokens, select_context
+from app.core.ai_clients.prompts import CompiledPrompt, DEFAULT_PERSONA_PROMPT, compile_system_prompt, prompt_cache
+from app.core.ai_clients.summarizer import summarizer
 
 class OpenAIClient:
     def __init__(self, banned_keywords: List[str] = None):
@@ -20,9 +26,12 @@ class OpenAIClient:
     def get_banned_words(self):
         return [w.word for w in BannedWord.get_all()]
 
-    def contains_banned(self, text: str, banned_keywords: List[str]) -> bool:
-        text_lower = text.lower()
-        return any(word in text_lower for word in banned_keywords)
+    def get_banned_word_matcher(self) -> BannedWordMatcher:
+        """Compiled matcher for the current banned-word list, rebuilt only when the settings version changes."""
+        return matcher_cache.get(self.settings.get_settings_version(), self.get_banned_words)
+
+    def contains_banned(self, text: str, banned_keywords: Union[BannedWordMatcher, List[str]]) -> bool:
+        return as_matcher(banned_keywords).contains(text)
 
     def moderate_content(self, text: str) -> bool:
         if self.api_key_missing or not self.client:
@@ -32,36 +41,70 @@ class OpenAIClient:
         return resp.results[0].flagged
 
     def get_persona_prompt(self, persona_id, user_id):
-        personas = self.settings.get_personas(user_id)
-        for p in personas:
-            if p['id'] == persona_id:
-                return p['system_prompt']
-        return "You are a helpful assistant."
+        persona = self.settings.get_persona(persona_id)
+        if persona:
+            return persona['system_prompt']
+        return DEFAULT_PERSONA_PROMPT
 
-    def get_chat_response(self, message: str, user_id: int, persona_id: int, conversation_id: int = None) -> str:
-        if self.api_key_missing or not self.client:
-            return "OpenAI API key is not set. Please ask an admin to add it in the Admin panel."
-        banned_keywords = self.get_banned_words()
-        if self.contains_banned(message, banned_keywords):
-            return "Uh oh! I can't help with that."
+    def get_system_prompt(self, user_id: int, persona_id: int) -> CompiledPrompt:
+        """Compiled system message for this child and persona, rebuilt only when settings change."""
+        return prompt_cache.get(
+            self.settings.get_settings_version(),
+            (user_id, persona_id),
+            lambda: compile_system_prompt(
+                self.settings.get_global_system_instructions(),
+                self.get_persona_prompt(persona_id, user_id),
+                self.settings.get_child_instructions(user_id),
+            )
+        )
 
-        user_instructions = self.settings.get_child_instructions(user_id)
-        persona_prompt = self.get_persona_prompt(persona_id, user_id)
-        system_prompt = f"{persona_prompt}\n{user_instructions}" if user_instructions else persona_prompt
+    # Canned replies shared by the blocking and streaming chat paths
+    API_KEY_MISSING_REPLY = "OpenAI API key is not set. Please ask an admin to add it in the Admin panel."
+    BANNED_INPUT_REPLY = "Uh oh! I can't help with that."
+    BANNED_OUTPUT_REPLY = "Oops, I can't help with that."
+    ERROR_REPLY = "Sorry, I encountered an error. Please try again."
+
+    def build_chat_messages(self, message: str, user_id: int, persona_id: int, conversation_id: int = None) -> List[Dict[str, str]]:
+        """
+        Assemble the system prompt and conversation history sent to the model.
+        History is trimmed to the newest turns that fit in CONTEXT_TOKEN_BUDGET;
+        older turns are represented by the conversation's rolling summary.
+        """
+        system_prompt = self.get_system_prompt(user_id, persona_id)
 
         conv = [
-            {"role": "system", "content": system_prompt}
+            {"role": "system", "content": system_prompt.text}
         ]
-        # If conversation_id is provided, load full history
-        if conversation_id:
-            messages = Message.get_by_conversation_id(conversation_id)
-            for m in messages:
-                if m.sender == 'user':
-                    conv.append({"role": "user", "content": m.content})
-                elif m.sender == 'assistant':
-                    conv.append({"role": "assistant", "content": m.content})
-        else:
+        if not conversation_id:
             conv.append({"role": "user", "content": message})
+            return conv
+
+        conversation = Conversation.get_by_id(conversation_id)
+        summary = conversation.context_summary if conversation else None
+        through_id = conversation.context_summary_through_id if conversation else None
+        # Only turns not already folded into the summary are loaded
+        history = [m for m in Message.get_by_conversation_id(conversation_id, after_id=through_id)
+                   if m.sender in ('user', 'assistant')]
+        available = CONTEXT_TOKEN_BUDGET - system_prompt.tokens
+        if summary:
+            available -= estimate_message_tokens(summary)
+        recent, to_fold = select_context(history, available, CONTEXT_FOLD_RATIO)
+        if to_fold:
+            summarizer.submit_context(self, conversation_id, summary, to_fold)
+        if summary:
+            conv.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+        for m in recent:
+            conv.append({"role": m.sender, "content": m.content})
+        return conv
+
+    def get_chat_response(self, message: str, user_id: int, persona_id: int, conversation_id: int = None) -> str:
+        if self.api_key_missing or not self.client:
+            return self.API_KEY_MISSING_REPLY
+        banned_keywords = self.get_banned_word_matcher()
+        if self.contains_banned(message, banned_keywords):
+            return self.BANNED_INPUT_REPLY
+
+        conv = self.build_chat_messages(message, user_id, persona_id, conversation_id)
 
         try:
             resp = self.client.chat.completions.create(
@@ -70,11 +113,64 @@ class OpenAIClient:
             )
             output = resp.choices[0].message.content
             if self.contains_banned(output, banned_keywords):
-                return "Oops, I can't help with that."
+                return self.BANNED_OUTPUT_REPLY
             return output
         except Exception as e:
             logging.error(f"Error getting chat response: {str(e)}")
-            return "Sorry, I encountered an error. Please try again."
+            return self.ERROR_REPLY
+
+    def stream_chat_response(self, message: str, user_id: int, persona_id: int, conversation_id: int = None) -> Iterator[Dict[str, str]]:
+        """
+        Streaming counterpart of get_chat_response. Yields events as the model
+        produces tokens:
+        - {"type": "delta", "content": ...}: text to append to the reply
+        - {"type": "replace", "content": ...}: discard everything so far and show this instead
+        """
+        if self.api_key_missing or not self.client:
+            yield {"type": "replace", "content": self.API_KEY_MISSING_REPLY}
+            return
+        banned_keywords = self.get_banned_word_matcher()
+        if self.contains_banned(message, banned_keywords):
+            yield {"type": "replace", "content": self.BANNED_INPUT_REPLY}
+            return
+
+        conv = self.build_chat_messages(message, user_id, persona_id, conversation_id)
+
+        # Output is scanned as it streams; text that might be the start of a
+        # banned word is held back until the next chunk proves it safe
+        scanner = BannedWordStreamScanner(as_matcher(banned_keywords))
+        stream = None
+        try:
+            stream = self.client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=conv,
+                stream=True
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if not content:
+                    continue
+                safe = scanner.feed(content)
+                if scanner.hit:
+                    break
+                if safe:
+                    yield {"type": "delta", "content": safe}
+            tail = scanner.finish()
+            if scanner.hit:
+                # Leaving the loop early and closing the stream below stops token spend
+                logging.warning(f"Banned word in streamed output for user {user_id}, stopping stream")
+                yield {"type": "replace", "content": self.BANNED_OUTPUT_REPLY}
+            elif tail:
+                yield {"type": "delta", "content": tail}
+        except Exception as e:
+            logging.error(f"Error streaming chat response: {str(e)}")
+            yield {"type": "replace", "content": self.ERROR_REPLY}
+        finally:
+            # Stop the upstream request if we bailed out or the consumer went away early
+            if stream is not None and hasattr(stream, "close"):
+                stream.close()
 
     def summarize_text(self, text: str) -> str:
         """
@@ -102,4 +198,35 @@ class OpenAIClient:
             return summary
         except Exception as e:
             logging.error(f"Error summarizing text: {str(e)}")
-            return "(No summary)" 
\ No newline at end of file
+            return "(No summary)"
+
+    def summarize_history(self, previous_summary: Optional[str], messages: List[Message]) -> Optional[str]:
+        """
+        Fold older turns into the rolling conversation summary. Returns None if
+        the summary could not be produced, so the caller keeps the old one.
+        """
+        if self.api_key_missing or not self.client:
+            return None
+        transcript = "\n".join(
+            f"{'User' if m.sender == 'user' else 'Assistant'}: {m.content}" for m in messages
+        )
+        prompt = (
+            "Update the summary of this conversation with the new turns below. Keep names, facts, "
+            "preferences and open questions the assistant needs to carry on. Reply with the summary only.\n"
+            f"Current summary: {previous_summary or '(none)'}\nNew turns:\n{transcript}\nUpdated summary:"
+        )
+        try:
+            resp = self.client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": "You keep a short running summary of a conversation."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=CONTEXT_SUMMARY_MAX_TOKENS,
+                temperature=0.3
+            )
+            summary = resp.choices[0].message.content
+            return summary.strip() if summary else None
+        except Exception as e:
+            logging.error(f"Error summarizing conversation history: {str(e)}")
+            return None
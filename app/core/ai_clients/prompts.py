@@ -0,0 +1,27 @@
+from typing import NamedTuple
+from app.core.ai_clients.context import estimate_message_tokens
+from app.core.settings.cache import SettingsCache
+
+DEFAULT_PERSONA_PROMPT = "You are a helpful assistant."
+
+
+class CompiledPrompt(NamedTuple):
+    text: str
+    tokens: int
+
+
+def compile_system_prompt(global_instructions: str, persona_prompt: str, child_instructions: str) -> CompiledPrompt:
+    """
+    Build the system message for one (child, persona) pair. Parts go from
+    most to least widely shared, so every conversation starts with the same
+    prefix as many others (which is what provider-side prompt caching keys on).
+    """
+    parts = [part.strip() for part in (global_instructions, persona_prompt or DEFAULT_PERSONA_PROMPT, child_instructions)
+             if part and part.strip()]
+    text = "\n\n".join(parts)
+    return CompiledPrompt(text, estimate_message_tokens(text))
+
+
+# Per-worker cache of compiled prompts keyed by (child_id, persona_id), dropped
+# whenever the settings version moves on
+prompt_cache = SettingsCache()
@@ -0,0 +1,113 @@
+import os
+import logging
+import threading
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from app.config.settings import SUMMARY_WORKERS
+from app.core.model.conversation import Conversation
+
+# Shown in the sidebar until a conversation has a summary of its own
+PLACEHOLDER_SUMMARY = "New Conversation"
+PLACEHOLDER_LENGTH = 40
+
+
+def placeholder_summary(first_message: str = "") -> str:
+    """Stand-in title: the start of the first message, or a generic label."""
+    first_message = " ".join((first_message or "").split())
+    if not first_message:
+        return PLACEHOLDER_SUMMARY
+    if len(first_message) > PLACEHOLDER_LENGTH:
+        return first_message[:PLACEHOLDER_LENGTH - 1].rstrip() + "…"
+    return first_message
+
+
+class ConversationSummarizer:
+    """
+    Generates conversation summaries on a small background thread pool so
+    /chat and /conversations never wait on the extra LLM round trip. Each
+    conversation is queued at most once at a time per kind of job; the
+    sidebar shows a placeholder until the title is written.
+
+    Two kinds of job run here:
+    - titles: the short sidebar summary of a conversation's first message
+    - context: folding old turns into the conversation's rolling context summary
+    """
+
+    def __init__(self, max_workers: int = SUMMARY_WORKERS):
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._executor = None
+        self._pending = set()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Threads do not survive fork, so each worker process starts its own pool
+        if self._executor is None or self._pid != os.getpid():
+            self._reset_state()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix="summarizer")
+        return self._executor
+
+    def is_pending(self, conversation_id: int, kind: str = "title") -> bool:
+        return (kind, conversation_id) in self._pending
+
+    def _submit(self, key, fn, *args) -> bool:
+        with self._lock:
+            if key in self._pending:
+                return False
+            executor = self._get_executor()
+            self._pending.add(key)
+        executor.submit(self._run, key, fn, *args)
+        return True
+
+    def _run(self, key, fn, *args):
+        try:
+            fn(*args)
+        except Exception as e:
+            logging.error(f"Error in background {key[0]} summary for conversation {key[1]}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def submit(self, ai_client, conversation_id: int, text: str) -> bool:
+        """Queue a title for the conversation. Returns False if one is already queued."""
+        if not text:
+            return False
+        return self._submit(("title", conversation_id), self._summarize_title, ai_client, conversation_id, text)
+
+    def submit_context(self, ai_client, conversation_id: int, previous_summary: Optional[str], messages: List) -> bool:
+        """
+        Queue folding `messages` (oldest first) into the conversation's rolling
+        context summary. Returns False if a fold is already queued; the next
+        turn will pick up whatever that one leaves out.
+        """
+        if not messages:
+            return False
+        return self._submit(("context", conversation_id), self._fold_context,
+                            ai_client, conversation_id, previous_summary, list(messages))
+
+    @staticmethod
+    def _summarize_title(ai_client, conversation_id: int, text: str):
+        summary = ai_client.summarize_text(text)
+        if summary:
+            Conversation.set_summary(conversation_id, summary)
+
+    @staticmethod
+    def _fold_context(ai_client, conversation_id: int, previous_summary: Optional[str], messages: List):
+        summary = ai_client.summarize_history(previous_summary, messages)
+        if summary:
+            Conversation.set_context_summary(conversation_id, summary, messages[-1].id)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._pending = set()
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+# Per-worker summarizer shared by every request in this process
+summarizer = ConversationSummarizer()
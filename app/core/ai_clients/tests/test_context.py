@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+from app.core.ai_clients.context import estimate_tokens, estimate_message_tokens, select_context, MESSAGE_OVERHEAD_TOKENS
+
+
+def make_messages(*sizes):
+    # Each message costs exactly `size` estimated tokens including overhead
+    return [SimpleNamespace(id=i + 1, content='x' * 4 * (size - MESSAGE_OVERHEAD_TOKENS))
+            for i, size in enumerate(sizes)]
+
+def test_estimate_tokens_ascii():
+    assert estimate_tokens('') == 0
+    assert estimate_tokens('abcd') == 1
+    assert estimate_tokens('abcde') == 2
+    assert estimate_tokens('hello world, how are you?') == 7
+
+def test_estimate_tokens_counts_non_ascii_by_bytes():
+    # Three CJK characters are nine UTF-8 bytes, roughly one token each
+    assert estimate_tokens('你好吗') == 3
+    assert estimate_tokens('é' * 12) > estimate_tokens('e' * 12)
+
+def test_estimate_message_tokens_adds_overhead():
+    assert estimate_message_tokens('abcd') == 1 + MESSAGE_OVERHEAD_TOKENS
+
+def test_select_context_everything_fits():
+    messages = make_messages(10, 10, 10)
+    recent, to_fold = select_context(messages, available=30)
+    assert recent == messages
+    assert to_fold == []
+
+def test_select_context_keeps_newest_within_budget_and_folds_to_low_water():
+    messages = make_messages(10, 10, 10, 10, 10, 10)
+    recent, to_fold = select_context(messages, available=40, fold_ratio=0.5)
+    assert [m.id for m in recent] == [3, 4, 5, 6]
+    # Folding goes down to half the budget so the next few turns fit without another fold
+    assert [m.id for m in to_fold] == [1, 2, 3, 4]
+
+def test_select_context_always_keeps_newest_message():
+    messages = make_messages(10, 100)
+    recent, to_fold = select_context(messages, available=50)
+    assert [m.id for m in recent] == [2]
+    assert [m.id for m in to_fold] == [1]
+
+def test_select_context_empty():
+    assert select_context([], available=100) == ([], [])
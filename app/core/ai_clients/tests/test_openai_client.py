@@ -8,6 +8,11 @@ from app.core.ai_clients import openai_client
 def patch_apikey(monkeypatch):
     monkeypatch.setattr(openai_client.ApiKey, "get_openai_key", staticmethod(lambda: "dummy-key"))
 
+# Compiled prompts are cached per worker; start every test cold
+@pytest.fixture(autouse=True)
+def clear_prompt_cache():
+    openai_client.prompt_cache.clear()
+
 # --- __init__ ---
 @patch('app.core.ai_clients.openai_client.ApiKey')
 @patch('app.core.ai_clients.openai_client.OpenAI')
@@ -84,14 +89,14 @@ def test_moderate_content_not_flagged(mock_openai, mock_apikey):
 # --- get_persona_prompt ---
 @patch('app.core.ai_clients.openai_client.Settings')
 def test_get_persona_prompt_found(mock_settings):
-    mock_settings.return_value.get_personas.return_value = [{'id': 1, 'system_prompt': 'hi'}]
+    mock_settings.return_value.get_persona.return_value = {'id': 1, 'system_prompt': 'hi'}
     client = OpenAIClient()
     result = client.get_persona_prompt(1, 2)
     assert result == 'hi'
 
 @patch('app.core.ai_clients.openai_client.Settings')
 def test_get_persona_prompt_not_found(mock_settings):
-    mock_settings.return_value.get_personas.return_value = [{'id': 2, 'system_prompt': 'hi'}]
+    mock_settings.return_value.get_persona.return_value = None
     client = OpenAIClient()
     result = client.get_persona_prompt(1, 2)
     assert result == 'You are a helpful assistant.'
@@ -133,7 +138,9 @@ def test_get_chat_response_normal(mock_openai, mock_apikey, mock_bw, mock_msg, m
     mock_apikey.get_openai_key.return_value = 'key'
     mock_bw.get_all.return_value = [MagicMock(word='bad')]
     mock_settings.return_value.get_child_instructions.return_value = ''
-    mock_settings.return_value.get_personas.return_value = [{'id': 1, 'system_prompt': 'hi'}]
+    mock_settings.return_value.get_global_system_instructions.return_value = ''
+    mock_settings.return_value.get_settings_version.return_value = 1
+    mock_settings.return_value.get_persona.return_value = {'id': 1, 'system_prompt': 'hi'}
     mock_client = MagicMock()
     mock_resp = MagicMock()
     mock_resp.choices = [MagicMock(message=MagicMock(content='hello'))]
@@ -157,7 +164,9 @@ def test_get_chat_response_output_banned(mock_openai, mock_apikey, mock_bw, mock
     mock_apikey.get_openai_key.return_value = 'key'
     mock_bw.get_all.return_value = [MagicMock(word='bad')]
     mock_settings.return_value.get_child_instructions.return_value = ''
-    mock_settings.return_value.get_personas.return_value = [{'id': 1, 'system_prompt': 'hi'}]
+    mock_settings.return_value.get_global_system_instructions.return_value = ''
+    mock_settings.return_value.get_settings_version.return_value = 1
+    mock_settings.return_value.get_persona.return_value = {'id': 1, 'system_prompt': 'hi'}
     mock_client = MagicMock()
     mock_resp = MagicMock()
     mock_resp.choices = [MagicMock(message=MagicMock(content='bad'))]
@@ -181,7 +190,9 @@ def test_get_chat_response_exception(mock_openai, mock_apikey, mock_bw, mock_msg
     mock_apikey.get_openai_key.return_value = 'key'
     mock_bw.get_all.return_value = [MagicMock(word='bad')]
     mock_settings.return_value.get_child_instructions.return_value = ''
-    mock_settings.return_value.get_personas.return_value = [{'id': 1, 'system_prompt': 'hi'}]
+    mock_settings.return_value.get_global_system_instructions.return_value = ''
+    mock_settings.return_value.get_settings_version.return_value = 1
+    mock_settings.return_value.get_persona.return_value = {'id': 1, 'system_prompt': 'hi'}
     mock_client = MagicMock()
     mock_client.chat.completions.create.side_effect = Exception('fail')
     mock_openai.return_value = mock_client
@@ -229,4 +240,190 @@ def test_summarize_text_exception(mock_openai, mock_apikey):
     client.client = mock_client
     client.api_key_missing = False
     result = client.summarize_text('text')
-    assert result == '(No summary)' 
\ No newline at end of file
+    assert result == '(No summary)' 
+
+
+# --- get_banned_word_matcher ---
+@patch('app.core.ai_clients.openai_client.matcher_cache', new_callable=lambda: openai_client.matcher_cache.__class__())
+@patch('app.core.ai_clients.openai_client.BannedWord')
+@patch('app.core.ai_clients.openai_client.Settings')
+def test_get_banned_word_matcher_cached_per_version(mock_settings, mock_bw, mock_cache):
+    mock_settings.return_value.get_settings_version.return_value = 3
+    mock_bw.get_all.return_value = [MagicMock(word='bad')]
+    client = OpenAIClient()
+    first = client.get_banned_word_matcher()
+    assert client.get_banned_word_matcher() is first
+    assert first.contains('so BAD')
+    mock_bw.get_all.assert_called_once()
+    mock_settings.return_value.get_settings_version.return_value = 4
+    assert client.get_banned_word_matcher() is not first
+    assert mock_bw.get_all.call_count == 2
+
+
+# --- stream_chat_response ---
+def make_chunk(content):
+    return MagicMock(choices=[MagicMock(delta=MagicMock(content=content))])
+
+
+def make_streaming_client(chunks, banned=()):
+    client = OpenAIClient()
+    client.api_key_missing = False
+    client.client = MagicMock()
+    stream = MagicMock()
+    stream.__iter__.return_value = iter(chunks)
+    client.client.chat.completions.create.return_value = stream
+    client.get_banned_word_matcher = lambda: list(banned)
+    client.build_chat_messages = lambda *args: [{"role": "user", "content": "hi"}]
+    return client, stream
+
+
+def test_stream_chat_response_forwards_deltas():
+    client, stream = make_streaming_client([make_chunk('Hel'), make_chunk(None), make_chunk('lo')])
+    events = list(client.stream_chat_response('hi', 1, 1, 2))
+    assert events == [{"type": "delta", "content": "Hel"}, {"type": "delta", "content": "lo"}]
+    assert client.client.chat.completions.create.call_args.kwargs['stream'] is True
+    stream.close.assert_called_once()
+
+
+def test_stream_chat_response_banned_input():
+    client, _ = make_streaming_client([], banned=['bad'])
+    events = list(client.stream_chat_response('bad', 1, 1, 2))
+    assert events == [{"type": "replace", "content": OpenAIClient.BANNED_INPUT_REPLY}]
+    client.client.chat.completions.create.assert_not_called()
+
+
+def test_stream_chat_response_banned_output():
+    client, _ = make_streaming_client([make_chunk('so '), make_chunk('bad')], banned=['bad'])
+    events = list(client.stream_chat_response('hi', 1, 1, 2))
+    assert events[-1] == {"type": "replace", "content": OpenAIClient.BANNED_OUTPUT_REPLY}
+
+
+def test_stream_chat_response_error():
+    client, _ = make_streaming_client([])
+    client.client.chat.completions.create.side_effect = Exception('fail')
+    events = list(client.stream_chat_response('hi', 1, 1, 2))
+    assert events == [{"type": "replace", "content": OpenAIClient.ERROR_REPLY}]
+
+
+@patch('app.core.ai_clients.openai_client.ApiKey')
+def test_stream_chat_response_api_key_missing(mock_apikey):
+    mock_apikey.get_openai_key.return_value = None
+    client = OpenAIClient()
+    events = list(client.stream_chat_response('hi', 1, 1))
+    assert events[0]['type'] == 'replace'
+    assert 'OpenAI API key is not set' in events[0]['content']
+
+
+def test_stream_chat_response_stops_upstream_on_banned_output():
+    chunks = [make_chunk('Hello '), make_chunk('b'), make_chunk('ad'), make_chunk(' never sent')]
+    client, stream = make_streaming_client(chunks, banned=['bad'])
+    events = list(client.stream_chat_response('hi', 1, 1, 2))
+    assert events == [
+        {"type": "delta", "content": "Hello "},
+        {"type": "replace", "content": OpenAIClient.BANNED_OUTPUT_REPLY},
+    ]
+    stream.close.assert_called_once()
+
+
+# --- context window ---
+def make_context_client(system_prompt='Be kind.'):
+    client = OpenAIClient()
+    client.settings = MagicMock()
+    client.settings.get_child_instructions.return_value = ''
+    client.settings.get_global_system_instructions.return_value = ''
+    client.settings.get_settings_version.return_value = 1
+    client.get_persona_prompt = lambda persona_id, user_id: system_prompt
+    return client
+
+
+@patch('app.core.ai_clients.openai_client.summarizer')
+@patch('app.core.ai_clients.openai_client.Conversation')
+@patch('app.core.ai_clients.openai_client.Message')
+def test_build_chat_messages_includes_rolling_summary(mock_msg, mock_conv, mock_summarizer):
+    mock_conv.get_by_id.return_value = MagicMock(context_summary='Talked about dinosaurs.', context_summary_through_id=10)
+    mock_msg.get_by_conversation_id.return_value = [
+        MagicMock(id=11, sender='user', content='What about T. rex?'),
+        MagicMock(id=12, sender='assistant', content='Big teeth!'),
+    ]
+    client = make_context_client()
+    conv = client.build_chat_messages('What about T. rex?', 1, 1, 5)
+    mock_msg.get_by_conversation_id.assert_called_once_with(5, after_id=10)
+    assert conv[0] == {"role": "system", "content": "Be kind."}
+    assert 'Talked about dinosaurs.' in conv[1]['content']
+    assert conv[2:] == [{"role": "user", "content": "What about T. rex?"},
+                        {"role": "assistant", "content": "Big teeth!"}]
+    mock_summarizer.submit_context.assert_not_called()
+
+
+@patch('app.core.ai_clients.openai_client.CONTEXT_TOKEN_BUDGET', 60)
+@patch('app.core.ai_clients.openai_client.summarizer')
+@patch('app.core.ai_clients.openai_client.Conversation')
+@patch('app.core.ai_clients.openai_client.Message')
+def test_build_chat_messages_trims_history_and_queues_fold(mock_msg, mock_conv, mock_summarizer):
+    mock_conv.get_by_id.return_value = MagicMock(context_summary=None, context_summary_through_id=None)
+    history = [MagicMock(id=i, sender='user' if i % 2 else 'assistant', content='x' * 40) for i in range(1, 7)]
+    mock_msg.get_by_conversation_id.return_value = history
+    client = make_context_client()
+    conv = client.build_chat_messages('x' * 40, 1, 1, 5)
+    # 6 (system) + 14 per message leaves room for the newest three
+    assert len(conv) == 4
+    assert conv[-1]['content'] == 'x' * 40
+    args = mock_summarizer.submit_context.call_args[0]
+    assert args[1:3] == (5, None)
+    assert [m.id for m in args[3]] == [1, 2, 3, 4, 5]
+
+
+@patch('app.core.ai_clients.openai_client.ApiKey')
+@patch('app.core.ai_clients.openai_client.OpenAI')
+def test_summarize_history(mock_openai, mock_apikey):
+    mock_apikey.get_openai_key.return_value = 'key'
+    mock_client = MagicMock()
+    mock_client.chat.completions.create.return_value = MagicMock(
+        choices=[MagicMock(message=MagicMock(content=' Likes dinosaurs. '))])
+    mock_openai.return_value = mock_client
+    client = OpenAIClient()
+    messages = [MagicMock(sender='user', content='I like dinosaurs'), MagicMock(sender='assistant', content='Cool!')]
+    assert client.summarize_history('Said hello.', messages) == 'Likes dinosaurs.'
+    prompt = mock_client.chat.completions.create.call_args.kwargs['messages'][1]['content']
+    assert 'Said hello.' in prompt
+    assert 'User: I like dinosaurs\nAssistant: Cool!' in prompt
+
+
+@patch('app.core.ai_clients.openai_client.ApiKey')
+@patch('app.core.ai_clients.openai_client.OpenAI')
+def test_summarize_history_error_keeps_old_summary(mock_openai, mock_apikey):
+    mock_apikey.get_openai_key.return_value = 'key'
+    mock_client = MagicMock()
+    mock_client.chat.completions.create.side_effect = Exception('fail')
+    mock_openai.return_value = mock_client
+    client = OpenAIClient()
+    assert client.summarize_history(None, [MagicMock(sender='user', content='hi')]) is None
+
+
+# --- compiled system prompts ---
+from app.core.ai_clients.prompts import compile_system_prompt, DEFAULT_PERSONA_PROMPT
+
+
+def test_compile_system_prompt_orders_shared_parts_first():
+    prompt = compile_system_prompt('Be safe.', 'You are a pirate.', 'Max is 8.')
+    assert prompt.text == 'Be safe.\n\nYou are a pirate.\n\nMax is 8.'
+    assert prompt.tokens > 0
+
+
+def test_compile_system_prompt_skips_empty_parts():
+    assert compile_system_prompt('', '', '  ').text == DEFAULT_PERSONA_PROMPT
+
+
+def test_get_system_prompt_compiled_once_per_settings_version():
+    client = make_context_client('You are a pirate.')
+    client.settings.get_global_system_instructions.return_value = 'Be safe.'
+    client.settings.get_child_instructions.return_value = 'Max is 8.'
+    first = client.get_system_prompt(1, 2)
+    assert first.text == 'Be safe.\n\nYou are a pirate.\n\nMax is 8.'
+    assert client.get_system_prompt(1, 2) is first
+    client.settings.get_child_instructions.assert_called_once_with(1)
+    # Another child gets its own prompt
+    assert client.get_system_prompt(3, 2) is not first
+    client.settings.get_settings_version.return_value = 2
+    client.settings.get_child_instructions.return_value = 'Max is 9.'
+    assert client.get_system_prompt(1, 2).text.endswith('Max is 9.')
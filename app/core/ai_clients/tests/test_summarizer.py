@@ -0,0 +1,84 @@
+import threading
+from unittest.mock import patch, MagicMock
+from app.core.ai_clients.summarizer import ConversationSummarizer, placeholder_summary, PLACEHOLDER_SUMMARY
+
+
+def test_placeholder_summary_uses_start_of_message():
+    assert placeholder_summary('Why  is the\nsky blue?') == 'Why is the sky blue?'
+    long = placeholder_summary('word ' * 30)
+    assert len(long) <= 40
+    assert long.endswith('…')
+
+def test_placeholder_summary_without_message():
+    assert placeholder_summary('') == PLACEHOLDER_SUMMARY
+    assert placeholder_summary(None) == PLACEHOLDER_SUMMARY
+
+@patch('app.core.ai_clients.summarizer.Conversation')
+def test_submit_summarizes_in_background(mock_conversation):
+    ai_client = MagicMock()
+    ai_client.summarize_text.return_value = 'Sky colors'
+    summarizer = ConversationSummarizer(max_workers=1)
+    assert summarizer.submit(ai_client, 7, 'Why is the sky blue?') is True
+    summarizer.shutdown()
+    ai_client.summarize_text.assert_called_once_with('Why is the sky blue?')
+    mock_conversation.set_summary.assert_called_once_with(7, 'Sky colors')
+    assert not summarizer.is_pending(7)
+
+@patch('app.core.ai_clients.summarizer.Conversation')
+def test_submit_skips_conversation_already_queued(mock_conversation):
+    started = threading.Event()
+    release = threading.Event()
+    ai_client = MagicMock()
+
+    def slow_summary(text):
+        started.set()
+        release.wait(5)
+        return 'Sky colors'
+
+    ai_client.summarize_text.side_effect = slow_summary
+    summarizer = ConversationSummarizer(max_workers=1)
+    assert summarizer.submit(ai_client, 7, 'Why is the sky blue?') is True
+    started.wait(5)
+    assert summarizer.is_pending(7)
+    assert summarizer.submit(ai_client, 7, 'Why is the sky blue?') is False
+    release.set()
+    summarizer.shutdown()
+    ai_client.summarize_text.assert_called_once()
+
+@patch('app.core.ai_clients.summarizer.Conversation')
+def test_submit_ignores_empty_text(mock_conversation):
+    summarizer = ConversationSummarizer(max_workers=1)
+    assert summarizer.submit(MagicMock(), 7, '') is False
+    summarizer.shutdown()
+    mock_conversation.set_summary.assert_not_called()
+
+@patch('app.core.ai_clients.summarizer.Conversation')
+def test_failed_summary_clears_pending(mock_conversation):
+    ai_client = MagicMock()
+    ai_client.summarize_text.side_effect = RuntimeError('timeout')
+    summarizer = ConversationSummarizer(max_workers=1)
+    summarizer.submit(ai_client, 7, 'Why is the sky blue?')
+    summarizer.shutdown()
+    mock_conversation.set_summary.assert_not_called()
+    assert not summarizer.is_pending(7)
+
+@patch('app.core.ai_clients.summarizer.Conversation')
+def test_submit_context_folds_into_rolling_summary(mock_conversation):
+    ai_client = MagicMock()
+    ai_client.summarize_history.return_value = 'Likes dinosaurs.'
+    messages = [MagicMock(id=3), MagicMock(id=4)]
+    summarizer = ConversationSummarizer(max_workers=1)
+    assert summarizer.submit_context(ai_client, 7, 'Said hello.', messages) is True
+    summarizer.shutdown()
+    ai_client.summarize_history.assert_called_once_with('Said hello.', messages)
+    mock_conversation.set_context_summary.assert_called_once_with(7, 'Likes dinosaurs.', 4)
+
+@patch('app.core.ai_clients.summarizer.Conversation')
+def test_submit_context_keeps_old_summary_on_failure(mock_conversation):
+    ai_client = MagicMock()
+    ai_client.summarize_history.return_value = None
+    summarizer = ConversationSummarizer(max_workers=1)
+    summarizer.submit_context(ai_client, 7, None, [MagicMock(id=3)])
+    summarizer.shutdown()
+    mock_conversation.set_context_summary.assert_not_called()
+    assert not summarizer.is_pending(7, kind="context")
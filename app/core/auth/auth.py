@@ -1,14 +1,18 @@
-import bcrypt
 import logging
-import mysql.connector
 import secrets
 import re
 from datetime import datetime, timedelta
 from typing import Dict, Tuple, Optional
 from flask import session
 from app.core.model.user import User
-from app.core.config import get_db_config
+from app.core.config import get_db_config, get_connection
 from app.core.settings.settings import Settings
+from app.core.auth.session_cache import SessionCache
+from app.core.auth.passwords import password_hasher, PasswordHasherBusy
+from app.core.auth.rate_limit import LoginThrottle
+
+# Bumped on every logout; workers drop cached session lookups when it moves
+SESSIONS_VERSION_KEY = "sessions_version"
 
 class AuthService:
     """
@@ -25,14 +29,19 @@ class AuthService:
         self.lockout_duration = timedelta(minutes=15)
         self.attempt_reset_after = timedelta(hours=1)
         self.session_duration = timedelta(hours=24)
+        # Once any user exists it is not expected to go away, so a positive
+        # has_users() answer is remembered for the life of the worker
+        self._has_users = False
+        self.session_cache = SessionCache()
+        self.login_throttle = LoginThrottle()
 
     def hash_password(self, password: str) -> str:
-        """Hash a password using bcrypt"""
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        """Hash a password using bcrypt (off the request thread, see PasswordHasher)"""
+        return password_hasher.hash(password)
 
     def verify_password(self, password: str, hashed: str) -> bool:
-        """Verify a password against its hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+        """Verify a password against its hash (off the request thread, see PasswordHasher)"""
+        return password_hasher.verify(password, hashed)
 
     def validate_password(self, password: str) -> tuple[bool, str]:
         """
@@ -61,15 +70,22 @@ class AuthService:
         return True, "Password meets requirements"
         
     def has_users(self) -> bool:
-        """Check if any users exist in the database."""
+        """
+        Check if any users exist in the database. Only the first positive
+        answer costs a query; a negative one is never cached so a setup done
+        by another worker is seen right away.
+        """
+        if self._has_users:
+            return True
         connection = None
         cursor = None
         try:
-            connection = mysql.connector.connect(**self.db_config)
+            connection = get_connection()
             cursor = connection.cursor()
-            cursor.execute("SELECT COUNT(*) FROM users")
-            count = cursor.fetchone()[0]
-            return count > 0
+            # EXISTS stops at the first row instead of counting the whole table
+            cursor.execute("SELECT EXISTS(SELECT 1 FROM users)")
+            self._has_users = bool(cursor.fetchone()[0])
+            return self._has_users
         except Exception as e:
             logging.error(f"Error checking users: {e}")
             return True  # Assume users exist on error for security
@@ -79,6 +95,10 @@ class AuthService:
             if connection is not None and connection.is_connected():
                 connection.close()
 
+    def reset_has_users(self):
+        """Forget the cached has_users() answer, e.g. after the users table is wiped."""
+        self._has_users = False
+
     def create_user(self, username: str, password: str, text_name: str, role: str) -> Tuple[bool, str]:
         """Create a new user."""
         try:
@@ -97,6 +117,7 @@ class AuthService:
             if not user.save():
                 logging.error(f"Failed to save user: {username}")
                 return False, "Failed to save user"
+            self._has_users = True
             # Create blank system instructions after user is saved
             Settings().create_blank_instructions(user.get_id())
             return True, "User created successfully"
@@ -109,7 +130,7 @@ class AuthService:
         conn = None
         cursor = None
         try:
-            conn = mysql.connector.connect(**self.db_config)
+            conn = get_connection()
             cursor = conn.cursor()
             session_token = secrets.token_urlsafe(32)
             # Set expiration based on remember flag
@@ -130,15 +151,21 @@ class AuthService:
             if conn is not None:
                 conn.close()
 
-    def authenticate(self, username: str, password: str, remember: bool = False) -> Tuple[bool, str]:
+    def authenticate(self, username: str, password: str, remember: bool = False,
+                     ip: Optional[str] = None) -> Tuple[bool, str]:
         """
         Authenticate a user with rate limiting and session creation
         Returns (success, message)
         """
         try:
             logging.info(f"Authentication attempt for username: {username}")
+            # Cheap in-memory check first so floods never reach MySQL or bcrypt
+            if not self.login_throttle.allow(username, ip):
+                logging.warning(f"Throttled login attempt for username: {username}, ip: {ip}")
+                return False, "Too many sign-in attempts. Please wait a minute and try again."
+
             user = User.get_by_username(username)
-            
+
             if not user:
                 logging.warning(f"Failed login attempt - user not found: {username}")
                 return False, "Invalid username or password"
@@ -149,32 +176,37 @@ class AuthService:
                 logging.warning(f"Login attempt for locked account: {username}, remaining lockout time: {remaining} minutes")
                 return False, f"Account is locked. Try again in {remaining} minutes"
 
-            # Reset failed attempts if enough time has passed
-            if user.failed_login_attempts > 0 and user.locked_until and \
-               datetime.now() > user.locked_until + self.attempt_reset_after:
-                logging.info(f"Resetting failed login attempts for user: {username}")
-                user.failed_login_attempts = 0
-
             # Check password
             if not self.verify_password(password, user.get_password_hash()):
-                user.failed_login_attempts += 1
-                
+                # The counter is bumped (and reset after attempt_reset_after)
+                # in the database, so concurrent attempts cannot lose counts
+                result = User.record_failed_login(
+                    user.get_id(),
+                    self.max_attempts,
+                    int(self.lockout_duration.total_seconds()),
+                    int(self.attempt_reset_after.total_seconds()),
+                )
+                if result is None:
+                    return False, "Invalid username or password"
+                attempts = result[0]
+
                 # Lock account if too many failed attempts
-                if user.failed_login_attempts >= self.max_attempts:
-                    user.locked_until = datetime.now() + self.lockout_duration
-                    user.save()
+                if attempts >= self.max_attempts:
                     logging.warning(f"Account locked due to too many failed attempts: {username}, lockout duration: {self.lockout_duration.seconds // 60} minutes")
                     return False, f"Too many failed attempts. Account locked for {self.lockout_duration.seconds // 60} minutes"
-                
-                user.save()
-                logging.warning(f"Failed login attempt for user: {username}, attempts remaining: {self.max_attempts - user.failed_login_attempts}")
-                return False, f"Invalid username or password. {self.max_attempts - user.failed_login_attempts} attempts remaining"
-
-            # Successful login
-            user.failed_login_attempts = 0
-            user.locked_until = None
-            user.save()
-            
+
+                logging.warning(f"Failed login attempt for user: {username}, attempts remaining: {self.max_attempts - attempts}")
+                return False, f"Invalid username or password. {self.max_attempts - attempts} attempts remaining"
+
+            # Successful login: only write when there is something to change
+            new_hash = None
+            # Upgrade the stored hash if BCRYPT_ROUNDS has changed since it was made
+            if password_hasher.needs_rehash(user.get_password_hash()):
+                logging.info(f"Rehashing password for user: {username}")
+                new_hash = self.hash_password(password)
+            if user.failed_login_attempts or user.locked_until or new_hash:
+                User.record_successful_login(user.get_id(), new_hash)
+
             # Create session
             session_token = self.create_session(user.get_id(), remember)
             if not session_token:
@@ -189,7 +221,10 @@ class AuthService:
             
             logging.info(f"Successful login for user: {username}, remember me: {remember}")
             return True, "Login successful"
-            
+
+        except PasswordHasherBusy:
+            logging.warning(f"Password hasher busy, turning away login for: {username}")
+            return False, "Too many sign-in attempts right now. Please try again in a moment."
         except Exception as e:
             logging.error(f"Authentication error: {str(e)}")
             return False, "Authentication failed"
@@ -199,7 +234,7 @@ class AuthService:
         conn = None
         cursor = None
         try:
-            conn = mysql.connector.connect(**self.db_config)
+            conn = get_connection()
             cursor = conn.cursor()
             query = """
                 SELECT 1 FROM sessions 
@@ -218,19 +253,64 @@ class AuthService:
             if conn is not None:
                 conn.close()
             
+    def is_session_valid(self, session_token: str, user_id: int) -> bool:
+        """
+        Check that the session token is live and belongs to user_id. Lookups
+        are cached per worker (see SessionCache), so most requests cost no
+        database round trip at all.
+        """
+        try:
+            cache = self.session_cache
+            version = cache.version(lambda: Settings().get_version(SESSIONS_VERSION_KEY))
+            hit, owner = cache.get(session_token, version)
+            if not hit:
+                owner, seconds_left = self._lookup_session(session_token)
+                cache.put(session_token, owner, version, seconds_left)
+            return owner is not None and owner == user_id
+        except Exception as e:
+            logging.error(f"Session validation error: {str(e)}")
+            return False
+
+    def _lookup_session(self, session_token: str) -> Tuple[Optional[int], Optional[int]]:
+        """Return (user_id, seconds until expiry) for a live session, or (None, None)."""
+        conn = None
+        cursor = None
+        try:
+            conn = get_connection()
+            cursor = conn.cursor()
+            # Served by the unique index on session_token; expiry is computed
+            # by MySQL so app and database clocks never have to agree
+            cursor.execute("""
+                SELECT user_id, TIMESTAMPDIFF(SECOND, NOW(), expires_at) FROM sessions
+                WHERE session_token = %s
+                AND expires_at > NOW()
+            """, (session_token,))
+            row = cursor.fetchone()
+            return (row[0], row[1]) if row else (None, None)
+        finally:
+            if cursor is not None:
+                cursor.close()
+            if conn is not None:
+                conn.close()
+
     def logout(self, session_token: str) -> bool:
         """Invalidate a session and clear session data"""
         conn = None
         cursor = None
         try:
-            conn = mysql.connector.connect(**self.db_config)
+            conn = get_connection()
             cursor = conn.cursor()
             query = "DELETE FROM sessions WHERE session_token = %s"
             cursor.execute(query, (session_token,))
+            revoked = cursor.rowcount > 0
+            if revoked:
+                # Tell every worker to drop its cached session lookups
+                Settings._bump_version(cursor, SESSIONS_VERSION_KEY)
             conn.commit()
+            self.session_cache.discard(session_token)
             # Clear session data
             session.clear()
-            return cursor.rowcount > 0
+            return revoked
         except Exception as e:
             logging.error(f"Logout error: {str(e)}")
             return False
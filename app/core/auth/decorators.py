@@ -1,6 +1,23 @@
 from functools import wraps
-from flask import request, jsonify, redirect, url_for, session
+from flask import request, jsonify, redirect, url_for, session, g
 from app.core.model.user import User
+from app.core.auth.auth import auth_service
+
+def get_current_user():
+    """
+    Return the signed-in user for this request, or None. The session token
+    must still be live on the server (so logged-out and expired sessions are
+    rejected), and the user is loaded at most once per request and shared
+    via g.current_user, so decorators, views and logging all reuse it.
+    """
+    if 'current_user' not in g:
+        user_id = session.get('user_id')
+        token = session.get('session_token')
+        if user_id and token and auth_service.is_session_valid(token, user_id):
+            g.current_user = User.get_by_id_cached(user_id)
+        else:
+            g.current_user = None
+    return g.current_user
 
 def authorize(roles):
     """
@@ -14,7 +31,7 @@ def authorize(roles):
             if not user_id:
                 return redirect(url_for('main.show_login'))
 
-            user = User.get_by_id(user_id)
+            user = get_current_user()
             if not user:
                 session.clear()
                 return redirect(url_for('main.show_login'))
@@ -52,7 +69,7 @@ def authorize_any():
                 return redirect(url_for('main.show_login'))
 
             # extra safety: make sure that user still exists
-            if not User.get_by_id(user_id):
+            if not get_current_user():
                 session.clear()
                 if is_api:
                     return jsonify({'error': 'Not authenticated'}), 401
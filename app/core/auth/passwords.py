@@ -0,0 +1,115 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import bcrypt
+from app.config.settings import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT
+
+
+# After the pool breaks, wait this long before starting a new one, doubling
+# on every further break up to MAX_RESTART_BACKOFF seconds
+RESTART_BACKOFF = 5
+MAX_RESTART_BACKOFF = 300
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hashes are already running or queued, or the pool is down."""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a small process pool so a burst of logins burns its own
+    CPU budget instead of stalling the request threads that serve chat.
+    At most workers + queue_limit hashes are in flight per worker process;
+    beyond that callers get PasswordHasherBusy straight away rather than
+    queueing without bound. If the pool breaks, callers get the same error
+    until a restart backoff has passed; bcrypt never runs on a request thread.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, queue_limit: int = PASSWORD_HASH_QUEUE_LIMIT,
+                 rounds: int = BCRYPT_ROUNDS):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.rounds = rounds
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+        self._failures = 0
+        self._retry_at = 0.0
+        self._slots = threading.BoundedSemaphore(max(1, workers) + queue_limit)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Pools do not survive fork, so each gunicorn worker starts its own.
+        # forkserver children start clean instead of copying a threaded parent.
+        with self._lock:
+            if self._pid != os.getpid():
+                self._executor = None
+                self._failures = 0
+                self._retry_at = 0.0
+            if self._executor is None:
+                if time.monotonic() < self._retry_at:
+                    raise PasswordHasherBusy("Password hashing is restarting")
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context(method))
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy("Too many password checks in progress")
+        try:
+            if self.workers <= 0:
+                return fn(*args)
+            executor = self._get_executor()
+            try:
+                result = executor.submit(fn, *args).result()
+            except BrokenProcessPool as e:
+                # A hashing process died (OOM kill, or it could not import
+                # this module); turn callers away until a new pool is due
+                self._discard(executor, e)
+                raise PasswordHasherBusy("Password hashing is restarting") from e
+            self._failures = 0
+            return result
+        finally:
+            self._slots.release()
+
+    def _discard(self, executor: ProcessPoolExecutor, error: Exception):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self._failures += 1
+                backoff = min(RESTART_BACKOFF * 2 ** (self._failures - 1), MAX_RESTART_BACKOFF)
+                self._retry_at = time.monotonic() + backoff
+                logging.error(f"Password hashing pool broke, restarting it in {backoff}s: {error}")
+        executor.shutdown(wait=False)
+
+    # The pool runs bcrypt's own functions, never ones defined in this
+    # package: the hashing processes only need to import bcrypt, so they
+    # start even when the app is not importable from their sys.path
+
+    def hash(self, password: str) -> str:
+        return self._run(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(self.rounds)).decode('utf-8')
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """True if the hash was made with a different cost than BCRYPT_ROUNDS."""
+        try:
+            return int(hashed.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+# Per-worker hasher shared by logins, user creation and password changes
+password_hasher = PasswordHasher()
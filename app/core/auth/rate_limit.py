@@ -0,0 +1,89 @@
+import threading
+import time
+from typing import Optional
+from app.config.settings import (
+    LOGIN_USERNAME_BURST, LOGIN_USERNAME_PER_MINUTE,
+    LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE, LOGIN_THROTTLE_MAX_KEYS,
+)
+
+
+class TokenBucketLimiter:
+    """
+    In-memory token buckets keyed by an arbitrary string. Each key starts
+    with `burst` tokens and regains `per_minute` tokens a minute; an attempt
+    costs one token. A burst or rate of 0 disables the limiter.
+
+    At most max_keys buckets are kept; when that is exceeded, buckets that
+    have refilled completely are dropped first (forgetting them changes
+    nothing), then the least recently used.
+    """
+
+    def __init__(self, burst: float, per_minute: float, max_keys: int = LOGIN_THROTTLE_MAX_KEYS):
+        self.burst = float(burst)
+        self.rate = per_minute / 60.0
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.burst > 0 and self.rate > 0
+
+    def allow(self, key: str) -> bool:
+        """Take a token for key; returns False when the bucket is empty."""
+        if not self.enabled:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                self.rejected += 1
+                return False
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return True
+
+    def _prune(self, now: float):
+        self._buckets = {
+            key: (tokens, updated) for key, (tokens, updated) in self._buckets.items()
+            if tokens + (now - updated) * self.rate < self.burst
+        }
+        excess = len(self._buckets) - self.max_keys
+        if excess > 0:
+            oldest = sorted(self._buckets, key=lambda k: self._buckets[k][1])[:excess]
+            for key in oldest:
+                del self._buckets[key]
+
+    def reset(self, key: str):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._buckets = {}
+
+
+class LoginThrottle:
+    """
+    Per-worker pre-filter for sign-in attempts, checked before any database
+    work. Each attempt costs a token from the client IP's bucket and from the
+    username's bucket, so guessing one account from many addresses and
+    spraying many accounts from one address are both slowed down.
+    """
+
+    def __init__(self):
+        self.by_username = TokenBucketLimiter(LOGIN_USERNAME_BURST, LOGIN_USERNAME_PER_MINUTE)
+        self.by_ip = TokenBucketLimiter(LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE)
+
+    def allow(self, username: Optional[str], ip: Optional[str] = None) -> bool:
+        if ip and not self.by_ip.allow(ip):
+            return False
+        return self.by_username.allow((username or "").strip().casefold())
+
+    def clear(self):
+        self.by_username.clear()
+        self.by_ip.clear()
@@ -0,0 +1,77 @@
+import threading
+import time
+from typing import Callable, Optional, Tuple
+from app.config.settings import SESSION_CACHE_TTL, SESSION_CACHE_NEGATIVE_TTL, SESSION_REVOCATION_CHECK
+
+
+class SessionCache:
+    """
+    Per-worker cache of session token lookups, holding both valid tokens
+    (with their user id) and invalid ones.
+
+    Every entry records the revocation version it was loaded under. Logging
+    out bumps that version in the database, and each worker re-reads it at
+    most every `version_check` seconds; an entry from an older version is
+    treated as a miss, so a logout anywhere takes effect everywhere quickly
+    without a lookup on every request.
+    """
+
+    def __init__(self, ttl: float = SESSION_CACHE_TTL, negative_ttl: float = SESSION_CACHE_NEGATIVE_TTL,
+                 version_check: float = SESSION_REVOCATION_CHECK, max_entries: int = 10000):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.version_check = version_check
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._version = None
+        self._version_checked_at = 0.0
+
+    def version(self, load: Callable[[], int]) -> int:
+        """Current revocation version, re-read from the database at most every version_check seconds."""
+        now = time.monotonic()
+        if self._version is None or now - self._version_checked_at >= self.version_check:
+            version = load()
+            with self._lock:
+                self._version = version
+                self._version_checked_at = now
+            return version
+        return self._version
+
+    def get(self, token: str, version: int) -> Tuple[bool, Optional[int]]:
+        """Return (hit, user_id); user_id is None for a cached invalid token."""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return False, None
+            user_id, expires_at, entry_version = entry
+            if entry_version != version or expires_at <= time.monotonic():
+                del self._entries[token]
+                return False, None
+            return True, user_id
+
+    def put(self, token: str, user_id: Optional[int], version: int, seconds_left: Optional[float] = None):
+        """Cache a lookup. Valid tokens are never trusted past their own expiry."""
+        ttl = self.negative_ttl if user_id is None else self.ttl
+        if seconds_left is not None:
+            ttl = min(ttl, seconds_left)
+        if ttl <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries = {t: e for t, e in self._entries.items() if e[1] > now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries = {}
+            self._entries[token] = (user_id, now + ttl, version)
+
+    def discard(self, token: str):
+        with self._lock:
+            self._entries.pop(token, None)
+            # Make the next check re-read the version this worker just bumped
+            self._version = None
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._version = None
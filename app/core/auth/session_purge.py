@@ -0,0 +1,188 @@
+import logging
+import random
+import threading
+import time
+from typing import Optional
+import click
+from mysql.connector import Error
+from app.config.settings import SESSION_PURGE_BATCH_SIZE
+from app.core.config import get_connection
+
+# MySQL advisory lock so only one worker purges at a time
+PURGE_LOCK_NAME = "kidgpt_session_purge"
+
+
+class SessionPurgeStats:
+    """Running totals for the expired-session purge in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.skipped = 0
+        self.errors = 0
+        self.batches = 0
+        self.rows_purged = 0
+        self.last_run_at = None
+        self.last_rows = 0
+        self.last_duration = 0.0
+
+    def record(self, result: dict):
+        with self._lock:
+            self.runs += 1
+            self.last_run_at = time.time()
+            if result["skipped"]:
+                self.skipped += 1
+                return
+            if result["error"]:
+                self.errors += 1
+            self.batches += result["batches"]
+            self.rows_purged += result["rows"]
+            self.last_rows = result["rows"]
+            self.last_duration = result["duration"]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "skipped": self.skipped,
+                "errors": self.errors,
+                "batches": self.batches,
+                "rows_purged": self.rows_purged,
+                "last_run_at": self.last_run_at,
+                "last_rows": self.last_rows,
+                "last_duration": self.last_duration,
+            }
+
+
+purge_stats = SessionPurgeStats()
+
+
+def purge_expired_sessions(batch_size: int = SESSION_PURGE_BATCH_SIZE, max_batches: Optional[int] = None,
+                           pause: float = 0.0) -> dict:
+    """
+    Delete expired sessions in batches of batch_size, committing after each
+    batch so no single transaction holds many row locks. Stops when a batch
+    comes back short or after max_batches. Returns
+    {"rows", "batches", "duration", "skipped", "error"}; "skipped" means
+    another worker was already purging.
+    """
+    started = time.monotonic()
+    result = {"rows": 0, "batches": 0, "duration": 0.0, "skipped": False, "error": None}
+    connection = None
+    cursor = None
+    locked = False
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (PURGE_LOCK_NAME,))
+        row = cursor.fetchone()
+        locked = bool(row and row[0])
+        if not locked:
+            result["skipped"] = True
+            return result
+        while True:
+            cursor.execute(
+                "DELETE FROM sessions WHERE expires_at < NOW() ORDER BY id LIMIT %s",
+                (batch_size,)
+            )
+            deleted = cursor.rowcount
+            connection.commit()
+            result["rows"] += deleted
+            result["batches"] += 1
+            if deleted < batch_size or (max_batches is not None and result["batches"] >= max_batches):
+                break
+            if pause:
+                time.sleep(pause)
+        return result
+    except Error as e:
+        logging.error(f"Error purging expired sessions: {e}")
+        result["error"] = str(e)
+        if connection is not None and connection.is_connected():
+            connection.rollback()
+        return result
+    finally:
+        if locked:
+            try:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (PURGE_LOCK_NAME,))
+                cursor.fetchone()
+            except Error:
+                pass
+        if cursor is not None:
+            cursor.close()
+        if connection is not None and connection.is_connected():
+            connection.close()
+        result["duration"] = time.monotonic() - started
+        purge_stats.record(result)
+        if not result["skipped"]:
+            logging.info(f"Purged {result['rows']} expired sessions in {result['batches']} batches "
+                         f"({result['duration']:.2f}s)")
+
+
+class SessionPurgeScheduler:
+    """
+    Runs purge_expired_sessions every `interval` seconds, either in the
+    calling thread (run) or on a daemon thread (start). The first run is
+    delayed by a random fraction of the interval so processes started
+    together do not all try at once.
+    """
+
+    def __init__(self, interval: float, batch_size: int = SESSION_PURGE_BATCH_SIZE, pause: float = 0.0):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="session-purge", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def run(self):
+        """Purge every interval seconds until stop() is called."""
+        delay = random.uniform(0, self.interval)
+        while not self._stop.wait(delay):
+            try:
+                purge_expired_sessions(batch_size=self.batch_size, pause=self.pause)
+            except Exception as e:
+                logging.error(f"Session purge run failed: {e}")
+            delay = self.interval
+
+
+def init_session_purge(app):
+    """
+    Register the purge-sessions CLI command. Nothing is started here: every
+    gunicorn worker, CLI run and test builds an app, so the repeating purge
+    runs only where a deployment asks for it (purge-sessions --every).
+    """
+    @app.cli.command("purge-sessions")
+    @click.option("--batch-size", default=SESSION_PURGE_BATCH_SIZE, show_default=True,
+                  help="Rows deleted per statement.")
+    @click.option("--max-batches", default=None, type=int, help="Stop after this many batches.")
+    @click.option("--pause", default=0.0, show_default=True, help="Seconds to sleep between batches.")
+    @click.option("--every", default=None, type=float,
+                  help="Keep running, purging every this many seconds (one such process per deployment).")
+    def purge_sessions_command(batch_size, max_batches, pause, every):
+        """Delete expired sessions in batches."""
+        if every is not None:
+            if every <= 0:
+                raise click.BadParameter("must be greater than 0", param_hint="--every")
+            click.echo(f"Purging expired sessions every {every:g}s.")
+            SessionPurgeScheduler(interval=every, batch_size=batch_size, pause=pause).run()
+            return
+        result = purge_expired_sessions(batch_size=batch_size, max_batches=max_batches, pause=pause)
+        if result["skipped"]:
+            click.echo("Another purge is already running.")
+        elif result["error"]:
+            raise click.ClickException(result["error"])
+        else:
+            click.echo(f"Purged {result['rows']} expired sessions in {result['batches']} batches "
+                       f"({result['duration']:.2f}s).")
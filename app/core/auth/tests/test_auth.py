@@ -1,5 +1,7 @@
 import pytest
 from app.core.auth.auth import AuthService
+from app.core.auth.passwords import PasswordHasherBusy
+from app.core.auth.rate_limit import TokenBucketLimiter
 from unittest.mock import patch, MagicMock
 from flask import session as flask_session
 
@@ -46,6 +48,7 @@ def test_create_user_success(mock_settings, mock_user, auth_service):
     success, msg = auth_service.create_user("newuser", "TestPassword123!", "Test User", "child")
     assert success
     assert msg == "User created successfully"
+    assert auth_service.has_users() is True
 
 @patch("app.core.auth.auth.User")
 def test_create_user_already_exists(mock_user, auth_service):
@@ -54,7 +57,7 @@ def test_create_user_already_exists(mock_user, auth_service):
     assert not success
     assert msg == "Username already exists"
 
-@patch("mysql.connector.connect")
+@patch("app.core.auth.auth.get_connection")
 def test_has_users_true(mock_connect, auth_service):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
@@ -67,7 +70,7 @@ def test_has_users_true(mock_connect, auth_service):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch("mysql.connector.connect")
+@patch("app.core.auth.auth.get_connection")
 def test_has_users_false(mock_connect, auth_service):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
@@ -77,11 +80,37 @@ def test_has_users_false(mock_connect, auth_service):
     mock_conn.is_connected.return_value = True
     assert auth_service.has_users() is False
 
-@patch("mysql.connector.connect", side_effect=Exception("DB error"))
+@patch("app.core.auth.auth.get_connection", side_effect=Exception("DB error"))
 def test_has_users_db_error(mock_connect, auth_service):
     assert auth_service.has_users() is True  # Should return True on error for security
 
-@patch("mysql.connector.connect")
+@patch("app.core.auth.auth.get_connection")
+def test_has_users_caches_positive_answer(mock_connect, auth_service):
+    mock_cursor = mock_connect.return_value.cursor.return_value
+    mock_cursor.fetchone.return_value = [1]
+    assert auth_service.has_users() is True
+    assert auth_service.has_users() is True
+    mock_connect.assert_called_once()
+    assert "EXISTS" in mock_cursor.execute.call_args[0][0]
+    auth_service.reset_has_users()
+    mock_cursor.fetchone.return_value = [0]
+    assert auth_service.has_users() is False
+
+@patch("app.core.auth.auth.get_connection")
+def test_has_users_does_not_cache_negative_answer(mock_connect, auth_service):
+    mock_cursor = mock_connect.return_value.cursor.return_value
+    mock_cursor.fetchone.return_value = [0]
+    assert auth_service.has_users() is False
+    mock_cursor.fetchone.return_value = [1]
+    assert auth_service.has_users() is True
+    assert mock_connect.call_count == 2
+
+@patch("app.core.auth.auth.get_connection", side_effect=Exception("DB error"))
+def test_has_users_error_is_not_cached(mock_connect, auth_service):
+    assert auth_service.has_users() is True
+    assert auth_service._has_users is False
+
+@patch("app.core.auth.auth.get_connection")
 @patch("secrets.token_urlsafe", return_value="token123")
 def test_create_session_success(mock_token, mock_connect, auth_service):
     mock_conn = MagicMock()
@@ -96,10 +125,46 @@ def test_create_session_success(mock_token, mock_connect, auth_service):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch("mysql.connector.connect", side_effect=Exception("DB error"))
+@patch("app.core.auth.auth.get_connection", side_effect=Exception("DB error"))
 def test_create_session_db_error(mock_connect, auth_service):
     assert auth_service.create_session(1) is None
 
+@patch("app.core.auth.auth.User")
+@patch("app.core.auth.auth.AuthService.create_session", return_value="token123")
+def test_authenticate_rehashes_when_cost_changes(mock_create_session, mock_user, auth_service, monkeypatch):
+    import bcrypt
+    old_hash = bcrypt.hashpw(b"TestPassword123!", bcrypt.gensalt(4)).decode()
+    user = MagicMock()
+    user.get_password_hash.return_value = old_hash
+    user.password_hash = old_hash
+    user.failed_login_attempts = 0
+    user.locked_until = None
+    user.get_id.return_value = 1
+    mock_user.get_by_username.return_value = user
+    monkeypatch.setattr("app.core.auth.auth.session", {})
+    monkeypatch.setattr("app.core.auth.auth.password_hasher.rounds", 5)
+    success, _ = auth_service.authenticate("user", "TestPassword123!")
+    assert success
+    user_id, new_hash = mock_user.record_successful_login.call_args[0]
+    assert user_id == 1
+    assert new_hash.startswith("$2b$05$")
+    user.save.assert_not_called()
+
+@patch("app.core.auth.auth.User")
+def test_authenticate_hasher_busy(mock_user, auth_service, monkeypatch):
+    user = MagicMock()
+    user.locked_until = None
+    user.failed_login_attempts = 0
+    mock_user.get_by_username.return_value = user
+    def busy(*args):
+        raise PasswordHasherBusy()
+    monkeypatch.setattr(auth_service, "verify_password", busy)
+    success, msg = auth_service.authenticate("user", "pw")
+    assert not success
+    assert "try again" in msg
+    user.save.assert_not_called()
+    mock_user.record_failed_login.assert_not_called()
+
 @patch("app.core.auth.auth.User")
 @patch("app.core.auth.auth.AuthService.create_session", return_value="token123")
 def test_authenticate_success(mock_create_session, mock_user, auth_service, monkeypatch):
@@ -125,6 +190,23 @@ def test_authenticate_success(mock_create_session, mock_user, auth_service, monk
     assert fake_session["user_id"] == 1
     assert fake_session["session_token"] == "token123"
     assert fake_session.permanent is True
+    # Nothing to reset, so a clean login writes nothing to users
+    mock_user.record_successful_login.assert_not_called()
+    user.save.assert_not_called()
+
+@patch("app.core.auth.auth.User")
+@patch("app.core.auth.auth.AuthService.create_session", return_value="token123")
+def test_authenticate_success_clears_failed_attempts(mock_create_session, mock_user, auth_service, monkeypatch):
+    user = MagicMock()
+    user.get_password_hash.return_value = auth_service.hash_password("TestPassword123!")
+    user.failed_login_attempts = 2
+    user.locked_until = None
+    user.get_id.return_value = 1
+    mock_user.get_by_username.return_value = user
+    monkeypatch.setattr("app.core.auth.auth.session", {})
+    success, _ = auth_service.authenticate("user", "TestPassword123!")
+    assert success
+    mock_user.record_successful_login.assert_called_once_with(1, None)
 
 @patch("app.core.auth.auth.User")
 def test_authenticate_user_not_found(mock_user, auth_service):
@@ -149,15 +231,82 @@ def test_authenticate_wrong_password_and_lock(mock_user, auth_service):
     user.get_password_hash.return_value = auth_service.hash_password("rightpass")
     user.failed_login_attempts = 4
     user.locked_until = None
-    user.save.return_value = True
     user.get_id.return_value = 1
     mock_user.get_by_username.return_value = user
+    mock_user.record_failed_login.return_value = (5, MagicMock())
     # Wrong password triggers lock
     success, msg = auth_service.authenticate("user", "wrongpass")
     assert not success
-    assert "Account locked" in msg or "attempts remaining" in msg
+    assert "Account locked" in msg
+    mock_user.record_failed_login.assert_called_once_with(1, 5, 900, 3600)
+    user.save.assert_not_called()
 
-@patch("mysql.connector.connect")
+@patch("app.core.auth.auth.User")
+def test_authenticate_wrong_password_counts_down(mock_user, auth_service):
+    user = MagicMock()
+    user.get_password_hash.return_value = auth_service.hash_password("rightpass")
+    user.locked_until = None
+    user.get_id.return_value = 1
+    mock_user.get_by_username.return_value = user
+    mock_user.record_failed_login.return_value = (2, None)
+    success, msg = auth_service.authenticate("user", "wrongpass")
+    assert not success
+    assert "3 attempts remaining" in msg
+
+@patch("app.core.auth.auth.User")
+def test_authenticate_throttled_before_db(mock_user, auth_service):
+    auth_service.login_throttle.by_username = TokenBucketLimiter(2, 1)
+    mock_user.get_by_username.return_value = None
+    for _ in range(2):
+        assert auth_service.authenticate("Kid", "pw", ip="10.0.0.1")[1] == "Invalid username or password"
+    success, msg = auth_service.authenticate(" kid ", "pw", ip="10.0.0.2")
+    assert not success
+    assert "Too many sign-in attempts" in msg
+    assert mock_user.get_by_username.call_count == 2
+
+def test_token_bucket_refills(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.core.auth.rate_limit.time.monotonic", lambda: now[0])
+    limiter = TokenBucketLimiter(2, 60)
+    assert limiter.allow("a") and limiter.allow("a")
+    assert not limiter.allow("a")
+    assert limiter.allow("b")
+    now[0] += 1.0
+    assert limiter.allow("a")
+    assert not limiter.allow("a")
+    assert limiter.rejected == 2
+
+def test_token_bucket_prunes_full_buckets(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.core.auth.rate_limit.time.monotonic", lambda: now[0])
+    limiter = TokenBucketLimiter(5, 60, max_keys=2)
+    limiter.allow("a")
+    limiter.allow("b")
+    now[0] += 10
+    limiter.allow("c")
+    assert set(limiter._buckets) == {"c"}
+
+def test_token_bucket_disabled():
+    limiter = TokenBucketLimiter(0, 0)
+    assert all(limiter.allow("a") for _ in range(100))
+
+@patch("app.core.model.user.get_connection")
+def test_record_failed_login_single_update(mock_connect):
+    from app.core.model.user import User
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connect.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchone.return_value = (3, None)
+    assert User.record_failed_login(7, 5, 900, 3600) == (3, None)
+    update_sql, params = mock_cursor.execute.call_args_list[0][0]
+    assert "failed_login_attempts = IF(" in update_sql
+    assert "user_roles" not in update_sql
+    assert params == (3600, 5, 900, 7)
+    assert mock_cursor.execute.call_count == 2
+    mock_conn.commit.assert_called_once()
+
+@patch("app.core.auth.auth.get_connection")
 def test_validate_session_valid(mock_connect, auth_service):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
@@ -170,7 +319,7 @@ def test_validate_session_valid(mock_connect, auth_service):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch("mysql.connector.connect")
+@patch("app.core.auth.auth.get_connection")
 def test_validate_session_invalid(mock_connect, auth_service):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
@@ -180,11 +329,51 @@ def test_validate_session_invalid(mock_connect, auth_service):
     mock_conn.is_connected.return_value = True
     assert auth_service.validate_session("token123") is False
 
-@patch("mysql.connector.connect", side_effect=Exception("DB error"))
+@patch("app.core.auth.auth.get_connection", side_effect=Exception("DB error"))
 def test_validate_session_db_error(mock_connect, auth_service):
     assert auth_service.validate_session("token123") is False
 
-@patch("mysql.connector.connect")
+# --- is_session_valid ---
+@patch("app.core.auth.auth.Settings")
+@patch("app.core.auth.auth.get_connection")
+def test_is_session_valid_caches_lookup(mock_connect, mock_settings, auth_service):
+    mock_settings.return_value.get_version.return_value = 3
+    mock_cursor = mock_connect.return_value.cursor.return_value
+    mock_cursor.fetchone.return_value = (1, 3600)
+    assert auth_service.is_session_valid("token123", 1) is True
+    assert auth_service.is_session_valid("token123", 1) is True
+    assert auth_service.is_session_valid("token123", 2) is False
+    mock_cursor.execute.assert_called_once()
+    assert "session_token = %s" in mock_cursor.execute.call_args[0][0]
+
+@patch("app.core.auth.auth.Settings")
+@patch("app.core.auth.auth.get_connection")
+def test_is_session_valid_caches_invalid_token(mock_connect, mock_settings, auth_service):
+    mock_settings.return_value.get_version.return_value = 3
+    mock_cursor = mock_connect.return_value.cursor.return_value
+    mock_cursor.fetchone.return_value = None
+    assert auth_service.is_session_valid("gone", 1) is False
+    assert auth_service.is_session_valid("gone", 1) is False
+    mock_cursor.execute.assert_called_once()
+
+@patch("app.core.auth.auth.Settings")
+@patch("app.core.auth.auth.get_connection")
+def test_is_session_valid_rechecks_after_revocation(mock_connect, mock_settings, auth_service):
+    mock_settings.return_value.get_version.return_value = 3
+    mock_cursor = mock_connect.return_value.cursor.return_value
+    mock_cursor.fetchone.return_value = (1, 3600)
+    assert auth_service.is_session_valid("token123", 1) is True
+    # Another worker logged this session out
+    mock_settings.return_value.get_version.return_value = 4
+    auth_service.session_cache.version_check = 0
+    mock_cursor.fetchone.return_value = None
+    assert auth_service.is_session_valid("token123", 1) is False
+
+@patch("app.core.auth.auth.get_connection", side_effect=Exception("DB error"))
+def test_is_session_valid_db_error(mock_connect, auth_service):
+    assert auth_service.is_session_valid("token123", 1) is False
+
+@patch("app.core.auth.auth.get_connection")
 def test_logout_success(mock_connect, auth_service, monkeypatch):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
@@ -197,12 +386,14 @@ def test_logout_success(mock_connect, auth_service, monkeypatch):
     result = auth_service.logout("token123")
     assert result is True
     assert fake_session == {}
-    mock_cursor.execute.assert_called_once()
+    # Delete and revocation version bump commit together
+    assert mock_cursor.execute.call_count == 2
+    assert mock_cursor.execute.call_args[0][1] == ('sessions_version',)
     mock_conn.commit.assert_called_once()
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch("mysql.connector.connect")
+@patch("app.core.auth.auth.get_connection")
 def test_logout_no_rows(mock_connect, auth_service, monkeypatch):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
@@ -215,8 +406,9 @@ def test_logout_no_rows(mock_connect, auth_service, monkeypatch):
     result = auth_service.logout("token123")
     assert result is False
     assert fake_session == {}
+    mock_cursor.execute.assert_called_once()
 
-@patch("mysql.connector.connect", side_effect=Exception("DB error"))
+@patch("app.core.auth.auth.get_connection", side_effect=Exception("DB error"))
 def test_logout_db_error(mock_connect, auth_service, monkeypatch):
     fake_session = {}
     monkeypatch.setattr("app.core.auth.auth.session", fake_session)
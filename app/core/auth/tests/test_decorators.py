@@ -1,7 +1,26 @@
 import pytest
-from flask import Flask, session, jsonify
+from flask import Flask, session, jsonify, g
 from unittest.mock import patch, MagicMock
-from app.core.auth.decorators import authorize, authorize_any
+from app.core.auth.decorators import authorize, authorize_any, get_current_user
+from app.core.model.user import user_cache
+from app.core.auth.auth import auth_service
+
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    user_cache.clear()
+    yield
+    user_cache.clear()
+
+# Session tokens are accepted unless a test says otherwise
+@pytest.fixture(autouse=True)
+def valid_sessions():
+    with patch.object(auth_service, 'is_session_valid', return_value=True) as mock_valid:
+        yield mock_valid
+
+def login(client, user_id, token='token123'):
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['session_token'] = token
 
 @pytest.fixture
 def app():
@@ -35,8 +54,7 @@ def test_authorize_allows_correct_role(app, client):
         user.role = 'admin'
         mock_get_by_id.return_value = user
         add_route(app, '/admin', authorize('admin'), 'admin_endpoint')
-        with client.session_transaction() as sess:
-            sess['user_id'] = 1
+        login(client, 1)
         resp = client.get('/admin')
         assert resp.status_code == 200
         assert b'OK' in resp.data
@@ -47,8 +65,7 @@ def test_authorize_denies_wrong_role(app, client):
         user.role = 'child'
         mock_get_by_id.return_value = user
         add_route(app, '/admin', authorize('admin'), 'admin_endpoint2')
-        with client.session_transaction() as sess:
-            sess['user_id'] = 2
+        login(client, 2)
         resp = client.get('/admin')
         assert resp.status_code == 403
         assert b'Insufficient permissions' in resp.data
@@ -62,8 +79,7 @@ def test_authorize_redirects_if_no_user_in_session(app, client):
 def test_authorize_redirects_if_user_not_found(app, client):
     with patch('app.core.model.user.User.get_by_id', return_value=None):
         add_route(app, '/admin', authorize('admin'), 'admin_endpoint4')
-        with client.session_transaction() as sess:
-            sess['user_id'] = 999
+        login(client, 999)
         resp = client.get('/admin', follow_redirects=False)
         assert resp.status_code == 302
         assert '/login' in resp.headers['Location'] or '/show_login' in resp.headers['Location']
@@ -73,8 +89,7 @@ def test_authorize_any_allows_authenticated_user(app, client):
     with patch('app.core.model.user.User.get_by_id') as mock_get_by_id:
         mock_get_by_id.return_value = MagicMock()
         add_route(app, '/protected', authorize_any(), 'protected_endpoint')
-        with client.session_transaction() as sess:
-            sess['user_id'] = 1
+        login(client, 1)
         resp = client.get('/protected')
         assert resp.status_code == 200
         assert b'OK' in resp.data
@@ -100,8 +115,7 @@ def test_authorize_any_returns_401_for_json_request(app, client):
 def test_authorize_any_redirects_if_user_not_found(app, client):
     with patch('app.core.model.user.User.get_by_id', return_value=None):
         add_route(app, '/protected2', authorize_any(), 'protected_endpoint3')
-        with client.session_transaction() as sess:
-            sess['user_id'] = 123
+        login(client, 123)
         resp = client.get('/protected2', follow_redirects=False)
         assert resp.status_code == 302
         assert '/login' in resp.headers['Location'] or '/show_login' in resp.headers['Location']
@@ -109,8 +123,44 @@ def test_authorize_any_redirects_if_user_not_found(app, client):
 def test_authorize_any_returns_401_for_api_if_user_not_found(app, client):
     with patch('app.core.model.user.User.get_by_id', return_value=None):
         add_route(app, '/api3', authorize_any(), 'api_endpoint3')
-        with client.session_transaction() as sess:
-            sess['user_id'] = 123
+        login(client, 123)
         resp = client.get('/api3', headers={'X-Requested-With': 'XMLHttpRequest'})
         assert resp.status_code == 401
-        assert b'Not authenticated' in resp.data 
\ No newline at end of file
+        assert b'Not authenticated' in resp.data
+
+# --- current user sharing ---
+def test_authorize_any_shares_loaded_user_with_view(app, client):
+    with patch('app.core.model.user.User.get_by_id') as mock_get_by_id:
+        user = MagicMock(role='child')
+        mock_get_by_id.return_value = user
+
+        @app.route('/me')
+        @authorize_any()
+        def me():
+            assert get_current_user() is not None
+            return g.current_user.role
+
+        login(client, 5)
+        resp = client.get('/me')
+        assert resp.data == b'child'
+        mock_get_by_id.assert_called_once_with(5)
+
+# --- server-side session validation ---
+def test_authorize_any_rejects_revoked_session(app, client, valid_sessions):
+    valid_sessions.return_value = False
+    with patch('app.core.model.user.User.get_by_id') as mock_get_by_id:
+        add_route(app, '/api4', authorize_any(), 'api_endpoint4')
+        login(client, 1, 'revoked')
+        resp = client.get('/api4', headers={'X-Requested-With': 'XMLHttpRequest'})
+        assert resp.status_code == 401
+        valid_sessions.assert_called_once_with('revoked', 1)
+        mock_get_by_id.assert_not_called()
+
+def test_authorize_any_rejects_session_without_token(app, client):
+    with patch('app.core.model.user.User.get_by_id', return_value=MagicMock()):
+        add_route(app, '/api5', authorize_any(), 'api_endpoint5')
+        with client.session_transaction() as sess:
+            sess['user_id'] = 1
+        resp = client.get('/api5', headers={'X-Requested-With': 'XMLHttpRequest'})
+        assert resp.status_code == 401
+
@@ -0,0 +1,71 @@
+import os
+import threading
+import pytest
+import bcrypt
+from app.core.auth.passwords import PasswordHasher, PasswordHasherBusy
+
+
+def test_inline_hash_and_verify():
+    hasher = PasswordHasher(workers=0, queue_limit=1, rounds=4)
+    hashed = hasher.hash("TestPassword123!")
+    assert hashed.startswith("$2b$04$")
+    assert hasher.verify("TestPassword123!", hashed)
+    assert not hasher.verify("wrong", hashed)
+
+def test_pool_hash_and_verify():
+    hasher = PasswordHasher(workers=1, queue_limit=1, rounds=4)
+    try:
+        hashed = hasher.hash("TestPassword123!")
+        assert hasher.verify("TestPassword123!", hashed)
+    finally:
+        hasher.shutdown()
+
+def test_needs_rehash_when_cost_changes():
+    hasher = PasswordHasher(workers=0, queue_limit=1, rounds=5)
+    assert hasher.needs_rehash(bcrypt.hashpw(b"pw", bcrypt.gensalt(4)).decode())
+    assert not hasher.needs_rehash(bcrypt.hashpw(b"pw", bcrypt.gensalt(5)).decode())
+    assert not hasher.needs_rehash("not-a-bcrypt-hash")
+
+def test_busy_when_queue_is_full():
+    hasher = PasswordHasher(workers=0, queue_limit=0, rounds=4)
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow(*args):
+        started.set()
+        release.wait(5)
+        return True
+
+    worker = threading.Thread(target=hasher._run, args=(slow,))
+    worker.start()
+    started.wait(5)
+    try:
+        with pytest.raises(PasswordHasherBusy):
+            hasher.verify("pw", "$2b$04$x")
+    finally:
+        release.set()
+        worker.join()
+
+def test_broken_pool_fails_fast_and_backs_off():
+    from unittest.mock import MagicMock, patch
+    from concurrent.futures.process import BrokenProcessPool
+    hasher = PasswordHasher(workers=1, queue_limit=1, rounds=4)
+    broken = MagicMock()
+    broken.submit.side_effect = BrokenProcessPool("child died")
+    hasher._executor = broken
+    hasher._pid = os.getpid()
+    with pytest.raises(PasswordHasherBusy):
+        hasher.hash("TestPassword123!")
+    assert hasher._executor is None
+    broken.shutdown.assert_called_once_with(wait=False)
+    # No new pool (and no inline hashing) until the backoff has passed
+    with patch('app.core.auth.passwords.ProcessPoolExecutor') as mock_executor:
+        with pytest.raises(PasswordHasherBusy):
+            hasher.verify("pw", "$2b$04$x")
+        mock_executor.assert_not_called()
+    hasher._retry_at = 0.0
+    try:
+        assert hasher.verify("TestPassword123!", bcrypt.hashpw(b"TestPassword123!", bcrypt.gensalt(4)).decode())
+        assert hasher._failures == 0
+    finally:
+        hasher.shutdown()
@@ -0,0 +1,107 @@
+import time
+import pytest
+from flask import Flask
+from unittest.mock import patch, MagicMock, call
+import mysql.connector
+from app.core.auth import session_purge
+from app.core.auth.session_purge import purge_expired_sessions, SessionPurgeStats, SessionPurgeScheduler
+
+
+def make_connection(rowcounts, locked=True):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+    mock_conn.is_connected.return_value = True
+    mock_cursor.fetchone.return_value = (1 if locked else 0,)
+    counts = iter(rowcounts)
+
+    def execute(sql, params=None):
+        if sql.startswith("DELETE"):
+            mock_cursor.rowcount = next(counts)
+
+    mock_cursor.execute.side_effect = execute
+    return mock_conn, mock_cursor
+
+@pytest.fixture(autouse=True)
+def fresh_stats(monkeypatch):
+    monkeypatch.setattr(session_purge, "purge_stats", SessionPurgeStats())
+
+@patch("app.core.auth.session_purge.get_connection")
+def test_purge_deletes_in_batches_until_short_batch(mock_connect):
+    mock_conn, mock_cursor = make_connection([100, 100, 30])
+    mock_connect.return_value = mock_conn
+    result = purge_expired_sessions(batch_size=100)
+    assert result["rows"] == 230
+    assert result["batches"] == 3
+    assert mock_conn.commit.call_count == 3
+    deletes = [c for c in mock_cursor.execute.call_args_list if c[0][0].startswith("DELETE")]
+    assert deletes[0] == call("DELETE FROM sessions WHERE expires_at < NOW() ORDER BY id LIMIT %s", (100,))
+    # Advisory lock is released afterwards
+    assert "RELEASE_LOCK" in mock_cursor.execute.call_args_list[-1][0][0]
+    assert session_purge.purge_stats.snapshot()["rows_purged"] == 230
+
+@patch("app.core.auth.session_purge.get_connection")
+def test_purge_stops_at_max_batches(mock_connect):
+    mock_conn, _ = make_connection([10, 10, 10])
+    mock_connect.return_value = mock_conn
+    result = purge_expired_sessions(batch_size=10, max_batches=2)
+    assert result["rows"] == 20
+    assert result["batches"] == 2
+
+@patch("app.core.auth.session_purge.get_connection")
+def test_purge_skips_when_another_worker_holds_lock(mock_connect):
+    mock_conn, mock_cursor = make_connection([], locked=False)
+    mock_connect.return_value = mock_conn
+    result = purge_expired_sessions()
+    assert result["skipped"] is True
+    assert not any(c[0][0].startswith("DELETE") for c in mock_cursor.execute.call_args_list)
+    assert session_purge.purge_stats.snapshot()["skipped"] == 1
+
+@patch("app.core.auth.session_purge.get_connection", side_effect=mysql.connector.Error("DB error"))
+def test_purge_db_error(mock_connect):
+    result = purge_expired_sessions()
+    assert result["error"]
+    assert result["rows"] == 0
+    assert session_purge.purge_stats.snapshot()["errors"] == 1
+
+def test_scheduler_disabled_with_zero_interval():
+    scheduler = SessionPurgeScheduler(interval=0)
+    scheduler.start()
+    assert scheduler._thread is None
+
+@patch("app.core.auth.session_purge.purge_expired_sessions")
+def test_scheduler_runs_purge(mock_purge):
+    scheduler = SessionPurgeScheduler(interval=0.01)
+    scheduler.start()
+    try:
+        for _ in range(200):
+            if mock_purge.called:
+                break
+            time.sleep(0.01)
+    finally:
+        scheduler.stop()
+    assert mock_purge.called
+
+@patch("app.core.auth.session_purge.SessionPurgeScheduler")
+@patch("app.core.auth.session_purge.purge_expired_sessions")
+def test_purge_sessions_cli_command(mock_purge, mock_scheduler):
+    mock_purge.return_value = {"rows": 5, "batches": 1, "duration": 0.1, "skipped": False, "error": None}
+    app = Flask(__name__)
+    session_purge.init_session_purge(app)
+    # Building an app starts nothing; the repeating purge is opt-in
+    mock_scheduler.assert_not_called()
+    result = app.test_cli_runner().invoke(args=["purge-sessions", "--batch-size", "50"])
+    assert result.exit_code == 0
+    assert "Purged 5 expired sessions" in result.output
+    mock_purge.assert_called_once_with(batch_size=50, max_batches=None, pause=0.0)
+    mock_scheduler.assert_not_called()
+
+@patch("app.core.auth.session_purge.SessionPurgeScheduler")
+def test_purge_sessions_cli_every_runs_in_foreground(mock_scheduler):
+    app = Flask(__name__)
+    session_purge.init_session_purge(app)
+    result = app.test_cli_runner().invoke(args=["purge-sessions", "--every", "3600", "--batch-size", "50"])
+    assert result.exit_code == 0
+    mock_scheduler.assert_called_once_with(interval=3600.0, batch_size=50, pause=0.0)
+    mock_scheduler.return_value.run.assert_called_once()
+    assert app.test_cli_runner().invoke(args=["purge-sessions", "--every", "0"]).exit_code != 0
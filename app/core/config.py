@@ -1,10 +1,477 @@
 import os
+import queue
+import threading
+import time
+import logging
+from typing import Optional
+import mysql.connector
+from flask import g, has_app_context
+from app.core.query_stats import InstrumentedCursor, record_connection
 
-def get_db_config() -> dict:
+def get_db_config(replica: bool = False) -> Optional[dict]:
+    """
+    Connection settings for the primary, or with replica=True for the read
+    replica: None unless MYSQL_REPLICA_HOST is set, and any other
+    MYSQL_REPLICA_* value that is unset falls back to the primary's.
+    """
+    if not replica:
+        return {
+            "host": os.getenv("MYSQL_HOST"),
+            "port": os.getenv("MYSQL_PORT"),
+            "user": os.getenv("MYSQL_USER"),
+            "password": os.getenv("MYSQL_PASSWORD"),
+            "database": os.getenv("MYSQL_DATABASE")
+        }
+    host = os.getenv("MYSQL_REPLICA_HOST")
+    if not host:
+        return None
     return {
-        "host": os.getenv("MYSQL_HOST"),
-        "port": os.getenv("MYSQL_PORT"),
-        "user": os.getenv("MYSQL_USER"),
-        "password": os.getenv("MYSQL_PASSWORD"),
+        "host": host,
+        "port": os.getenv("MYSQL_REPLICA_PORT", os.getenv("MYSQL_PORT")),
+        "user": os.getenv("MYSQL_REPLICA_USER", os.getenv("MYSQL_USER")),
+        "password": os.getenv("MYSQL_REPLICA_PASSWORD", os.getenv("MYSQL_PASSWORD")),
         "database": os.getenv("MYSQL_DATABASE")
     }
+
+def get_pool_config() -> dict:
+    return {
+        "size": int(os.getenv("MYSQL_POOL_SIZE", "8")),
+        "timeout": float(os.getenv("MYSQL_POOL_TIMEOUT", "30")),
+        "recycle": float(os.getenv("MYSQL_POOL_RECYCLE", "3600")),
+        "ping_after": float(os.getenv("MYSQL_POOL_PING_AFTER", "30")),
+    }
+
+
+class PoolTimeoutError(mysql.connector.Error):
+    """Raised when no pooled connection becomes available in time."""
+
+
+class PooledConnection:
+    """
+    Thin proxy around a raw MySQL connection checked out of a ConnectionPool.
+    Everything is delegated to the raw connection except close(), which hands
+    the connection back to the pool instead of tearing it down, and cursor(),
+    whose statements are counted and timed (see query_stats).
+    """
+
+    def __init__(self, pool: 'ConnectionPool', raw, created_at: float, slots):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._slots = slots
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def is_connected(self) -> bool:
+        return self._raw is not None and self._raw.is_connected()
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._raw.cursor(*args, **kwargs))
+
+    def commit(self):
+        self._raw.commit()
+        if not self._pool.replica:
+            _note_primary_write()
+
+    def close(self):
+        if self._raw is None:
+            return
+        raw, self._raw = self._raw, None
+        self._pool._release(raw, self._created_at, self._slots)
+
+
+class ConnectionPool:
+    """
+    Per-process pool of MySQL connections.
+
+    - size: maximum number of open connections held by this process
+    - timeout: seconds to wait for a free connection before giving up
+    - recycle: connections older than this many seconds are replaced
+    - ping_after: connections idle longer than this are pinged before reuse
+    - replica: connect to the read replica (see get_db_config) instead of the primary
+    """
+
+    def __init__(self, size: int = 5, timeout: float = 30, recycle: float = 3600, ping_after: float = 30,
+                 replica: bool = False):
+        self.replica = replica
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        self._lock = threading.Lock()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self.checkouts = 0
+        self.connects = 0
+        self.recycled = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def reset(self):
+        """
+        Forget every connection held by this process. Called automatically
+        after fork so gunicorn workers never share sockets with the master.
+        """
+        with self._lock:
+            idle = self._idle
+            inherited = self._pid != os.getpid()
+            self._reset_state()
+        while True:
+            try:
+                raw, _, _ = idle.get_nowait()
+            except queue.Empty:
+                break
+            if inherited:
+                # The socket belongs to the parent; just drop our reference
+                continue
+            try:
+                raw.close()
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "checkouts": self.checkouts,
+            "connects": self.connects,
+            "recycled": self.recycled,
+            "wait_time": self.wait_time,
+            "max_wait_time": self.max_wait_time,
+        }
+
+    def get_connection(self) -> PooledConnection:
+        if self._pid != os.getpid():
+            self.reset()
+        slots = self._slots
+        started = time.monotonic()
+        if not slots.acquire(timeout=self.timeout):
+            raise PoolTimeoutError(msg=f"Timed out after {self.timeout}s waiting for a database connection")
+        waited = time.monotonic() - started
+        with self._lock:
+            self.checkouts += 1
+            self.wait_time += waited
+            self.max_wait_time = max(self.max_wait_time, waited)
+        record_connection()
+        try:
+            raw, created_at = self._checkout_raw()
+        except Exception:
+            slots.release()
+            raise
+        return PooledConnection(self, raw, created_at, slots)
+
+    def _checkout_raw(self):
+        now = time.monotonic()
+        while True:
+            try:
+                raw, created_at, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if now - created_at > self.recycle or not self._is_alive(raw, now - last_used):
+                self.recycled += 1
+                self._discard(raw)
+                continue
+            return raw, created_at
+        raw = mysql.connector.connect(**get_db_config(self.replica))
+        with self._lock:
+            self.connects += 1
+        return raw, time.monotonic()
+
+    def _is_alive(self, raw, idle_for: float) -> bool:
+        if idle_for < self.ping_after:
+            return True
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _release(self, raw, created_at: float, slots):
+        try:
+            if slots is not self._slots:
+                # Checked out before a reset (possibly in the parent process);
+                # the connection is no longer ours to reuse or to close
+                return
+            try:
+                # End any implicit transaction so the next borrower does not
+                # inherit a stale REPEATABLE READ snapshot or open locks
+                if raw.in_transaction:
+                    raw.rollback()
+            except Exception as e:
+                logging.warning(f"Discarding broken pooled connection: {e}")
+                self._discard(raw)
+                return
+            self._idle.put((raw, created_at, time.monotonic()))
+        finally:
+            slots.release()
+
+    @staticmethod
+    def _discard(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+
+_pool = None
+_replica_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(**get_pool_config())
+    return _pool
+
+def get_replica_pool() -> Optional[ConnectionPool]:
+    """Return the process-wide read replica pool, or None when no replica is configured."""
+    global _replica_pool
+    if _replica_pool is None and get_db_config(replica=True) is not None:
+        with _pool_lock:
+            if _replica_pool is None:
+                _replica_pool = ConnectionPool(**get_pool_config(), replica=True)
+    return _replica_pool
+
+def get_connection(read_only: bool = False):
+    """
+    Check out a connection. Call close() on it when done.
+
+    Inside a request this joins the request's UnitOfWork, so every model call
+    shares one connection and one transaction; otherwise it is a plain pooled
+    connection that the caller commits itself.
+
+    read_only=True is for queries that only read: they go to the read replica
+    when one is configured, unless this request has already written, in which
+    case they stay on the primary so the request always sees its own writes.
+    """
+    uow = current_unit_of_work()
+    if read_only and not _wrote_to_primary():
+        replica = get_replica_pool()
+        if replica is not None:
+            if uow is not None:
+                return uow.get_read_connection(replica)
+            return replica.get_connection()
+    if uow is not None:
+        return uow.get_connection()
+    return get_pool().get_connection()
+
+def _note_primary_write():
+    if has_app_context():
+        g.wrote_to_primary = True
+
+def _wrote_to_primary() -> bool:
+    return has_app_context() and g.get("wrote_to_primary", False)
+
+
+class UnitOfWorkConnection:
+    """
+    Connection handle given to model code inside a UnitOfWork. commit() and
+    close() are deferred to the end of the unit; rollback() poisons the whole
+    unit so nothing written earlier in the request is kept.
+    """
+
+    def __init__(self, uow: 'UnitOfWork', conn: PooledConnection):
+        self._uow = uow
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def is_connected(self) -> bool:
+        return self._conn.is_connected()
+
+    def commit(self):
+        self._uow.dirty = True
+        _note_primary_write()
+
+    def rollback(self):
+        self._uow.failed = True
+        self._conn.rollback()
+
+    def close(self):
+        pass
+
+
+class ReadConnection:
+    """
+    Handle on the UnitOfWork's replica connection given to read-only model
+    code; close() is deferred to the end of the unit.
+    """
+
+    def __init__(self, conn: PooledConnection):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def is_connected(self) -> bool:
+        return self._conn.is_connected()
+
+    def close(self):
+        pass
+
+
+class UnitOfWork:
+    """
+    One connection and one transaction shared by everything that touches the
+    database during a request. The connection is checked out lazily on first
+    use and committed or rolled back exactly once in finish(). Reads sent to
+    the replica likewise share one replica connection, returned in finish().
+    """
+
+    def __init__(self, pool: ConnectionPool = None):
+        self._pool = pool
+        self._conn = None
+        self._read_conn = None
+        self.dirty = False
+        self.failed = False
+        self.finished = False
+        self._after_commit = []
+
+    def get_connection(self) -> UnitOfWorkConnection:
+        if self._conn is None:
+            self._conn = (self._pool or get_pool()).get_connection()
+        return UnitOfWorkConnection(self, self._conn)
+
+    def get_read_connection(self, pool: ConnectionPool) -> ReadConnection:
+        if self._read_conn is None:
+            self._read_conn = pool.get_connection()
+        return ReadConnection(self._read_conn)
+
+    def after_commit(self, callback):
+        """Run callback once the unit commits; it is dropped on rollback."""
+        self._after_commit.append(callback)
+
+    def finish(self, commit: bool = True) -> bool:
+        """
+        Commit (or roll back) and return the connection to the pool.
+        Returns False if a commit was asked for but the unit's writes were
+        not kept: a model rolled back during the request, or the commit
+        itself failed.
+        """
+        if self.finished:
+            return True
+        self.finished = True
+        callbacks, self._after_commit = self._after_commit, []
+        read_conn, self._read_conn = self._read_conn, None
+        if read_conn is not None:
+            read_conn.close()
+        ok = self._end_transaction(commit)
+        if commit and self.failed:
+            return False
+        if ok and commit:
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    logging.error(f"After-commit callback failed: {e}")
+        return ok
+
+    def _end_transaction(self, commit: bool) -> bool:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return True
+        try:
+            if commit and not self.failed:
+                if self.dirty:
+                    conn.commit()
+                return True
+            conn.rollback()
+            return True
+        except mysql.connector.Error as e:
+            logging.error(f"Unit of work failed to finish: {e}")
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            return False
+        finally:
+            conn.close()
+
+
+def current_unit_of_work():
+    """Return the active request's UnitOfWork, if any."""
+    if not has_app_context():
+        return None
+    uow = g.get("unit_of_work")
+    if uow is None or uow.finished:
+        return None
+    return uow
+
+def call_after_commit(callback):
+    """
+    Run callback once the current request's writes are committed, or right
+    away when there is no active UnitOfWork. Use this to hand work to a
+    background thread that must be able to see rows written by the request.
+    """
+    uow = current_unit_of_work()
+    if uow is None:
+        callback()
+    else:
+        uow.after_commit(callback)
+
+def begin_unit_of_work():
+    """Open a new UnitOfWork for the rest of the current request."""
+    g.unit_of_work = UnitOfWork()
+
+def commit_unit_of_work() -> bool:
+    """
+    Commit the current request's writes now and end its UnitOfWork. Call it
+    before a slow step (such as a model call) so the transaction, its row
+    locks and the pooled connection are not held while it runs; queries in
+    between use their own connections until begin_unit_of_work() opens the
+    next unit. Returns False if the writes could not be committed.
+    """
+    uow = g.pop("unit_of_work", None)
+    if uow is None:
+        return True
+    return uow.finish()
+
+def rollback_unit_of_work():
+    """Roll back the current request's writes now and end its UnitOfWork."""
+    uow = g.pop("unit_of_work", None)
+    if uow is not None:
+        uow.finish(commit=False)
+
+def init_unit_of_work(app):
+    """
+    Register request hooks that open a UnitOfWork per request, commit it
+    before the response leaves (so a failed commit, or a write a model had
+    to roll back, turns into a 500), and
+    roll it back if the view raised or returned a server error.
+    """
+    @app.before_request
+    def _begin_unit_of_work():
+        begin_unit_of_work()
+
+    @app.after_request
+    def _commit_unit_of_work(response):
+        uow = g.pop("unit_of_work", None)
+        if uow is not None:
+            ok = uow.finish(commit=response.status_code < 500)
+            if not ok and response.status_code < 500:
+                response = app.response_class('{"error": "Failed to save changes"}\n',
+                                              status=500, mimetype="application/json")
+        return response
+
+    @app.teardown_request
+    def _rollback_unit_of_work(exc):
+        uow = g.pop("unit_of_work", None)
+        if uow is not None:
+            uow.finish(commit=False)
+
+def _reset_pool_after_fork():
+    for pool in (_pool, _replica_pool):
+        if pool is not None:
+            pool.reset()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
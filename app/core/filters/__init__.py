@@ -0,0 +1,3 @@
+"""
+Content filtering package
+"""
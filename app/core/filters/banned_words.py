@@ -0,0 +1,291 @@
+import threading
+import unicodedata
+from collections import deque
+from typing import Callable, Iterable, List, Optional, Tuple, Union
+from app.config.settings import BANNED_WORDS_NFKC, BANNED_WORDS_LEET, BANNED_WORDS_WHOLE_WORDS
+
+# Common look-alike substitutions, folded before matching when leet mode is on
+LEET_TABLE = str.maketrans({
+    '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't',
+    '@': 'a', '$': 's', '!': 'i', '|': 'l', '+': 't',
+})
+
+
+def normalize_text(text: str, nfkc: bool = False, leet: bool = False) -> str:
+    """Fold text the same way banned words are folded before matching."""
+    if nfkc:
+        text = unicodedata.normalize('NFKC', text)
+    text = text.casefold()
+    if leet:
+        text = text.translate(LEET_TABLE)
+    return text
+
+
+class BannedWordMatcher:
+    """
+    Aho-Corasick automaton over a fixed list of banned words. Building is
+    linear in the total length of the words; scanning is linear in the length
+    of the text no matter how many words there are.
+
+    - nfkc: apply Unicode NFKC normalization (full-width letters, ligatures...)
+    - leet: fold common leet-speak substitutions (b4d -> bad)
+    - whole_words: only match when the word is not part of a longer word
+    """
+
+    def __init__(self, words: Iterable[str], nfkc: bool = False, leet: bool = False, whole_words: bool = False):
+        self.nfkc = nfkc
+        self.leet = leet
+        self.whole_words = whole_words
+        # Node 0 is the root. _goto[n] maps a character to the next node,
+        # _fail[n] is the longest proper suffix state, and _out[n] holds the
+        # lengths of every word ending at n (including via fail links).
+        self._goto: List[dict] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+        self._depth: List[int] = [0]
+        self.size = 0
+        self.max_length = 0
+        for word in words:
+            self._add(self.normalize(word.strip()))
+        self._build()
+
+    def normalize(self, text: str) -> str:
+        return normalize_text(text, nfkc=self.nfkc, leet=self.leet)
+
+    def _add(self, word: str):
+        if not word:
+            return
+        node = 0
+        for ch in word:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+                self._depth.append(self._depth[node] + 1)
+            node = nxt
+        if len(word) not in self._out[node]:
+            self._out[node] = self._out[node] + (len(word),)
+            self.size += 1
+            self.max_length = max(self.max_length, len(word))
+
+    def _build(self):
+        # Breadth-first so every fail target is finished before it is used
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                if self._out[self._fail[child]]:
+                    self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+
+    def step(self, node: int, ch: str) -> int:
+        """Advance the automaton by one (already normalized) character."""
+        goto = self._goto
+        fail = self._fail
+        while node and ch not in goto[node]:
+            node = fail[node]
+        return goto[node].get(ch, 0)
+
+    def matches_at(self, node: int) -> Tuple[int, ...]:
+        """Lengths of the words that end at this state."""
+        return self._out[node]
+
+    def depth(self, node: int) -> int:
+        """Length of the partial match this state represents."""
+        return self._depth[node]
+
+    def find(self, text: str) -> Optional[Tuple[int, int]]:
+        """Return (start, end) of the first match in the normalized text, or None."""
+        if not self.size:
+            return None
+        folded = self.normalize(text)
+        node = 0
+        for i, ch in enumerate(folded):
+            node = self.step(node, ch)
+            for length in self._out[node]:
+                start = i + 1 - length
+                if not self.whole_words or self._is_whole_word(folded, start, i + 1):
+                    return start, i + 1
+        return None
+
+    def contains(self, text: str) -> bool:
+        return self.find(text) is not None
+
+    @staticmethod
+    def _is_whole_word(text: str, start: int, end: int) -> bool:
+        before = text[start - 1] if start > 0 else ''
+        after = text[end] if end < len(text) else ''
+        return not before.isalnum() and not after.isalnum()
+
+
+def as_matcher(banned: Union[BannedWordMatcher, Iterable[str]]) -> BannedWordMatcher:
+    """Accept either a compiled matcher or a plain list of words."""
+    if isinstance(banned, BannedWordMatcher):
+        return banned
+    return BannedWordMatcher(banned)
+
+
+def _starts_segment(prev: str, ch: str) -> bool:
+    """True if NFKC never merges ch into the character before it."""
+    if ch < '\u0300':
+        # Nothing below the combining marks composes with what precedes it
+        return True
+    if unicodedata.combining(ch):
+        return False
+    # Starters can compose too (Hangul jamo, half-width kana voicing marks)
+    nfkc = unicodedata.normalize
+    return len(nfkc('NFKC', prev + ch)) == len(nfkc('NFKC', prev)) + len(nfkc('NFKC', ch))
+
+
+def _split_segments(text: str) -> Tuple[List[str], str]:
+    """
+    Split text into runs that NFKC-normalize independently of each other.
+    The last run could still combine with text that has not arrived yet, so
+    it is returned separately as the tail to carry over.
+    """
+    segments = []
+    start = 0
+    for i in range(1, len(text)):
+        if _starts_segment(text[i - 1], text[i]):
+            segments.append(text[start:i])
+            start = i
+    return segments, text[start:]
+
+
+class BannedWordStreamScanner:
+    """
+    Scans text that arrives in chunks (e.g. streamed model output) without
+    rescanning. The automaton state carries across chunk boundaries, and any
+    trailing text that could still turn out to be the start of a banned word
+    is held back until it is proven safe.
+
+    With NFKC on, text is normalized a segment at a time (a character plus the
+    marks that combine with it) so the result matches normalizing the whole
+    text; the last segment of each chunk is carried over until the next one
+    shows it is complete.
+
+    feed() returns the text that is safe to forward; once `hit` is set nothing
+    more should be forwarded. Call finish() at the end to flush the tail.
+    """
+
+    def __init__(self, matcher: BannedWordMatcher):
+        self.matcher = matcher
+        self.hit = False
+        self._state = 0
+        # Original segments not yet released, with how many normalized
+        # characters each one produced
+        self._pending: deque = deque()
+        self._pending_norm = 0
+        # Recent normalized characters, for whole-word boundary checks
+        self._history: deque = deque(maxlen=matcher.max_length + 1)
+        # Length of a whole-word match still waiting on the next character
+        self._awaiting = 0
+        # Trailing segment not yet normalized (NFKC only)
+        self._carry = ""
+
+    def feed(self, chunk: str) -> str:
+        if self.hit:
+            return ""
+        if self.matcher.nfkc:
+            segments, self._carry = _split_segments(self._carry + chunk)
+        else:
+            segments = chunk
+        if not self._scan(segments):
+            return self._on_hit()
+        return self._release(max(self.matcher.depth(self._state), self._awaiting))
+
+    def _scan(self, segments: Iterable[str]) -> bool:
+        """Advance over the segments; False as soon as a banned word is found."""
+        matcher = self.matcher
+        for segment in segments:
+            folded = matcher.normalize(segment)
+            self._pending.append((segment, len(folded)))
+            self._pending_norm += len(folded)
+            for ch in folded:
+                if self._awaiting:
+                    if not ch.isalnum():
+                        return False
+                    self._awaiting = 0
+                self._history.append(ch)
+                self._state = matcher.step(self._state, ch)
+                for length in matcher.matches_at(self._state):
+                    if not matcher.whole_words:
+                        return False
+                    before = self._history[-length - 1] if len(self._history) > length else ''
+                    if not before.isalnum():
+                        self._awaiting = max(self._awaiting, length)
+        return True
+
+    def finish(self) -> str:
+        if self.hit:
+            return ""
+        carry, self._carry = self._carry, ""
+        if carry and not self._scan([carry]):
+            return self._on_hit()
+        if self._awaiting:
+            # End of text counts as a word boundary
+            return self._on_hit()
+        return self._release(0)
+
+    def _release(self, hold: int) -> str:
+        released = []
+        while self._pending and self._pending_norm - self._pending[0][1] >= hold:
+            c, n = self._pending.popleft()
+            self._pending_norm -= n
+            released.append(c)
+        return "".join(released)
+
+    def _on_hit(self) -> str:
+        self.hit = True
+        self._pending.clear()
+        self._pending_norm = 0
+        self._carry = ""
+        return ""
+
+
+class BannedWordMatcherCache:
+    """
+    Holds the compiled matcher for the current banned-word version. Each
+    worker builds the automaton once per version and reuses it across turns.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._matcher: Optional[BannedWordMatcher] = None
+        self.builds = 0
+
+    def get(self, version, load_words: Callable[[], List[str]]) -> BannedWordMatcher:
+        matcher = self._matcher
+        if matcher is not None and self._version == version:
+            return matcher
+        with self._lock:
+            if self._matcher is None or self._version != version:
+                self._matcher = BannedWordMatcher(
+                    load_words(),
+                    nfkc=BANNED_WORDS_NFKC,
+                    leet=BANNED_WORDS_LEET,
+                    whole_words=BANNED_WORDS_WHOLE_WORDS,
+                )
+                self._version = version
+                self.builds += 1
+            return self._matcher
+
+    def clear(self):
+        with self._lock:
+            self._version = None
+            self._matcher = None
+
+
+# Per-worker cache shared by every AI client in this process
+matcher_cache = BannedWordMatcherCache()
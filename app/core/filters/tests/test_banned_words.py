@@ -0,0 +1,125 @@
+import pytest
+from unittest.mock import MagicMock
+from app.core.filters.banned_words import BannedWordMatcher, BannedWordMatcherCache, normalize_text
+
+def test_matcher_substring_case_insensitive():
+    m = BannedWordMatcher(['Bad', 'evil'])
+    assert m.contains('This is BAD news')
+    assert m.contains('devilish')
+    assert not m.contains('This is good')
+
+def test_matcher_overlapping_words():
+    # 'she' is only found through a fail link while matching 'hers'
+    m = BannedWordMatcher(['he', 'she', 'his', 'hers'])
+    assert m.find('ushers') == (1, 4)
+    assert BannedWordMatcher(['abcd', 'bc']).contains('xabcx')
+
+def test_matcher_empty_list_and_blank_words():
+    m = BannedWordMatcher(['', '   '])
+    assert m.size == 0
+    assert not m.contains('anything')
+
+def test_matcher_whole_words():
+    m = BannedWordMatcher(['ass'], whole_words=True)
+    assert not m.contains('a class assignment')
+    assert m.contains('what an ass!')
+    assert m.contains('ass')
+
+def test_matcher_nfkc():
+    fullwidth = 'ｂａｄ'  # 'bad' in full-width letters
+    assert not BannedWordMatcher(['bad']).contains(fullwidth)
+    assert BannedWordMatcher(['bad'], nfkc=True).contains(fullwidth)
+
+def test_matcher_leet():
+    assert not BannedWordMatcher(['bad']).contains('b4d')
+    assert BannedWordMatcher(['bad'], leet=True).contains('b4d')
+
+def test_normalize_text():
+    assert normalize_text('B4D', leet=True) == 'bad'
+    assert normalize_text('ﬁne', nfkc=True) == 'fine'
+
+def test_matcher_scales_to_many_words():
+    words = [f'word{i}x' for i in range(5000)]
+    m = BannedWordMatcher(words)
+    assert m.size == 5000
+    assert m.contains('prefix word4321x suffix')
+    assert not m.contains('word4321 without the x')
+
+def test_cache_rebuilds_only_on_version_change():
+    cache = BannedWordMatcherCache()
+    load = MagicMock(return_value=['bad'])
+    first = cache.get(1, load)
+    assert cache.get(1, load) is first
+    load.assert_called_once()
+    load.return_value = ['evil']
+    second = cache.get(2, load)
+    assert second is not first
+    assert second.contains('evil') and not second.contains('bad')
+    assert cache.builds == 2
+
+# --- BannedWordStreamScanner ---
+from app.core.filters.banned_words import BannedWordStreamScanner, as_matcher
+
+def scan(chunks, matcher):
+    scanner = BannedWordStreamScanner(matcher)
+    out = []
+    for chunk in chunks:
+        out.append(scanner.feed(chunk))
+        if scanner.hit:
+            return ''.join(out), True
+    out.append(scanner.finish())
+    return ''.join(out), scanner.hit
+
+def test_scanner_passes_clean_text_through():
+    text, hit = scan(['Hello ', 'there, ', 'friend'], BannedWordMatcher(['bad']))
+    assert text == 'Hello there, friend'
+    assert not hit
+
+def test_scanner_catches_word_split_across_chunks():
+    text, hit = scan(['This is b', 'a', 'd news'], BannedWordMatcher(['bad']))
+    assert hit
+    # The partial word was held back and never forwarded
+    assert 'b' not in text.replace('This is ', '')
+
+def test_scanner_holds_back_only_possible_prefix():
+    scanner = BannedWordStreamScanner(BannedWordMatcher(['bad']))
+    assert scanner.feed('a ba') == 'a '
+    assert scanner.feed('nana') == 'banana'
+    assert scanner.finish() == ''
+
+def test_scanner_empty_matcher_releases_immediately():
+    scanner = BannedWordStreamScanner(BannedWordMatcher([]))
+    assert scanner.feed('anything') == 'anything'
+
+def test_scanner_whole_words_waits_for_boundary():
+    matcher = BannedWordMatcher(['ass'], whole_words=True)
+    assert scan(['a cl', 'ass', 'ic'], matcher) == ('a classic', False)
+    assert scan(['an ass', 'ignment'], matcher) == ('an assignment', False)
+    assert scan(['an ass', '!'], matcher)[1] is True
+    # End of the stream is a boundary too
+    assert scan(['an ', 'ass'], matcher)[1] is True
+
+def test_scanner_nfkc_joins_combining_marks_across_chunks():
+    # 'e' + COMBINING ACUTE ACCENT normalizes to 'é', as it does for the whole string
+    matcher = BannedWordMatcher(['caf\u00e9'], nfkc=True)
+    assert scan(['un cafe', '\u0301 noir'], matcher)[1] is True
+    matcher = BannedWordMatcher(['cafe'], nfkc=True)
+    assert not matcher.contains('cafe\u0301 noir')
+    assert scan(['un cafe', '\u0301 noir'], matcher) == ('un cafe\u0301 noir', False)
+    # A trailing character is only released once nothing can combine with it
+    scanner = BannedWordStreamScanner(BannedWordMatcher(['bad'], nfkc=True))
+    assert scanner.feed('e') == ''
+    assert scanner.feed('\u0301x') == 'e\u0301'
+    assert scanner.finish() == 'x'
+
+def test_scanner_stops_after_hit():
+    scanner = BannedWordStreamScanner(BannedWordMatcher(['bad']))
+    scanner.feed('bad')
+    assert scanner.hit
+    assert scanner.feed('more text') == ''
+    assert scanner.finish() == ''
+
+def test_as_matcher():
+    matcher = BannedWordMatcher(['bad'])
+    assert as_matcher(matcher) is matcher
+    assert as_matcher(['bad']).contains('bad')
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import logging
+import threading
+from typing import Optional, Tuple
+from mysql.connector import Error
+from app.config.settings import IDEMPOTENCY_KEY_TTL, IDEMPOTENCY_PENDING_TIMEOUT
+from app.core.config import get_connection, get_pool
+
+MAX_KEY_LENGTH = 255
+# Every this many claims, a worker also deletes a batch of expired keys
+CLEANUP_EVERY = 100
+CLEANUP_BATCH_SIZE = 500
+
+# Outcomes of claim()
+CLAIMED = "claimed"          # first use of the key: run the request
+DONE = "done"                # already answered: replay the stored body
+IN_PROGRESS = "in_progress"  # the first attempt is still running
+MISMATCH = "mismatch"        # key reused for a different request
+UNAVAILABLE = "unavailable"  # database error: run without protection
+
+_claims = 0
+_claims_lock = threading.Lock()
+
+
+def request_fingerprint(path: str, body: bytes) -> str:
+    """Hash identifying the request a key was first used for."""
+    return hashlib.sha256(path.encode() + b"\0" + body).hexdigest()
+
+
+def claim(user_id: int, key: str, fingerprint: str, ttl: int = IDEMPOTENCY_KEY_TTL,
+          pending_timeout: int = IDEMPOTENCY_PENDING_TIMEOUT) -> Tuple[str, Optional[dict]]:
+    """
+    Claim key for user_id, or find out what happened to it. Returns
+    (outcome, body) where body is the stored reply for DONE. A key still being
+    worked on is reported as IN_PROGRESS at once rather than waited for, so a
+    repeat does not hold a request thread; a claim older than pending_timeout
+    that never finished is taken over.
+    """
+    outcome, body = _try_claim(user_id, key, fingerprint, ttl, pending_timeout)
+    if outcome == CLAIMED:
+        _maybe_cleanup()
+    return outcome, body
+
+
+def _try_claim(user_id, key, fingerprint, ttl, pending_timeout) -> Tuple[str, Optional[dict]]:
+    # Claims use their own connection and commit at once, outside the
+    # request's unit of work, so a concurrent repeat can see them; callers end
+    # the unit first so a request never holds two pooled connections
+    connection = None
+    cursor = None
+    try:
+        connection = get_pool().get_connection()
+        cursor = connection.cursor()
+        cursor.execute("""
+            DELETE FROM idempotency_keys
+            WHERE user_id = %s AND idempotency_key = %s
+            AND (expires_at < NOW()
+                 OR (status = 'pending' AND created_at < NOW() - INTERVAL %s SECOND))
+        """, (user_id, key, pending_timeout))
+        cursor.execute("""
+            INSERT IGNORE INTO idempotency_keys (user_id, idempotency_key, request_hash, expires_at)
+            VALUES (%s, %s, %s, NOW() + INTERVAL %s SECOND)
+        """, (user_id, key, fingerprint, ttl))
+        if cursor.rowcount == 1:
+            connection.commit()
+            return CLAIMED, None
+        cursor.execute("""
+            SELECT request_hash, status, response_body FROM idempotency_keys
+            WHERE user_id = %s AND idempotency_key = %s
+        """, (user_id, key))
+        row = cursor.fetchone()
+        connection.commit()
+        if row is None:
+            # Released between our INSERT and SELECT; the caller can try again
+            return IN_PROGRESS, None
+        if row[0] != fingerprint:
+            return MISMATCH, None
+        if row[1] == "done":
+            return DONE, json.loads(row[2])
+        return IN_PROGRESS, None
+    except Error as e:
+        logging.error(f"Error claiming idempotency key: {e}")
+        if connection is not None and connection.is_connected():
+            connection.rollback()
+        return UNAVAILABLE, None
+    finally:
+        if cursor is not None:
+            cursor.close()
+        if connection is not None and connection.is_connected():
+            connection.close()
+
+
+def complete(user_id: int, key: str, body: dict) -> bool:
+    """
+    Store the reply for a claimed key. Inside a request this joins the unit of
+    work, so the reply is kept exactly when the messages it belongs to are.
+    """
+    connection = None
+    cursor = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        cursor.execute("""
+            UPDATE idempotency_keys SET status = 'done', response_body = %s
+            WHERE user_id = %s AND idempotency_key = %s
+        """, (json.dumps(body), user_id, key))
+        connection.commit()
+        return True
+    except Error as e:
+        logging.error(f"Error storing idempotent reply: {e}")
+        return False
+    finally:
+        if cursor is not None:
+            cursor.close()
+        if connection is not None and connection.is_connected():
+            connection.close()
+
+
+def release(user_id: int, key: str) -> bool:
+    """
+    Give up an unfinished claim so a retry runs the request afresh. Called
+    once the request's unit of work has ended, like claim().
+    """
+    connection = None
+    cursor = None
+    try:
+        # Own connection: the release must stick even if the request rolls back
+        connection = get_pool().get_connection()
+        cursor = connection.cursor()
+        cursor.execute("""
+            DELETE FROM idempotency_keys
+            WHERE user_id = %s AND idempotency_key = %s AND status = 'pending'
+        """, (user_id, key))
+        connection.commit()
+        return True
+    except Error as e:
+        logging.error(f"Error releasing idempotency key: {e}")
+        return False
+    finally:
+        if cursor is not None:
+            cursor.close()
+        if connection is not None and connection.is_connected():
+            connection.close()
+
+
+def _maybe_cleanup():
+    global _claims
+    with _claims_lock:
+        _claims += 1
+        if _claims % CLEANUP_EVERY:
+            return
+    purge_expired_keys()
+
+
+def purge_expired_keys(batch_size: int = CLEANUP_BATCH_SIZE) -> int:
+    """
+    Delete up to batch_size expired keys; returns how many went. Inside a
+    request this joins the unit of work rather than taking a second connection.
+    """
+    connection = None
+    cursor = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        cursor.execute(
+            "DELETE FROM idempotency_keys WHERE expires_at < NOW() ORDER BY expires_at LIMIT %s",
+            (batch_size,)
+        )
+        deleted = cursor.rowcount
+        connection.commit()
+        return deleted
+    except Error as e:
+        logging.error(f"Error purging expired idempotency keys: {e}")
+        return 0
+    finally:
+        if cursor is not None:
+            cursor.close()
+        if connection is not None and connection.is_connected():
+            connection.close()
@@ -0,0 +1,216 @@
+import logging
+import os
+import re
+import time
+from typing import List, NamedTuple, Optional
+import click
+from mysql.connector import Error
+from app.config.settings import MIGRATE_ON_STARTUP, MIGRATE_LOCK_TIMEOUT
+from app.core.config import get_connection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                              "migrations")
+
+# MySQL advisory lock so workers starting together migrate one at a time
+MIGRATION_LOCK_NAME = "kidgpt_migrations"
+
+# Errors meaning a statement's change is already in place, e.g. on installs
+# where the scripts were applied by hand before versions were recorded:
+# table exists, duplicate column, duplicate index, index/column already gone
+ALREADY_APPLIED_ERRORS = {1050, 1060, 1061, 1091}
+
+_FILENAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+class MigrationError(Exception):
+    """Raised at startup when pending migrations could not be applied."""
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    path: str
+
+
+def discover_migrations(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Return the NNNN_name.sql scripts in directory, oldest first."""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _FILENAME.match(filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    migrations.sort()
+    return migrations
+
+
+def split_statements(sql: str) -> List[str]:
+    """Split a script on semicolons outside quotes, dropping -- comments."""
+    statements = []
+    current = []
+    quote = None
+    i = 0
+    while i < len(sql):
+        ch = sql[i]
+        if quote:
+            current.append(ch)
+            if ch == "\\" and i + 1 < len(sql):
+                current.append(sql[i + 1])
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in ("'", '"', "`"):
+            quote = ch
+            current.append(ch)
+        elif sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = len(sql) if end == -1 else end
+            continue
+        elif ch == ";":
+            statements.append("".join(current).strip())
+            current = []
+        else:
+            current.append(ch)
+        i += 1
+    statements.append("".join(current).strip())
+    return [s for s in statements if s]
+
+
+def _ensure_versions_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _applied_versions(cursor) -> set:
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _apply(connection, cursor, migration: Migration):
+    with open(migration.path, encoding="utf-8") as f:
+        statements = split_statements(f.read())
+    for statement in statements:
+        try:
+            cursor.execute(statement)
+        except Error as e:
+            if e.errno not in ALREADY_APPLIED_ERRORS:
+                raise
+            logging.info(f"Migration {migration.version:04d}: already in place, skipping: {e.msg}")
+    # DDL commits implicitly; this records the version once every statement has run
+    cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                   (migration.version, migration.name))
+    connection.commit()
+
+
+def pending_migrations(directory: str = MIGRATIONS_DIR) -> Optional[List[Migration]]:
+    """Migrations not yet recorded as applied, or None if the database can't be read."""
+    connection = None
+    cursor = None
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        _ensure_versions_table(cursor)
+        applied = _applied_versions(cursor)
+        return [m for m in discover_migrations(directory) if m.version not in applied]
+    except Error as e:
+        logging.error(f"Error reading applied migrations: {e}")
+        return None
+    finally:
+        if cursor is not None:
+            cursor.close()
+        if connection is not None and connection.is_connected():
+            connection.close()
+
+
+def migrate(directory: str = MIGRATIONS_DIR, lock_timeout: float = MIGRATE_LOCK_TIMEOUT) -> dict:
+    """
+    Apply every pending migration in version order, recording each in
+    schema_migrations. Stops at the first failure. Returns
+    {"applied", "duration", "skipped", "error"}; "skipped" means the lock was
+    held by another process for longer than lock_timeout.
+    """
+    started = time.monotonic()
+    result = {"applied": [], "duration": 0.0, "skipped": False, "error": None}
+    connection = None
+    cursor = None
+    locked = False
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (MIGRATION_LOCK_NAME, lock_timeout))
+        row = cursor.fetchone()
+        locked = bool(row and row[0])
+        if not locked:
+            result["skipped"] = True
+            return result
+        _ensure_versions_table(cursor)
+        # Read after taking the lock so work done by whoever held it is seen
+        applied = _applied_versions(cursor)
+        for migration in discover_migrations(directory):
+            if migration.version in applied:
+                continue
+            logging.info(f"Applying migration {migration.version:04d}_{migration.name}")
+            _apply(connection, cursor, migration)
+            result["applied"].append(migration.version)
+        return result
+    except Error as e:
+        logging.error(f"Migration failed: {e}")
+        result["error"] = str(e)
+        if connection is not None and connection.is_connected():
+            connection.rollback()
+        return result
+    finally:
+        if locked:
+            try:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK_NAME,))
+                cursor.fetchone()
+            except Error:
+                pass
+        if cursor is not None:
+            cursor.close()
+        if connection is not None and connection.is_connected():
+            connection.close()
+        result["duration"] = time.monotonic() - started
+        if result["applied"]:
+            logging.info(f"Applied migrations {result['applied']} ({result['duration']:.2f}s)")
+
+
+def init_migrations(app):
+    """
+    Register the migrate CLI command and, unless disabled, migrate on startup.
+    A startup migration that fails or cannot get the lock raises
+    MigrationError, so the app refuses to start on a half-migrated schema.
+    """
+    @app.cli.command("migrate")
+    @click.option("--dry-run", is_flag=True, help="List pending migrations without applying them.")
+    def migrate_command(dry_run):
+        """Apply pending database migrations."""
+        if dry_run:
+            pending = pending_migrations()
+            if pending is None:
+                raise click.ClickException("Could not read applied migrations.")
+            for migration in pending:
+                click.echo(f"{migration.version:04d}_{migration.name}")
+            if not pending:
+                click.echo("Database is up to date.")
+            return
+        result = migrate()
+        if result["skipped"]:
+            raise click.ClickException("Another process is migrating; try again shortly.")
+        if result["error"]:
+            raise click.ClickException(result["error"])
+        if result["applied"]:
+            click.echo(f"Applied {len(result['applied'])} migrations ({result['duration']:.2f}s).")
+        else:
+            click.echo("Database is up to date.")
+
+    if app.config.get("MIGRATE_ON_STARTUP", MIGRATE_ON_STARTUP):
+        result = migrate()
+        if result["skipped"]:
+            raise MigrationError("Startup migrations timed out waiting for another process's migration lock")
+        if result["error"]:
+            raise MigrationError(f"Startup migrations failed: {result['error']}")
@@ -1,14 +1,19 @@
-import mysql.connector
 from typing import Optional
 from mysql.connector import Error
-from app.core.config import get_db_config
+from app.core.config import get_connection
+from app.core.model.base import Model
 import os
 from cryptography.fernet import Fernet
 
 FERNET_KEY = os.getenv('FERNET_KEY')
 fernet = Fernet(FERNET_KEY) if FERNET_KEY else None
 
-class ApiKey:
+class ApiKey(Model):
+    __slots__ = ('id', 'model_vendor', 'api_key', 'created_at', 'updated_at')
+    _fields = __slots__
+    _table = "api_keys"
+    _columns = ('model_vendor', 'api_key')
+
     def __init__(self, id: Optional[int], model_vendor: str, api_key: str, created_at: Optional[str] = None, updated_at: Optional[str] = None):
         self.id = id
         self.model_vendor = model_vendor
@@ -21,15 +26,13 @@ class ApiKey:
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM api_keys WHERE id = %s", (id,))
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {cls._select} FROM api_keys WHERE id = %s", (id,))
             data = cursor.fetchone()
             if not data:
                 return None
-            data['api_key'] = cls.decrypt_key(data['api_key'])
-            return cls(**data)
+            return cls._from_row(data)
         except Error as e:
             print(f"Error loading API key: {e}")
             return None
@@ -44,15 +47,13 @@ class ApiKey:
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM api_keys WHERE model_vendor = %s", (model_vendor,))
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {cls._select} FROM api_keys WHERE model_vendor = %s", (model_vendor,))
             data = cursor.fetchone()
             if not data:
                 return None
-            data['api_key'] = cls.decrypt_key(data['api_key'])
-            return cls(**data)
+            return cls._from_row(data)
         except Error as e:
             print(f"Error loading API key: {e}")
             return None
@@ -62,6 +63,14 @@ class ApiKey:
             if connection is not None and connection.is_connected():
                 connection.close()
 
+    @classmethod
+    def _from_row(cls, row) -> 'ApiKey':
+        # Keys are stored encrypted; objects always hold the plaintext
+        obj = cls(*row)
+        obj.api_key = cls.decrypt_key(obj.api_key)
+        obj._mark_clean()
+        return obj
+
     @staticmethod
     def encrypt_key(key: str) -> str:
         if not fernet:
@@ -81,8 +90,10 @@ class ApiKey:
 
     @classmethod
     def set_openai_key(cls, key: str) -> bool:
-        encrypted = cls.encrypt_key(key)
         obj = cls.get_by_model_vendor('openai')
+        if obj and obj.api_key == key:
+            return True
+        encrypted = cls.encrypt_key(key)
         if obj:
             obj.api_key = encrypted
             return obj.save(encrypted=True)
@@ -91,25 +102,27 @@ class ApiKey:
             return new_obj.save(encrypted=True)
 
     def save(self, encrypted=False) -> bool:
+        fields = self.dirty_fields()
+        if self.id is not None and not fields:
+            return True
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
+            connection = get_connection()
             cursor = connection.cursor()
-            key_to_store = self.api_key if encrypted else self.encrypt_key(self.api_key)
             if self.id is None:
+                key_to_store = self.api_key if encrypted else self.encrypt_key(self.api_key)
                 cursor.execute(
                     "INSERT INTO api_keys (model_vendor, api_key) VALUES (%s, %s)",
                     (self.model_vendor, key_to_store)
                 )
                 self.id = cursor.lastrowid
             else:
-                cursor.execute(
-                    "UPDATE api_keys SET model_vendor = %s, api_key = %s WHERE id = %s",
-                    (self.model_vendor, key_to_store, self.id)
-                )
+                if 'api_key' in fields and not encrypted:
+                    fields['api_key'] = self.encrypt_key(self.api_key)
+                self._update_dirty(cursor, fields)
             connection.commit()
+            self._mark_clean()
             return True
         except Error as e:
             print(f"Error saving API key: {e}")
@@ -1,9 +1,14 @@
-import mysql.connector
 from typing import Optional, List
 from mysql.connector import Error
-from app.core.config import get_db_config
+from app.core.config import get_connection
+from app.core.model.base import Model
+
+class BannedWord(Model):
+    __slots__ = ('id', 'word', 'created_at')
+    _fields = __slots__
+    _table = "banned_words"
+    _columns = ('word',)
 
-class BannedWord:
     def __init__(self, id: Optional[int], word: str, created_at: Optional[str] = None):
         self.id = id
         self.word = word
@@ -14,14 +19,13 @@ class BannedWord:
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM banned_words WHERE id = %s", (id,))
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {cls._select} FROM banned_words WHERE id = %s", (id,))
             data = cursor.fetchone()
             if not data:
                 return None
-            return cls(**data)
+            return cls._from_row(data)
         except Error as e:
             print(f"Error loading banned word: {e}")
             return None
@@ -36,11 +40,10 @@ class BannedWord:
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM banned_words")
-            words = [cls(**row) for row in cursor.fetchall()]
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {cls._select} FROM banned_words")
+            words = [cls._from_row(row) for row in cursor.fetchall()]
             return words
         except Error as e:
             print(f"Error loading banned words: {e}")
@@ -52,11 +55,12 @@ class BannedWord:
                 connection.close()
 
     def save(self) -> bool:
+        if self.id is not None and not self.is_dirty():
+            return True
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
+            connection = get_connection()
             cursor = connection.cursor()
             if self.id is None:
                 cursor.execute(
@@ -65,11 +69,9 @@ class BannedWord:
                 )
                 self.id = cursor.lastrowid
             else:
-                cursor.execute(
-                    "UPDATE banned_words SET word = %s WHERE id = %s",
-                    (self.word, self.id)
-                )
+                self._update_dirty(cursor)
             connection.commit()
+            self._mark_clean()
             return True
         except Error as e:
             print(f"Error saving banned word: {e}")
@@ -0,0 +1,116 @@
+from operator import attrgetter
+from typing import Dict, Optional, Sequence, Tuple
+
+# _saved of an object that still matches its row: no write since it was
+# loaded or saved, so no snapshot of its values has been taken yet
+_CLEAN = object()
+
+
+def _tracked(slot):
+    """Property over a writable column's slot that snapshots the object before its first write."""
+    def get(self):
+        return slot.__get__(self)
+
+    def set(self, value):
+        try:
+            clean = self._saved is _CLEAN
+        except AttributeError:
+            # Built by hand: no snapshot, written in full
+            clean = False
+        if clean:
+            self._saved = self._snapshot(self)
+        slot.__set__(self, value)
+
+    return property(get, set)
+
+
+class Model:
+    """
+    Base for the table-backed models.
+
+    Subclasses declare their columns once, in constructor order, as both
+    __slots__ and _fields, so instances carry no per-object __dict__ and rows
+    are read with plain tuple cursors: SELECT _select ... then _from_row(row).
+
+    Objects loaded from the database remember the values of their writable
+    columns (_columns), so save() can UPDATE only the columns that changed
+    since, or skip the statement when none did. The snapshot is taken lazily,
+    on the first write to one of those columns, so rows that are only read
+    (most of them) carry nothing extra. Objects built by hand with an id have
+    no snapshot and are written in full.
+    """
+    __slots__ = ("_saved",)
+    _table: str = ""
+    _fields: Tuple[str, ...] = ()
+    _columns: Tuple[str, ...] = ()
+    # Comma-separated _fields, built once per class
+    _select: str = ""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._select = ", ".join(cls._fields)
+        if cls._columns:
+            # Returns the bare value for a single column, so models like
+            # Message snapshot without allocating a tuple
+            cls._snapshot = staticmethod(attrgetter(*cls._columns))
+            for column in cls._columns:
+                slot = cls.__dict__.get(column)
+                if slot is not None and not isinstance(slot, property):
+                    setattr(cls, column, _tracked(slot))
+
+    @classmethod
+    def _select_as(cls, alias: str) -> str:
+        """_select with every column qualified by a table alias."""
+        return ", ".join(f"{alias}.{field}" for field in cls._fields)
+
+    @classmethod
+    def _from_row(cls, row: Sequence):
+        """Build an object from a tuple laid out like _fields and start tracking changes."""
+        obj = cls.__new__(cls)
+        # Set before __init__ so its column writes skip the snapshot check cheaply
+        obj._saved = None
+        obj.__init__(*row)
+        obj._saved = _CLEAN
+        return obj
+
+    def to_dict(self) -> dict:
+        """Every column as a plain dict."""
+        return {field: getattr(self, field) for field in self._fields}
+
+    def _mark_clean(self):
+        self._saved = _CLEAN
+
+    def dirty_fields(self) -> Dict[str, object]:
+        """Writable columns whose value differs from what was loaded or last saved."""
+        try:
+            saved = self._saved
+        except AttributeError:
+            return {column: getattr(self, column) for column in self._columns}
+        if saved is _CLEAN:
+            return {}
+        if len(self._columns) == 1:
+            saved = (saved,)
+        return {
+            column: getattr(self, column)
+            for column, old in zip(self._columns, saved)
+            if getattr(self, column) != old
+        }
+
+    def is_dirty(self) -> bool:
+        return bool(self.dirty_fields())
+
+    def _update_dirty(self, cursor, fields: Optional[Dict[str, object]] = None) -> bool:
+        """
+        UPDATE just the given (default: dirty) columns of this row.
+        Returns False without touching the database when there is nothing to write.
+        """
+        if fields is None:
+            fields = self.dirty_fields()
+        if not fields:
+            return False
+        assignments = ", ".join(f"{column} = %s" for column in fields)
+        cursor.execute(
+            f"UPDATE {self._table} SET {assignments} WHERE id = %s",
+            (*fields.values(), self.id)
+        )
+        return True
@@ -1,28 +1,43 @@
-import mysql.connector
-from typing import Optional, List
+from datetime import datetime
+from typing import Optional, List, Tuple
 from mysql.connector import Error
-from app.core.config import get_db_config
+from app.core.config import get_connection
+from app.core.model.base import Model
 
-class Conversation:
-    def __init__(self, id: Optional[int], user_id: int, started_at: Optional[str] = None, summary: Optional[str] = None):
+class Conversation(Model):
+    __slots__ = ('id', 'user_id', 'started_at', 'summary', 'message_count', 'last_message_at',
+                 'first_user_message_id', 'context_summary', 'context_summary_through_id')
+    _fields = __slots__
+    _table = "conversations"
+    _columns = ('user_id', 'summary')
+
+    def __init__(self, id: Optional[int], user_id: int, started_at: Optional[str] = None, summary: Optional[str] = None,
+                 message_count: int = 0, last_message_at: Optional[str] = None, first_user_message_id: Optional[int] = None,
+                 context_summary: Optional[str] = None, context_summary_through_id: Optional[int] = None):
         self.id = id
         self.user_id = user_id
         self.started_at = started_at
         self.summary = summary
+        # Maintained by Message.save(); read-only from here
+        self.message_count = message_count
+        self.last_message_at = last_message_at
+        self.first_user_message_id = first_user_message_id
+        # Rolling summary of the turns folded out of the context window
+        self.context_summary = context_summary
+        self.context_summary_through_id = context_summary_through_id
 
     @classmethod
     def get_by_id(cls, id: int) -> Optional['Conversation']:
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM conversations WHERE id = %s", (id,))
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {cls._select} FROM conversations WHERE id = %s", (id,))
             data = cursor.fetchone()
             if not data:
                 return None
-            return cls(**data)
+            return cls._from_row(data)
         except Error as e:
             print(f"Error loading conversation: {e}")
             return None
@@ -33,16 +48,35 @@ class Conversation:
                 connection.close()
 
     @classmethod
-    def get_by_user_id(cls, user_id: int) -> List['Conversation']:
+    def get_recent_by_user_id(cls, user_id: int, before: Optional[Tuple[datetime, int]] = None,
+                              limit: Optional[int] = None) -> List['Conversation']:
+        """
+        Load a user's conversations, most recently active first. before is a
+        keyset cursor, the (last_message_at, id) of the last row already shown:
+        only conversations that sort after it are returned.
+        """
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM conversations WHERE user_id = %s ORDER BY started_at DESC", (user_id,))
-            conversations = [cls(**row) for row in cursor.fetchall()]
-            return conversations
+            connection = get_connection(read_only=True)
+            cursor = connection.cursor()
+            query = f"SELECT {cls._select_as('c')} FROM conversations c WHERE c.user_id = %s"
+            params = [user_id]
+            if before is not None:
+                # Seek past the cursor values on the (user_id, last_message_at, id) index. The
+                # values travel in the cursor because the cursor row's own activity can change.
+                last_message_at, before_id = before
+                query += """
+                      AND (c.last_message_at < %s
+                           OR (c.last_message_at = %s AND c.id < %s))
+                """
+                params += [last_message_at, last_message_at, before_id]
+            query += " ORDER BY c.last_message_at DESC, c.id DESC"
+            if limit is not None:
+                query += " LIMIT %s"
+                params.append(limit)
+            cursor.execute(query, tuple(params))
+            return [cls._from_row(row) for row in cursor.fetchall()]
         except Error as e:
             print(f"Error loading conversations: {e}")
             return []
@@ -52,12 +86,96 @@ class Conversation:
             if connection is not None and connection.is_connected():
                 connection.close()
 
+    @classmethod
+    def delete_empty_by_ids(cls, ids: List[int], user_id: int) -> bool:
+        """
+        Delete several of a user's conversations in a single statement. Only
+        rows the primary still counts as empty go: the ids may come from a
+        replica page that has not seen their first message yet.
+        """
+        if not ids:
+            return True
+        connection = None
+        cursor = None
+        try:
+            connection = get_connection()
+            cursor = connection.cursor()
+            placeholders = ", ".join(["%s"] * len(ids))
+            cursor.execute(
+                f"DELETE FROM conversations WHERE user_id = %s AND message_count = 0 AND id IN ({placeholders})",
+                (user_id, *ids)
+            )
+            connection.commit()
+            return True
+        except Error as e:
+            print(f"Error deleting conversations: {e}")
+            if connection is not None and connection.is_connected():
+                connection.rollback()
+            return False
+        finally:
+            if cursor is not None:
+                cursor.close()
+            if connection is not None and connection.is_connected():
+                connection.close()
+
+    @classmethod
+    def set_summary(cls, id: int, summary: str) -> bool:
+        """Write just the summary column, e.g. from the background summarizer."""
+        connection = None
+        cursor = None
+        try:
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute("UPDATE conversations SET summary = %s WHERE id = %s", (summary, id))
+            connection.commit()
+            return True
+        except Error as e:
+            print(f"Error saving conversation summary: {e}")
+            if connection is not None and connection.is_connected():
+                connection.rollback()
+            return False
+        finally:
+            if cursor is not None:
+                cursor.close()
+            if connection is not None and connection.is_connected():
+                connection.close()
+
+    @classmethod
+    def set_context_summary(cls, id: int, summary: str, through_id: int) -> bool:
+        """
+        Store a rolling context summary covering every message up to through_id.
+        Never moves backwards, so a slow job cannot overwrite a newer summary.
+        """
+        connection = None
+        cursor = None
+        try:
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute(
+                "UPDATE conversations SET context_summary = %s, context_summary_through_id = %s "
+                "WHERE id = %s AND (context_summary_through_id IS NULL OR context_summary_through_id < %s)",
+                (summary, through_id, id, through_id)
+            )
+            connection.commit()
+            return True
+        except Error as e:
+            print(f"Error saving conversation context summary: {e}")
+            if connection is not None and connection.is_connected():
+                connection.rollback()
+            return False
+        finally:
+            if cursor is not None:
+                cursor.close()
+            if connection is not None and connection.is_connected():
+                connection.close()
+
     def save(self) -> bool:
+        if self.id is not None and not self.is_dirty():
+            return True
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
+            connection = get_connection()
             cursor = connection.cursor()
             if self.id is None:
                 cursor.execute(
@@ -66,12 +184,9 @@ class Conversation:
                 )
                 self.id = cursor.lastrowid
             else:
-                # Only user_id and summary can be updated
-                cursor.execute(
-                    "UPDATE conversations SET user_id = %s, summary = %s WHERE id = %s",
-                    (self.user_id, self.summary, self.id)
-                )
+                self._update_dirty(cursor)
             connection.commit()
+            self._mark_clean()
             return True
         except Error as e:
             print(f"Error saving conversation: {e}")
@@ -90,8 +205,7 @@ class Conversation:
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
+            connection = get_connection()
             cursor = connection.cursor()
             cursor.execute("DELETE FROM conversations WHERE id = %s", (self.id,))
             connection.commit()
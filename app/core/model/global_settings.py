@@ -1,9 +1,14 @@
-import mysql.connector
 from typing import Optional
 from mysql.connector import Error
-from app.core.config import get_db_config
+from app.core.config import get_connection
+from app.core.model.base import Model
+
+class GlobalSetting(Model):
+    __slots__ = ('id', 'setting_key', 'setting_value', 'updated_at')
+    _fields = __slots__
+    _table = "global_settings"
+    _columns = ('setting_key', 'setting_value')
 
-class GlobalSetting:
     def __init__(self, id: Optional[int], setting_key: str, setting_value: str, updated_at: Optional[str] = None):
         self.id = id
         self.setting_key = setting_key
@@ -15,14 +20,13 @@ class GlobalSetting:
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM global_settings WHERE id = %s", (id,))
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {cls._select} FROM global_settings WHERE id = %s", (id,))
             data = cursor.fetchone()
             if not data:
                 return None
-            return cls(**data)
+            return cls._from_row(data)
         except Error as e:
             print(f"Error loading global setting: {e}")
             return None
@@ -37,14 +41,13 @@ class GlobalSetting:
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM global_settings WHERE setting_key = %s", (setting_key,))
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {cls._select} FROM global_settings WHERE setting_key = %s", (setting_key,))
             data = cursor.fetchone()
             if not data:
                 return None
-            return cls(**data)
+            return cls._from_row(data)
         except Error as e:
             print(f"Error loading global setting: {e}")
             return None
@@ -55,11 +58,12 @@ class GlobalSetting:
                 connection.close()
 
     def save(self) -> bool:
+        if self.id is not None and not self.is_dirty():
+            return True
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
+            connection = get_connection()
             cursor = connection.cursor()
             if self.id is None:
                 cursor.execute(
@@ -68,11 +72,9 @@ class GlobalSetting:
                 )
                 self.id = cursor.lastrowid
             else:
-                cursor.execute(
-                    "UPDATE global_settings SET setting_key = %s, setting_value = %s WHERE id = %s",
-                    (self.setting_key, self.setting_value, self.id)
-                )
+                self._update_dirty(cursor)
             connection.commit()
+            self._mark_clean()
             return True
         except Error as e:
             print(f"Error saving global setting: {e}")
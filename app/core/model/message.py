@@ -1,9 +1,14 @@
-import mysql.connector
-from typing import Optional, List
+from typing import Optional, List, Dict
 from mysql.connector import Error
-from app.core.config import get_db_config
+from app.core.config import get_connection
+from app.core.model.base import Model
+
+class Message(Model):
+    __slots__ = ('id', 'conversation_id', 'sender', 'content', 'created_at')
+    _fields = __slots__
+    _table = "messages"
+    _columns = ('content',)
 
-class Message:
     def __init__(self, id: Optional[int], conversation_id: int, sender: str, content: str, created_at: Optional[str] = None):
         self.id = id
         self.conversation_id = conversation_id
@@ -16,14 +21,13 @@ class Message:
         connection = None
         cursor = None   
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM messages WHERE id = %s", (id,))
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {cls._select} FROM messages WHERE id = %s", (id,))
             data = cursor.fetchone()
             if not data:
                 return None
-            return cls(**data)
+            return cls._from_row(data)
         except Error as e:
             print(f"Error loading message: {e}")
             return None
@@ -34,15 +38,35 @@ class Message:
                 connection.close()
 
     @classmethod
-    def get_by_conversation_id(cls, conversation_id: int) -> List['Message']:
+    def get_by_conversation_id(cls, conversation_id: int, before_id: Optional[int] = None,
+                               limit: Optional[int] = None, after_id: Optional[int] = None,
+                               read_only: bool = False) -> List['Message']:
+        """
+        Load a conversation's messages in chronological order. With a limit,
+        only the newest `limit` messages older than before_id are returned
+        (keyset pagination over the (conversation_id, id) index). after_id
+        skips everything up to and including that message. read_only=True
+        lets a page that is only displayed come from the replica.
+        """
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM messages WHERE conversation_id = %s ORDER BY created_at ASC", (conversation_id,))
-            messages = [cls(**row) for row in cursor.fetchall()]
+            connection = get_connection(read_only=read_only)
+            cursor = connection.cursor()
+            query = f"SELECT {cls._select} FROM messages WHERE conversation_id = %s"
+            params = [conversation_id]
+            if before_id is not None:
+                query += " AND id < %s"
+                params.append(before_id)
+            if after_id is not None:
+                query += " AND id > %s"
+                params.append(after_id)
+            if limit is None:
+                cursor.execute(query + " ORDER BY id ASC", tuple(params))
+                return [cls._from_row(row) for row in cursor.fetchall()]
+            cursor.execute(query + " ORDER BY id DESC LIMIT %s", (*params, limit))
+            messages = [cls._from_row(row) for row in cursor.fetchall()]
+            messages.reverse()
             return messages
         except Error as e:
             print(f"Error loading messages: {e}")
@@ -53,12 +77,40 @@ class Message:
             if connection is not None and connection.is_connected():
                 connection.close()
 
+    @classmethod
+    def get_first_user_messages(cls, conversation_ids: List[int]) -> Dict[int, str]:
+        """Return {conversation_id: content} of the first user message in each conversation."""
+        if not conversation_ids:
+            return {}
+        connection = None
+        cursor = None
+        try:
+            connection = get_connection(read_only=True)
+            cursor = connection.cursor()
+            placeholders = ", ".join(["%s"] * len(conversation_ids))
+            cursor.execute(f"""
+                SELECT c.id AS conversation_id, m.content
+                FROM conversations c
+                JOIN messages m ON m.id = c.first_user_message_id
+                WHERE c.id IN ({placeholders})
+            """, tuple(conversation_ids))
+            return {conversation_id: content for conversation_id, content in cursor.fetchall()}
+        except Error as e:
+            print(f"Error loading first user messages: {e}")
+            return {}
+        finally:
+            if cursor is not None:
+                cursor.close()
+            if connection is not None and connection.is_connected():
+                connection.close()
+
     def save(self) -> bool:
+        if self.id is not None and not self.is_dirty():
+            return True
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
+            connection = get_connection()
             cursor = connection.cursor()
             if self.id is None:
                 cursor.execute(
@@ -66,13 +118,18 @@ class Message:
                     (self.conversation_id, self.sender, self.content)
                 )
                 self.id = cursor.lastrowid
+                # Keep the conversation's activity counters in step, in the same transaction
+                cursor.execute("""
+                    UPDATE conversations
+                    SET message_count = message_count + 1,
+                        last_message_at = CURRENT_TIMESTAMP,
+                        first_user_message_id = IF(%s = 'user' AND first_user_message_id IS NULL, %s, first_user_message_id)
+                    WHERE id = %s
+                """, (self.sender, self.id, self.conversation_id))
             else:
-                # Only content can be updated
-                cursor.execute(
-                    "UPDATE messages SET content = %s WHERE id = %s",
-                    (self.content, self.id)
-                )
+                self._update_dirty(cursor)
             connection.commit()
+            self._mark_clean()
             return True
         except Error as e:
             print(f"Error saving message: {e}")
@@ -1,9 +1,14 @@
-import mysql.connector
 from typing import Optional, List
 from mysql.connector import Error
-from app.core.config import get_db_config
+from app.core.config import get_connection
+from app.core.model.base import Model
+
+class Persona(Model):
+    __slots__ = ('id', 'name', 'system_prompt', 'created_at')
+    _fields = __slots__
+    _table = "personas"
+    _columns = ('name', 'system_prompt')
 
-class Persona:
     def __init__(self, id: Optional[int], name: str, system_prompt: str, created_at: Optional[str] = None):
         self.id = id
         self.name = name
@@ -15,14 +20,13 @@ class Persona:
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM personas WHERE id = %s", (id,))
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {cls._select} FROM personas WHERE id = %s", (id,))
             data = cursor.fetchone()
             if not data:
                 return None
-            return cls(**data)
+            return cls._from_row(data)
         except Error as e:
             print(f"Error loading persona: {e}")
             return None
@@ -37,14 +41,13 @@ class Persona:
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM personas WHERE name = %s", (name,))
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {cls._select} FROM personas WHERE name = %s", (name,))
             data = cursor.fetchone()
             if not data:
                 return None
-            return cls(**data)
+            return cls._from_row(data)
         except Error as e:
             print(f"Error loading persona: {e}")
             return None
@@ -59,11 +62,10 @@ class Persona:
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM personas ORDER BY name ASC")
-            return [cls(**row) for row in cursor.fetchall()]
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {cls._select} FROM personas ORDER BY name ASC")
+            return [cls._from_row(row) for row in cursor.fetchall()]
         except Error as e:
             print(f"Error loading personas: {e}")
             return []
@@ -74,11 +76,12 @@ class Persona:
                 connection.close()
 
     def save(self) -> bool:
+        if self.id is not None and not self.is_dirty():
+            return True
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
+            connection = get_connection()
             cursor = connection.cursor()
             if self.id is None:
                 cursor.execute(
@@ -87,11 +90,9 @@ class Persona:
                 )
                 self.id = cursor.lastrowid
             else:
-                cursor.execute(
-                    "UPDATE personas SET name = %s, system_prompt = %s WHERE id = %s",
-                    (self.name, self.system_prompt, self.id)
-                )
+                self._update_dirty(cursor)
             connection.commit()
+            self._mark_clean()
             return True
         except Error as e:
             print(f"Error saving persona: {e}")
@@ -108,8 +109,7 @@ class Persona:
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
+            connection = get_connection()
             cursor = connection.cursor()
             cursor.execute("DELETE FROM personas WHERE id = %s", (self.id,))
             connection.commit()
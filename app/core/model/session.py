@@ -1,9 +1,14 @@
-import mysql.connector
 from typing import Optional
 from mysql.connector import Error
-from app.core.config import get_db_config
+from app.core.config import get_connection
+from app.core.model.base import Model
+
+class Session(Model):
+    __slots__ = ('id', 'user_id', 'session_token', 'expires_at', 'created_at')
+    _fields = __slots__
+    _table = "sessions"
+    _columns = ('user_id', 'session_token', 'expires_at')
 
-class Session:
     def __init__(self, id: Optional[int], user_id: int, session_token: str, expires_at: str, created_at: Optional[str] = None):
         self.id = id
         self.user_id = user_id
@@ -16,14 +21,13 @@ class Session:
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM sessions WHERE id = %s", (id,))
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {cls._select} FROM sessions WHERE id = %s", (id,))
             data = cursor.fetchone()
             if not data:
                 return None
-            return cls(**data)
+            return cls._from_row(data)
         except Error as e:
             print(f"Error loading session: {e}")
             return None
@@ -38,14 +42,13 @@ class Session:
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM sessions WHERE session_token = %s", (session_token,))
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {cls._select} FROM sessions WHERE session_token = %s", (session_token,))
             data = cursor.fetchone()
             if not data:
                 return None
-            return cls(**data)
+            return cls._from_row(data)
         except Error as e:
             print(f"Error loading session: {e}")
             return None
@@ -56,11 +59,12 @@ class Session:
                 connection.close()
 
     def save(self) -> bool:
+        if self.id is not None and not self.is_dirty():
+            return True
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
+            connection = get_connection()
             cursor = connection.cursor()
             if self.id is None:
                 cursor.execute(
@@ -69,11 +73,9 @@ class Session:
                 )
                 self.id = cursor.lastrowid
             else:
-                cursor.execute(
-                    "UPDATE sessions SET user_id = %s, session_token = %s, expires_at = %s WHERE id = %s",
-                    (self.user_id, self.session_token, self.expires_at, self.id)
-                )
+                self._update_dirty(cursor)
             connection.commit()
+            self._mark_clean()
             return True
         except Error as e:
             print(f"Error saving session: {e}")
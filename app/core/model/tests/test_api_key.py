@@ -33,19 +33,16 @@ def test_encrypt_and_decrypt_key(mock_fernet, fake_fernet):
     decrypted = ApiKey.decrypt_key('encrypted_mykey')
     assert decrypted == 'mykey'
 
-@patch('app.core.model.api_key.get_db_config', return_value={})
-@patch('app.core.model.api_key.mysql.connector.connect')
+@patch('app.core.model.api_key.get_connection')
 @patch('app.core.model.api_key.fernet')
-def test_get_by_id_found(mock_fernet, mock_connect, mock_db, fake_fernet):
+def test_get_by_id_found(mock_fernet, mock_connect, fake_fernet):
     mock_fernet.decrypt.side_effect = fake_fernet.decrypt
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cursor
     mock_conn.is_connected.return_value = True
-    mock_cursor.fetchone.return_value = {
-        'id': 1, 'model_vendor': 'openai', 'api_key': 'encrypted_test', 'created_at': None, 'updated_at': None
-    }
+    mock_cursor.fetchone.return_value = (1, 'openai', 'encrypted_test', None, None)
     obj = ApiKey.get_by_id(1)
     assert obj is not None
     assert obj.id == 1
@@ -53,9 +50,8 @@ def test_get_by_id_found(mock_fernet, mock_connect, mock_db, fake_fernet):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.api_key.get_db_config', return_value={})
-@patch('app.core.model.api_key.mysql.connector.connect')
-def test_get_by_id_not_found(mock_connect, mock_db):
+@patch('app.core.model.api_key.get_connection')
+def test_get_by_id_not_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -67,25 +63,21 @@ def test_get_by_id_not_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.api_key.get_db_config', return_value={})
-@patch('app.core.model.api_key.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_get_by_id_db_error(mock_connect, mock_db):
+@patch('app.core.model.api_key.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_get_by_id_db_error(mock_connect):
     obj = ApiKey.get_by_id(1)
     assert obj is None
 
-@patch('app.core.model.api_key.get_db_config', return_value={})
-@patch('app.core.model.api_key.mysql.connector.connect')
+@patch('app.core.model.api_key.get_connection')
 @patch('app.core.model.api_key.fernet')
-def test_get_by_model_vendor_found(mock_fernet, mock_connect, mock_db, fake_fernet):
+def test_get_by_model_vendor_found(mock_fernet, mock_connect, fake_fernet):
     mock_fernet.decrypt.side_effect = fake_fernet.decrypt
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cursor
     mock_conn.is_connected.return_value = True
-    mock_cursor.fetchone.return_value = {
-        'id': 2, 'model_vendor': 'anthropic', 'api_key': 'encrypted_key', 'created_at': None, 'updated_at': None
-    }
+    mock_cursor.fetchone.return_value = (2, 'anthropic', 'encrypted_key', None, None)
     obj = ApiKey.get_by_model_vendor('anthropic')
     assert obj is not None
     assert obj.model_vendor == 'anthropic'
@@ -93,9 +85,8 @@ def test_get_by_model_vendor_found(mock_fernet, mock_connect, mock_db, fake_fern
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.api_key.get_db_config', return_value={})
-@patch('app.core.model.api_key.mysql.connector.connect')
-def test_get_by_model_vendor_not_found(mock_connect, mock_db):
+@patch('app.core.model.api_key.get_connection')
+def test_get_by_model_vendor_not_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -107,9 +98,8 @@ def test_get_by_model_vendor_not_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.api_key.get_db_config', return_value={})
-@patch('app.core.model.api_key.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_get_by_model_vendor_db_error(mock_connect, mock_db):
+@patch('app.core.model.api_key.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_get_by_model_vendor_db_error(mock_connect):
     obj = ApiKey.get_by_model_vendor('none')
     assert obj is None
 
@@ -144,10 +134,9 @@ def test_set_openai_key_new(mock_fernet, mock_save, mock_get_by_vendor, fake_fer
     assert result is True
     mock_save.assert_called_once_with(encrypted=True)
 
-@patch('app.core.model.api_key.get_db_config', return_value={})
-@patch('app.core.model.api_key.mysql.connector.connect')
+@patch('app.core.model.api_key.get_connection')
 @patch('app.core.model.api_key.fernet')
-def test_save_insert(mock_fernet, mock_connect, mock_db, fake_fernet):
+def test_save_insert(mock_fernet, mock_connect, fake_fernet):
     mock_fernet.encrypt.side_effect = fake_fernet.encrypt
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
@@ -162,10 +151,9 @@ def test_save_insert(mock_fernet, mock_connect, mock_db, fake_fernet):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.api_key.get_db_config', return_value={})
-@patch('app.core.model.api_key.mysql.connector.connect')
+@patch('app.core.model.api_key.get_connection')
 @patch('app.core.model.api_key.fernet')
-def test_save_update(mock_fernet, mock_connect, mock_db, fake_fernet):
+def test_save_update(mock_fernet, mock_connect, fake_fernet):
     mock_fernet.encrypt.side_effect = fake_fernet.encrypt
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
@@ -178,9 +166,8 @@ def test_save_update(mock_fernet, mock_connect, mock_db, fake_fernet):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.api_key.get_db_config', return_value={})
-@patch('app.core.model.api_key.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_save_db_error(mock_connect, mock_db):
+@patch('app.core.model.api_key.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_save_db_error(mock_connect):
     obj = ApiKey(id=None, model_vendor='openai', api_key='mykey')
     result = obj.save()
     assert result is False 
\ No newline at end of file
@@ -3,15 +3,14 @@ from unittest.mock import patch, MagicMock
 from app.core.model.banned_word import BannedWord
 import mysql.connector
 
-@patch('app.core.model.banned_word.get_db_config', return_value={})
-@patch('app.core.model.banned_word.mysql.connector.connect')
-def test_get_by_id_found(mock_connect, mock_db):
+@patch('app.core.model.banned_word.get_connection')
+def test_get_by_id_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cursor
     mock_conn.is_connected.return_value = True
-    mock_cursor.fetchone.return_value = {'id': 1, 'word': 'badword', 'created_at': None}
+    mock_cursor.fetchone.return_value = (1, 'badword', None)
     obj = BannedWord.get_by_id(1)
     assert obj is not None
     assert obj.id == 1
@@ -19,9 +18,8 @@ def test_get_by_id_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.banned_word.get_db_config', return_value={})
-@patch('app.core.model.banned_word.mysql.connector.connect')
-def test_get_by_id_not_found(mock_connect, mock_db):
+@patch('app.core.model.banned_word.get_connection')
+def test_get_by_id_not_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -33,41 +31,39 @@ def test_get_by_id_not_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.banned_word.get_db_config', return_value={})
-@patch('app.core.model.banned_word.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_get_by_id_db_error(mock_connect, mock_db):
+@patch('app.core.model.banned_word.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_get_by_id_db_error(mock_connect):
     obj = BannedWord.get_by_id(1)
     assert obj is None
 
-@patch('app.core.model.banned_word.get_db_config', return_value={})
-@patch('app.core.model.banned_word.mysql.connector.connect')
-def test_get_all_found(mock_connect, mock_db):
+@patch('app.core.model.banned_word.get_connection')
+def test_get_all_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cursor
     mock_conn.is_connected.return_value = True
     mock_cursor.fetchall.return_value = [
-        {'id': 1, 'word': 'badword', 'created_at': None},
-        {'id': 2, 'word': 'worseword', 'created_at': None}
+        (1, 'badword', None),
+        (2, 'worseword', None)
     ]
     words = BannedWord.get_all()
     assert isinstance(words, list)
     assert len(words) == 2
     assert words[0].word == 'badword'
     assert words[1].word == 'worseword'
+    # Fills the matcher cache, so it must read the primary the settings version comes from
+    mock_connect.assert_called_once_with()
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.banned_word.get_db_config', return_value={})
-@patch('app.core.model.banned_word.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_get_all_db_error(mock_connect, mock_db):
+@patch('app.core.model.banned_word.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_get_all_db_error(mock_connect):
     words = BannedWord.get_all()
     assert words == []
 
-@patch('app.core.model.banned_word.get_db_config', return_value={})
-@patch('app.core.model.banned_word.mysql.connector.connect')
-def test_save_insert(mock_connect, mock_db):
+@patch('app.core.model.banned_word.get_connection')
+def test_save_insert(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -81,9 +77,8 @@ def test_save_insert(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.banned_word.get_db_config', return_value={})
-@patch('app.core.model.banned_word.mysql.connector.connect')
-def test_save_update(mock_connect, mock_db):
+@patch('app.core.model.banned_word.get_connection')
+def test_save_update(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -95,9 +90,8 @@ def test_save_update(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.banned_word.get_db_config', return_value={})
-@patch('app.core.model.banned_word.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_save_db_error(mock_connect, mock_db):
+@patch('app.core.model.banned_word.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_save_db_error(mock_connect):
     obj = BannedWord(id=None, word='badword')
     result = obj.save()
     assert result is False 
\ No newline at end of file
@@ -0,0 +1,124 @@
+import copy
+import pytest
+from unittest.mock import patch, MagicMock
+from app.core.model import base
+from app.core.model.conversation import Conversation
+from app.core.model.api_key import ApiKey
+from app.core.model.user import User
+
+
+def _mock_connection(mock_connect):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connect.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_conn.is_connected.return_value = True
+    return mock_conn, mock_cursor
+
+
+def _loaded_user():
+    return User._from_row((7, 'kid', 'Kid', 'h', 'child', 0, None))
+
+
+def test_loaded_object_starts_clean():
+    conv = Conversation._from_row((1, 2, None, 'hi', None, None, None, None, None))
+    assert not conv.is_dirty()
+    conv.summary = 'hello'
+    assert conv.dirty_fields() == {'summary': 'hello'}
+    conv.summary = 'hi'
+    assert not conv.is_dirty()
+
+
+def test_snapshot_is_taken_on_first_write():
+    conv = Conversation._from_row((1, 2, None, 'hi', None, None, None, None, None))
+    # Rows that are only read carry no snapshot
+    assert conv._saved is base._CLEAN
+    conv.summary = 'hello'
+    conv.summary = 'hey'
+    assert conv._saved == (2, 'hi')
+    assert conv.dirty_fields() == {'summary': 'hey'}
+
+
+def test_copy_keeps_tracking_state():
+    user = copy.copy(_loaded_user())
+    assert not user.is_dirty()
+    user.text_name = 'Kiddo'
+    assert user.dirty_fields() == {'text_name': 'Kiddo'}
+
+
+def test_hand_built_object_is_fully_dirty():
+    conv = Conversation(id=1, user_id=2, summary='hi')
+    assert conv.dirty_fields() == {'user_id': 2, 'summary': 'hi'}
+
+
+def test_to_dict_hides_tracking_state():
+    conv = Conversation._from_row((1, 2, None, 'hi', None, None, None, None, None))
+    assert '_saved' not in conv.to_dict()
+    assert conv.to_dict()['summary'] == 'hi'
+
+
+def test_models_have_no_instance_dict():
+    conv = Conversation._from_row((1, 2, None, 'hi', 0, None, None, None, None))
+    assert not hasattr(conv, '__dict__')
+    assert not hasattr(_loaded_user(), '__dict__')
+
+
+def test_select_list_matches_fields():
+    assert Conversation._select.startswith('id, user_id, started_at, summary')
+    assert Conversation._select_as('c').split(', ')[1] == 'c.user_id'
+
+
+@patch('app.core.model.conversation.get_connection')
+def test_save_clean_object_skips_database(mock_connect):
+    conv = Conversation._from_row((1, 2, None, 'hi', None, None, None, None, None))
+    assert conv.save() is True
+    mock_connect.assert_not_called()
+
+
+@patch('app.core.model.conversation.get_connection')
+def test_save_updates_only_dirty_columns(mock_connect):
+    mock_conn, mock_cursor = _mock_connection(mock_connect)
+    conv = Conversation._from_row((1, 2, None, 'hi', None, None, None, None, None))
+    conv.summary = 'hello'
+    assert conv.save() is True
+    mock_cursor.execute.assert_called_once_with(
+        "UPDATE conversations SET summary = %s WHERE id = %s", ('hello', 1))
+    mock_conn.commit.assert_called_once()
+    # Saved values become the new baseline
+    assert not conv.is_dirty()
+    assert conv.save() is True
+    assert mock_connect.call_count == 1
+
+
+@patch('app.core.model.user.get_connection')
+def test_user_save_skips_user_roles_when_role_unchanged(mock_connect):
+    mock_conn, mock_cursor = _mock_connection(mock_connect)
+    user = _loaded_user()
+    user.password_hash = 'new'
+    assert user.save() is True
+    mock_cursor.execute.assert_called_once_with(
+        "UPDATE users SET password_hash = %s WHERE id = %s", ('new', 7))
+
+
+@patch('app.core.model.user.get_connection')
+def test_user_save_role_change_only_touches_user_roles(mock_connect):
+    mock_conn, mock_cursor = _mock_connection(mock_connect)
+    mock_cursor.fetchone.return_value = ('child',)
+    user = _loaded_user()
+    user.role = 'user-parent'
+    assert user.save() is True
+    statements = [c[0][0] for c in mock_cursor.execute.call_args_list]
+    assert not any('UPDATE users' in sql for sql in statements)
+    assert any('UPDATE user_roles' in sql for sql in statements)
+
+
+@patch('app.core.model.api_key.get_connection')
+@patch.object(ApiKey, 'encrypt_key', side_effect=lambda key: f'enc:{key}')
+@patch.object(ApiKey, 'decrypt_key', side_effect=lambda token: token)
+def test_api_key_update_encrypts_dirty_key(mock_decrypt, mock_encrypt, mock_connect):
+    mock_conn, mock_cursor = _mock_connection(mock_connect)
+    obj = ApiKey._from_row((3, 'openai', 'old', None, None))
+    obj.api_key = 'new'
+    assert obj.save() is True
+    mock_cursor.execute.assert_called_once_with(
+        "UPDATE api_keys SET api_key = %s WHERE id = %s", ('enc:new', 3))
@@ -1,17 +1,17 @@
 import pytest
+from datetime import datetime
 from unittest.mock import patch, MagicMock
 from app.core.model.conversation import Conversation
 import mysql.connector
 
-@patch('app.core.model.conversation.get_db_config', return_value={})
-@patch('app.core.model.conversation.mysql.connector.connect')
-def test_get_by_id_found(mock_connect, mock_db):
+@patch('app.core.model.conversation.get_connection')
+def test_get_by_id_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cursor
     mock_conn.is_connected.return_value = True
-    mock_cursor.fetchone.return_value = {'id': 1, 'user_id': 2, 'started_at': '2024-01-01', 'summary': 'test'}
+    mock_cursor.fetchone.return_value = (1, 2, '2024-01-01', 'test', None, None, None, None, None)
     obj = Conversation.get_by_id(1)
     assert obj is not None
     assert obj.id == 1
@@ -20,9 +20,8 @@ def test_get_by_id_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.conversation.get_db_config', return_value={})
-@patch('app.core.model.conversation.mysql.connector.connect')
-def test_get_by_id_not_found(mock_connect, mock_db):
+@patch('app.core.model.conversation.get_connection')
+def test_get_by_id_not_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -34,41 +33,13 @@ def test_get_by_id_not_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.conversation.get_db_config', return_value={})
-@patch('app.core.model.conversation.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_get_by_id_db_error(mock_connect, mock_db):
+@patch('app.core.model.conversation.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_get_by_id_db_error(mock_connect):
     obj = Conversation.get_by_id(1)
     assert obj is None
 
-@patch('app.core.model.conversation.get_db_config', return_value={})
-@patch('app.core.model.conversation.mysql.connector.connect')
-def test_get_by_user_id_found(mock_connect, mock_db):
-    mock_conn = MagicMock()
-    mock_cursor = MagicMock()
-    mock_connect.return_value = mock_conn
-    mock_conn.cursor.return_value = mock_cursor
-    mock_conn.is_connected.return_value = True
-    mock_cursor.fetchall.return_value = [
-        {'id': 1, 'user_id': 2, 'started_at': '2024-01-01', 'summary': 'test'},
-        {'id': 2, 'user_id': 2, 'started_at': '2024-01-02', 'summary': 'test2'}
-    ]
-    conversations = Conversation.get_by_user_id(2)
-    assert isinstance(conversations, list)
-    assert len(conversations) == 2
-    assert conversations[0].id == 1
-    assert conversations[1].id == 2
-    mock_cursor.close.assert_called_once()
-    mock_conn.close.assert_called_once()
-
-@patch('app.core.model.conversation.get_db_config', return_value={})
-@patch('app.core.model.conversation.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_get_by_user_id_db_error(mock_connect, mock_db):
-    conversations = Conversation.get_by_user_id(2)
-    assert conversations == []
-
-@patch('app.core.model.conversation.get_db_config', return_value={})
-@patch('app.core.model.conversation.mysql.connector.connect')
-def test_save_insert(mock_connect, mock_db):
+@patch('app.core.model.conversation.get_connection')
+def test_save_insert(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -82,9 +53,8 @@ def test_save_insert(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.conversation.get_db_config', return_value={})
-@patch('app.core.model.conversation.mysql.connector.connect')
-def test_save_update(mock_connect, mock_db):
+@patch('app.core.model.conversation.get_connection')
+def test_save_update(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -96,16 +66,14 @@ def test_save_update(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.conversation.get_db_config', return_value={})
-@patch('app.core.model.conversation.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_save_db_error(mock_connect, mock_db):
+@patch('app.core.model.conversation.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_save_db_error(mock_connect):
     obj = Conversation(id=None, user_id=2, summary='test')
     result = obj.save()
     assert result is False
 
-@patch('app.core.model.conversation.get_db_config', return_value={})
-@patch('app.core.model.conversation.mysql.connector.connect')
-def test_delete_success(mock_connect, mock_db):
+@patch('app.core.model.conversation.get_connection')
+def test_delete_success(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -117,16 +85,96 @@ def test_delete_success(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.conversation.get_db_config', return_value={})
-@patch('app.core.model.conversation.mysql.connector.connect')
-def test_delete_no_id(mock_connect, mock_db):
+@patch('app.core.model.conversation.get_connection')
+def test_delete_no_id(mock_connect):
     obj = Conversation(id=None, user_id=2, summary='test')
     result = obj.delete()
     assert result is False
 
-@patch('app.core.model.conversation.get_db_config', return_value={})
-@patch('app.core.model.conversation.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_delete_db_error(mock_connect, mock_db):
+@patch('app.core.model.conversation.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_delete_db_error(mock_connect):
     obj = Conversation(id=5, user_id=2, summary='test')
     result = obj.delete()
-    assert result is False 
\ No newline at end of file
+    assert result is False 
+@patch('app.core.model.conversation.get_connection')
+def test_get_recent_by_user_id(mock_connect):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connect.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_conn.is_connected.return_value = True
+    mock_cursor.fetchall.return_value = [
+        (2, 1, None, None, 0, None, None, None, None),
+        (1, 1, None, 'hi', 4, None, 7, None, None)
+    ]
+    objs = Conversation.get_recent_by_user_id(1)
+    assert [o.message_count for o in objs] == [0, 4]
+    mock_cursor.execute.assert_called_once()
+    mock_conn.close.assert_called_once()
+
+@patch('app.core.model.conversation.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_get_recent_by_user_id_db_error(mock_connect):
+    assert Conversation.get_recent_by_user_id(1) == []
+
+@patch('app.core.model.conversation.get_connection')
+def test_delete_empty_by_ids_single_statement(mock_connect):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connect.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_conn.is_connected.return_value = True
+    result = Conversation.delete_empty_by_ids([3, 4, 5], user_id=1)
+    assert result is True
+    mock_cursor.execute.assert_called_once()
+    sql, params = mock_cursor.execute.call_args[0]
+    assert 'IN (%s, %s, %s)' in sql
+    assert 'message_count = 0' in sql
+    assert params == (1, 3, 4, 5)
+    mock_conn.commit.assert_called_once()
+
+@patch('app.core.model.conversation.get_connection')
+def test_delete_empty_by_ids_no_ids(mock_connect):
+    assert Conversation.delete_empty_by_ids([], user_id=1) is True
+    mock_connect.assert_not_called()
+
+@patch('app.core.model.conversation.get_connection')
+def test_get_recent_by_user_id_page(mock_connect):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connect.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_conn.is_connected.return_value = True
+    mock_cursor.fetchall.return_value = []
+    seen = datetime(2026, 10, 17, 9, 30)
+    assert Conversation.get_recent_by_user_id(1, before=(seen, 7), limit=31) == []
+    sql, params = mock_cursor.execute.call_args[0]
+    assert 'JOIN' not in sql
+    assert 'c.last_message_at < %s' in sql
+    assert sql.rstrip().endswith('LIMIT %s')
+    assert params == (1, seen, seen, 7, 31)
+
+@patch('app.core.model.conversation.get_connection')
+def test_set_summary(mock_connect):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connect.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_conn.is_connected.return_value = True
+    assert Conversation.set_summary(4, 'Dinosaur facts') is True
+    sql, params = mock_cursor.execute.call_args[0]
+    assert sql.startswith('UPDATE conversations SET summary')
+    assert params == ('Dinosaur facts', 4)
+    mock_conn.commit.assert_called_once()
+
+@patch('app.core.model.conversation.get_connection')
+def test_set_context_summary_only_moves_forward(mock_connect):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connect.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_conn.is_connected.return_value = True
+    assert Conversation.set_context_summary(4, 'Likes dinosaurs.', 12) is True
+    sql, params = mock_cursor.execute.call_args[0]
+    assert 'context_summary_through_id < %s' in sql
+    assert params == ('Likes dinosaurs.', 12, 4, 12)
+    mock_conn.commit.assert_called_once()
@@ -3,15 +3,14 @@ from unittest.mock import patch, MagicMock
 from app.core.model.message import Message
 import mysql.connector
 
-@patch('app.core.model.message.get_db_config', return_value={})
-@patch('app.core.model.message.mysql.connector.connect')
-def test_get_by_id_found(mock_connect, mock_db):
+@patch('app.core.model.message.get_connection')
+def test_get_by_id_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cursor
     mock_conn.is_connected.return_value = True
-    mock_cursor.fetchone.return_value = {'id': 1, 'conversation_id': 2, 'sender': 'user', 'content': 'hi', 'created_at': None}
+    mock_cursor.fetchone.return_value = (1, 2, 'user', 'hi', None)
     obj = Message.get_by_id(1)
     assert obj is not None
     assert obj.id == 1
@@ -21,9 +20,8 @@ def test_get_by_id_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.message.get_db_config', return_value={})
-@patch('app.core.model.message.mysql.connector.connect')
-def test_get_by_id_not_found(mock_connect, mock_db):
+@patch('app.core.model.message.get_connection')
+def test_get_by_id_not_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -35,23 +33,21 @@ def test_get_by_id_not_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.message.get_db_config', return_value={})
-@patch('app.core.model.message.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_get_by_id_db_error(mock_connect, mock_db):
+@patch('app.core.model.message.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_get_by_id_db_error(mock_connect):
     obj = Message.get_by_id(1)
     assert obj is None
 
-@patch('app.core.model.message.get_db_config', return_value={})
-@patch('app.core.model.message.mysql.connector.connect')
-def test_get_by_conversation_id_found(mock_connect, mock_db):
+@patch('app.core.model.message.get_connection')
+def test_get_by_conversation_id_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cursor
     mock_conn.is_connected.return_value = True
     mock_cursor.fetchall.return_value = [
-        {'id': 1, 'conversation_id': 2, 'sender': 'user', 'content': 'hi', 'created_at': None},
-        {'id': 2, 'conversation_id': 2, 'sender': 'bot', 'content': 'hello', 'created_at': None}
+        (1, 2, 'user', 'hi', None),
+        (2, 2, 'bot', 'hello', None)
     ]
     objs = Message.get_by_conversation_id(2)
     assert isinstance(objs, list)
@@ -61,15 +57,13 @@ def test_get_by_conversation_id_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.message.get_db_config', return_value={})
-@patch('app.core.model.message.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_get_by_conversation_id_db_error(mock_connect, mock_db):
+@patch('app.core.model.message.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_get_by_conversation_id_db_error(mock_connect):
     objs = Message.get_by_conversation_id(2)
     assert objs == []
 
-@patch('app.core.model.message.get_db_config', return_value={})
-@patch('app.core.model.message.mysql.connector.connect')
-def test_save_insert(mock_connect, mock_db):
+@patch('app.core.model.message.get_connection')
+def test_save_insert(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -83,9 +77,8 @@ def test_save_insert(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.message.get_db_config', return_value={})
-@patch('app.core.model.message.mysql.connector.connect')
-def test_save_update(mock_connect, mock_db):
+@patch('app.core.model.message.get_connection')
+def test_save_update(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -97,9 +90,96 @@ def test_save_update(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.message.get_db_config', return_value={})
-@patch('app.core.model.message.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_save_db_error(mock_connect, mock_db):
+@patch('app.core.model.message.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_save_db_error(mock_connect):
     obj = Message(id=None, conversation_id=2, sender='user', content='hi')
     result = obj.save()
-    assert result is False 
\ No newline at end of file
+    assert result is False 
+@patch('app.core.model.message.get_connection')
+def test_get_first_user_messages(mock_connect):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connect.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_conn.is_connected.return_value = True
+    mock_cursor.fetchall.return_value = [
+        (2, 'hi'),
+        (3, 'hello')
+    ]
+    result = Message.get_first_user_messages([2, 3, 4])
+    assert result == {2: 'hi', 3: 'hello'}
+    mock_cursor.execute.assert_called_once()
+    mock_conn.close.assert_called_once()
+
+@patch('app.core.model.message.get_connection')
+def test_get_first_user_messages_no_ids(mock_connect):
+    assert Message.get_first_user_messages([]) == {}
+    mock_connect.assert_not_called()
+
+@patch('app.core.model.message.get_connection')
+def test_save_insert_updates_conversation_counters(mock_connect):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connect.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_conn.is_connected.return_value = True
+    mock_cursor.lastrowid = 42
+    obj = Message(id=None, conversation_id=2, sender='user', content='hi')
+    assert obj.save() is True
+    assert mock_cursor.execute.call_count == 2
+    sql, params = mock_cursor.execute.call_args_list[1][0]
+    assert 'message_count = message_count + 1' in sql
+    assert params == ('user', 42, 2)
+    mock_conn.commit.assert_called_once()
+
+@patch('app.core.model.message.get_connection')
+def test_save_update_leaves_counters_alone(mock_connect):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connect.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_conn.is_connected.return_value = True
+    obj = Message(id=5, conversation_id=2, sender='user', content='edited')
+    assert obj.save() is True
+    mock_cursor.execute.assert_called_once()
+
+@patch('app.core.model.message.get_connection')
+def test_get_by_conversation_id_page(mock_connect):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connect.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_conn.is_connected.return_value = True
+    # Newest first from the database; returned oldest first
+    mock_cursor.fetchall.return_value = [
+        (9, 2, 'assistant', 'b', None),
+        (8, 2, 'user', 'a', None)
+    ]
+    objs = Message.get_by_conversation_id(2, before_id=10, limit=2)
+    assert [o.id for o in objs] == [8, 9]
+    sql, params = mock_cursor.execute.call_args[0]
+    assert 'id < %s' in sql
+    assert 'ORDER BY id DESC LIMIT %s' in sql
+    assert params == (2, 10, 2)
+
+@patch('app.core.model.message.get_connection')
+def test_get_by_conversation_id_after_id(mock_connect):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connect.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_conn.is_connected.return_value = True
+    mock_cursor.fetchall.return_value = []
+    assert Message.get_by_conversation_id(2, after_id=10) == []
+    sql, params = mock_cursor.execute.call_args[0]
+    assert 'id > %s' in sql
+    assert sql.rstrip().endswith('ORDER BY id ASC')
+    assert params == (2, 10)
+
+@patch('app.core.model.message.get_connection')
+def test_get_by_conversation_id_reads_primary_unless_read_only(mock_connect):
+    mock_connect.return_value.cursor.return_value.fetchall.return_value = []
+    Message.get_by_conversation_id(2)
+    mock_connect.assert_called_with(read_only=False)
+    Message.get_by_conversation_id(2, limit=10, read_only=True)
+    mock_connect.assert_called_with(read_only=True)
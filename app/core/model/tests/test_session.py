@@ -3,15 +3,14 @@ from unittest.mock import patch, MagicMock
 from app.core.model.session import Session
 import mysql.connector
 
-@patch('app.core.model.session.get_db_config', return_value={})
-@patch('app.core.model.session.mysql.connector.connect')
-def test_get_by_id_found(mock_connect, mock_db):
+@patch('app.core.model.session.get_connection')
+def test_get_by_id_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cursor
     mock_conn.is_connected.return_value = True
-    mock_cursor.fetchone.return_value = {'id': 1, 'user_id': 2, 'session_token': 'abc', 'expires_at': '2024-01-01', 'created_at': None}
+    mock_cursor.fetchone.return_value = (1, 2, 'abc', '2024-01-01', None)
     obj = Session.get_by_id(1)
     assert obj is not None
     assert obj.id == 1
@@ -21,9 +20,8 @@ def test_get_by_id_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.session.get_db_config', return_value={})
-@patch('app.core.model.session.mysql.connector.connect')
-def test_get_by_id_not_found(mock_connect, mock_db):
+@patch('app.core.model.session.get_connection')
+def test_get_by_id_not_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -35,21 +33,19 @@ def test_get_by_id_not_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.session.get_db_config', return_value={})
-@patch('app.core.model.session.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_get_by_id_db_error(mock_connect, mock_db):
+@patch('app.core.model.session.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_get_by_id_db_error(mock_connect):
     obj = Session.get_by_id(1)
     assert obj is None
 
-@patch('app.core.model.session.get_db_config', return_value={})
-@patch('app.core.model.session.mysql.connector.connect')
-def test_get_by_session_token_found(mock_connect, mock_db):
+@patch('app.core.model.session.get_connection')
+def test_get_by_session_token_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cursor
     mock_conn.is_connected.return_value = True
-    mock_cursor.fetchone.return_value = {'id': 2, 'user_id': 3, 'session_token': 'def', 'expires_at': '2024-01-02', 'created_at': None}
+    mock_cursor.fetchone.return_value = (2, 3, 'def', '2024-01-02', None)
     obj = Session.get_by_session_token('def')
     assert obj is not None
     assert obj.session_token == 'def'
@@ -57,9 +53,8 @@ def test_get_by_session_token_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.session.get_db_config', return_value={})
-@patch('app.core.model.session.mysql.connector.connect')
-def test_get_by_session_token_not_found(mock_connect, mock_db):
+@patch('app.core.model.session.get_connection')
+def test_get_by_session_token_not_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -71,15 +66,13 @@ def test_get_by_session_token_not_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.session.get_db_config', return_value={})
-@patch('app.core.model.session.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_get_by_session_token_db_error(mock_connect, mock_db):
+@patch('app.core.model.session.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_get_by_session_token_db_error(mock_connect):
     obj = Session.get_by_session_token('def')
     assert obj is None
 
-@patch('app.core.model.session.get_db_config', return_value={})
-@patch('app.core.model.session.mysql.connector.connect')
-def test_save_insert(mock_connect, mock_db):
+@patch('app.core.model.session.get_connection')
+def test_save_insert(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -93,9 +86,8 @@ def test_save_insert(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.session.get_db_config', return_value={})
-@patch('app.core.model.session.mysql.connector.connect')
-def test_save_update(mock_connect, mock_db):
+@patch('app.core.model.session.get_connection')
+def test_save_update(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -107,9 +99,8 @@ def test_save_update(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.session.get_db_config', return_value={})
-@patch('app.core.model.session.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_save_db_error(mock_connect, mock_db):
+@patch('app.core.model.session.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_save_db_error(mock_connect):
     obj = Session(id=None, user_id=2, session_token='abc', expires_at='2024-01-01')
     result = obj.save()
     assert result is False 
\ No newline at end of file
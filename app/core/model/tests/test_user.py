@@ -3,18 +3,14 @@ from unittest.mock import patch, MagicMock
 from app.core.model.user import User
 import mysql.connector
 
-@patch('app.core.model.user.get_db_config', return_value={})
-@patch('app.core.model.user.mysql.connector.connect')
-def test_get_by_id_found(mock_connect, mock_db):
+@patch('app.core.model.user.get_connection')
+def test_get_by_id_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cursor
     mock_conn.is_connected.return_value = True
-    mock_cursor.fetchone.return_value = {
-        'id': 1, 'username': 'alice', 'text_name': 'Alice', 'password_hash': 'hash',
-        'role': 'child', 'failed_login_attempts': 0, 'locked_until': None
-    }
+    mock_cursor.fetchone.return_value = (1, 'alice', 'Alice', 'hash', 'child', 0, None)
     obj = User.get_by_id(1)
     assert obj is not None
     assert obj.id == 1
@@ -23,9 +19,8 @@ def test_get_by_id_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.user.get_db_config', return_value={})
-@patch('app.core.model.user.mysql.connector.connect')
-def test_get_by_id_not_found(mock_connect, mock_db):
+@patch('app.core.model.user.get_connection')
+def test_get_by_id_not_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -37,24 +32,19 @@ def test_get_by_id_not_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.user.get_db_config', return_value={})
-@patch('app.core.model.user.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_get_by_id_db_error(mock_connect, mock_db):
+@patch('app.core.model.user.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_get_by_id_db_error(mock_connect):
     obj = User.get_by_id(1)
     assert obj is None
 
-@patch('app.core.model.user.get_db_config', return_value={})
-@patch('app.core.model.user.mysql.connector.connect')
-def test_get_by_username_found(mock_connect, mock_db):
+@patch('app.core.model.user.get_connection')
+def test_get_by_username_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cursor
     mock_conn.is_connected.return_value = True
-    mock_cursor.fetchone.return_value = {
-        'id': 2, 'username': 'bob', 'text_name': 'Bob', 'password_hash': 'hash2',
-        'role': 'admin-parent', 'failed_login_attempts': 1, 'locked_until': None
-    }
+    mock_cursor.fetchone.return_value = (2, 'bob', 'Bob', 'hash2', 'admin-parent', 1, None)
     obj = User.get_by_username('bob')
     assert obj is not None
     assert obj.username == 'bob'
@@ -62,9 +52,8 @@ def test_get_by_username_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.user.get_db_config', return_value={})
-@patch('app.core.model.user.mysql.connector.connect')
-def test_get_by_username_not_found(mock_connect, mock_db):
+@patch('app.core.model.user.get_connection')
+def test_get_by_username_not_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -76,25 +65,21 @@ def test_get_by_username_not_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.user.get_db_config', return_value={})
-@patch('app.core.model.user.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_get_by_username_db_error(mock_connect, mock_db):
+@patch('app.core.model.user.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_get_by_username_db_error(mock_connect):
     obj = User.get_by_username('bob')
     assert obj is None
 
-@patch('app.core.model.user.get_db_config', return_value={})
-@patch('app.core.model.user.mysql.connector.connect')
-def test_get_all_children_found(mock_connect, mock_db):
+@patch('app.core.model.user.get_connection')
+def test_get_all_children_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cursor
     mock_conn.is_connected.return_value = True
     mock_cursor.fetchall.return_value = [
-        {'id': 1, 'username': 'alice', 'text_name': 'Alice', 'password_hash': 'hash',
-         'role': 'child', 'failed_login_attempts': 0, 'locked_until': None},
-        {'id': 2, 'username': 'bob', 'text_name': 'Bob', 'password_hash': 'hash2',
-         'role': 'child', 'failed_login_attempts': 1, 'locked_until': None}
+        (1, 'alice', 'Alice', 'hash', 'child', 0, None),
+        (2, 'bob', 'Bob', 'hash2', 'child', 1, None)
     ]
     objs = User.get_all_children()
     assert isinstance(objs, list)
@@ -104,15 +89,13 @@ def test_get_all_children_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.user.get_db_config', return_value={})
-@patch('app.core.model.user.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_get_all_children_db_error(mock_connect, mock_db):
+@patch('app.core.model.user.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_get_all_children_db_error(mock_connect):
     objs = User.get_all_children()
     assert objs == []
 
-@patch('app.core.model.user.get_db_config', return_value={})
-@patch('app.core.model.user.mysql.connector.connect')
-def test_save_insert(mock_connect, mock_db):
+@patch('app.core.model.user.get_connection')
+def test_save_insert(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -126,9 +109,8 @@ def test_save_insert(mock_connect, mock_db):
     mock_cursor.close.assert_called()
     mock_conn.close.assert_called()
 
-@patch('app.core.model.user.get_db_config', return_value={})
-@patch('app.core.model.user.mysql.connector.connect')
-def test_save_update(mock_connect, mock_db):
+@patch('app.core.model.user.get_connection')
+def test_save_update(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -140,9 +122,52 @@ def test_save_update(mock_connect, mock_db):
     mock_cursor.close.assert_called()
     mock_conn.close.assert_called()
 
-@patch('app.core.model.user.get_db_config', return_value={})
-@patch('app.core.model.user.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_save_db_error(mock_connect, mock_db):
+@patch('app.core.model.user.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_save_db_error(mock_connect):
     obj = User(id=None, username='alice', password_hash='hash', text_name='Alice', role='child')
     result = obj.save()
-    assert result is False 
\ No newline at end of file
+    assert result is False
+
+# --- per-worker user cache ---
+from app.core.model.user import UserCache, user_cache
+
+def test_user_cache_returns_copies_until_ttl():
+    cache = UserCache(ttl=60)
+    user = User(id=1, username='a', password_hash='h', role='child')
+    cache.put(user)
+    cached = cache.get(1)
+    assert cached is not user and cached.username == 'a'
+    cached.username = 'changed'
+    assert cache.get(1).username == 'a'
+
+def test_user_cache_expires(monkeypatch):
+    import app.core.model.user as user_module
+    now = [100.0]
+    monkeypatch.setattr(user_module.time, 'monotonic', lambda: now[0])
+    cache = UserCache(ttl=5)
+    cache.put(User(id=1, username='a', password_hash='h', role='child'))
+    now[0] = 106.0
+    assert cache.get(1) is None
+
+def test_user_cache_disabled_with_zero_ttl():
+    cache = UserCache(ttl=0)
+    cache.put(User(id=1, username='a', password_hash='h', role='child'))
+    assert cache.get(1) is None
+
+def test_get_by_id_cached_loads_once():
+    user_cache.clear()
+    with patch.object(User, 'get_by_id', return_value=User(id=7, username='a', password_hash='h', role='child')) as mock_get:
+        assert User.get_by_id_cached(7).username == 'a'
+        assert User.get_by_id_cached(7).username == 'a'
+    mock_get.assert_called_once_with(7)
+    user_cache.clear()
+
+@patch('app.core.model.user.get_connection')
+def test_save_invalidates_user_cache(mock_connect):
+    user_cache.clear()
+    user = User(id=7, username='a', password_hash='h', role='child')
+    user_cache.put(user)
+    mock_connect.return_value.cursor.return_value.fetchone.return_value = ('child',)
+    assert user.save() is True
+    assert user_cache.get(7) is None
+
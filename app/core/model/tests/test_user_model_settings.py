@@ -3,15 +3,14 @@ from unittest.mock import patch, MagicMock
 from app.core.model.user_model_settings import UserModelSettings
 import mysql.connector
 
-@patch('app.core.model.user_model_settings.get_db_config', return_value={})
-@patch('app.core.model.user_model_settings.mysql.connector.connect')
-def test_get_by_id_found(mock_connect, mock_db):
+@patch('app.core.model.user_model_settings.get_connection')
+def test_get_by_id_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cursor
     mock_conn.is_connected.return_value = True
-    mock_cursor.fetchone.return_value = {'id': 1, 'user_id': 2, 'system_instructions': 'foo', 'created_at': None, 'updated_at': None}
+    mock_cursor.fetchone.return_value = (1, 2, 'foo', None, None)
     obj = UserModelSettings.get_by_id(1)
     assert obj is not None
     assert obj.id == 1
@@ -20,9 +19,8 @@ def test_get_by_id_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.user_model_settings.get_db_config', return_value={})
-@patch('app.core.model.user_model_settings.mysql.connector.connect')
-def test_get_by_id_not_found(mock_connect, mock_db):
+@patch('app.core.model.user_model_settings.get_connection')
+def test_get_by_id_not_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -34,21 +32,19 @@ def test_get_by_id_not_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.user_model_settings.get_db_config', return_value={})
-@patch('app.core.model.user_model_settings.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_get_by_id_db_error(mock_connect, mock_db):
+@patch('app.core.model.user_model_settings.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_get_by_id_db_error(mock_connect):
     obj = UserModelSettings.get_by_id(1)
     assert obj is None
 
-@patch('app.core.model.user_model_settings.get_db_config', return_value={})
-@patch('app.core.model.user_model_settings.mysql.connector.connect')
-def test_get_by_user_id_found(mock_connect, mock_db):
+@patch('app.core.model.user_model_settings.get_connection')
+def test_get_by_user_id_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cursor
     mock_conn.is_connected.return_value = True
-    mock_cursor.fetchone.return_value = {'id': 2, 'user_id': 3, 'system_instructions': 'bar', 'created_at': None, 'updated_at': None}
+    mock_cursor.fetchone.return_value = (2, 3, 'bar', None, None)
     obj = UserModelSettings.get_by_user_id(3)
     assert obj is not None
     assert obj.user_id == 3
@@ -56,9 +52,8 @@ def test_get_by_user_id_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.user_model_settings.get_db_config', return_value={})
-@patch('app.core.model.user_model_settings.mysql.connector.connect')
-def test_get_by_user_id_not_found(mock_connect, mock_db):
+@patch('app.core.model.user_model_settings.get_connection')
+def test_get_by_user_id_not_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -70,15 +65,13 @@ def test_get_by_user_id_not_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.user_model_settings.get_db_config', return_value={})
-@patch('app.core.model.user_model_settings.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_get_by_user_id_db_error(mock_connect, mock_db):
+@patch('app.core.model.user_model_settings.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_get_by_user_id_db_error(mock_connect):
     obj = UserModelSettings.get_by_user_id(3)
     assert obj is None
 
-@patch('app.core.model.user_model_settings.get_db_config', return_value={})
-@patch('app.core.model.user_model_settings.mysql.connector.connect')
-def test_save_insert(mock_connect, mock_db):
+@patch('app.core.model.user_model_settings.get_connection')
+def test_save_insert(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -92,9 +85,8 @@ def test_save_insert(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.user_model_settings.get_db_config', return_value={})
-@patch('app.core.model.user_model_settings.mysql.connector.connect')
-def test_save_update(mock_connect, mock_db):
+@patch('app.core.model.user_model_settings.get_connection')
+def test_save_update(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -106,9 +98,8 @@ def test_save_update(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.user_model_settings.get_db_config', return_value={})
-@patch('app.core.model.user_model_settings.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_save_db_error(mock_connect, mock_db):
+@patch('app.core.model.user_model_settings.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_save_db_error(mock_connect):
     obj = UserModelSettings(id=None, user_id=2, system_instructions='foo')
     result = obj.save()
     assert result is False 
\ No newline at end of file
@@ -3,15 +3,14 @@ from unittest.mock import patch, MagicMock
 from app.core.model.user_roles import UserRole
 import mysql.connector
 
-@patch('app.core.model.user_roles.get_db_config', return_value={})
-@patch('app.core.model.user_roles.mysql.connector.connect')
-def test_get_by_id_found(mock_connect, mock_db):
+@patch('app.core.model.user_roles.get_connection')
+def test_get_by_id_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cursor
     mock_conn.is_connected.return_value = True
-    mock_cursor.fetchone.return_value = {'id': 1, 'user_id': 2, 'role': 'admin', 'created_at': None}
+    mock_cursor.fetchone.return_value = (1, 2, 'admin', None)
     obj = UserRole.get_by_id(1)
     assert obj is not None
     assert obj.id == 1
@@ -20,9 +19,8 @@ def test_get_by_id_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.user_roles.get_db_config', return_value={})
-@patch('app.core.model.user_roles.mysql.connector.connect')
-def test_get_by_id_not_found(mock_connect, mock_db):
+@patch('app.core.model.user_roles.get_connection')
+def test_get_by_id_not_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -34,23 +32,21 @@ def test_get_by_id_not_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.user_roles.get_db_config', return_value={})
-@patch('app.core.model.user_roles.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_get_by_id_db_error(mock_connect, mock_db):
+@patch('app.core.model.user_roles.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_get_by_id_db_error(mock_connect):
     obj = UserRole.get_by_id(1)
     assert obj is None
 
-@patch('app.core.model.user_roles.get_db_config', return_value={})
-@patch('app.core.model.user_roles.mysql.connector.connect')
-def test_get_by_user_id_found(mock_connect, mock_db):
+@patch('app.core.model.user_roles.get_connection')
+def test_get_by_user_id_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cursor
     mock_conn.is_connected.return_value = True
     mock_cursor.fetchall.return_value = [
-        {'id': 1, 'user_id': 2, 'role': 'admin', 'created_at': None},
-        {'id': 2, 'user_id': 2, 'role': 'user', 'created_at': None}
+        (1, 2, 'admin', None),
+        (2, 2, 'user', None)
     ]
     objs = UserRole.get_by_user_id(2)
     assert isinstance(objs, list)
@@ -60,23 +56,21 @@ def test_get_by_user_id_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.user_roles.get_db_config', return_value={})
-@patch('app.core.model.user_roles.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_get_by_user_id_db_error(mock_connect, mock_db):
+@patch('app.core.model.user_roles.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_get_by_user_id_db_error(mock_connect):
     objs = UserRole.get_by_user_id(2)
     assert objs == []
 
-@patch('app.core.model.user_roles.get_db_config', return_value={})
-@patch('app.core.model.user_roles.mysql.connector.connect')
-def test_get_all_found(mock_connect, mock_db):
+@patch('app.core.model.user_roles.get_connection')
+def test_get_all_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
     mock_conn.cursor.return_value = mock_cursor
     mock_conn.is_connected.return_value = True
     mock_cursor.fetchall.return_value = [
-        {'id': 1, 'user_id': 2, 'role': 'admin', 'created_at': None},
-        {'id': 2, 'user_id': 3, 'role': 'user', 'created_at': None}
+        (1, 2, 'admin', None),
+        (2, 3, 'user', None)
     ]
     objs = UserRole.get_all()
     assert isinstance(objs, list)
@@ -86,15 +80,13 @@ def test_get_all_found(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.user_roles.get_db_config', return_value={})
-@patch('app.core.model.user_roles.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_get_all_db_error(mock_connect, mock_db):
+@patch('app.core.model.user_roles.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_get_all_db_error(mock_connect):
     objs = UserRole.get_all()
     assert objs == []
 
-@patch('app.core.model.user_roles.get_db_config', return_value={})
-@patch('app.core.model.user_roles.mysql.connector.connect')
-def test_save_insert(mock_connect, mock_db):
+@patch('app.core.model.user_roles.get_connection')
+def test_save_insert(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -108,9 +100,8 @@ def test_save_insert(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.user_roles.get_db_config', return_value={})
-@patch('app.core.model.user_roles.mysql.connector.connect')
-def test_save_update(mock_connect, mock_db):
+@patch('app.core.model.user_roles.get_connection')
+def test_save_update(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -122,16 +113,14 @@ def test_save_update(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.user_roles.get_db_config', return_value={})
-@patch('app.core.model.user_roles.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_save_db_error(mock_connect, mock_db):
+@patch('app.core.model.user_roles.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_save_db_error(mock_connect):
     obj = UserRole(id=None, user_id=2, role='admin')
     result = obj.save()
     assert result is False
 
-@patch('app.core.model.user_roles.get_db_config', return_value={})
-@patch('app.core.model.user_roles.mysql.connector.connect')
-def test_delete_success(mock_connect, mock_db):
+@patch('app.core.model.user_roles.get_connection')
+def test_delete_success(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -143,9 +132,8 @@ def test_delete_success(mock_connect, mock_db):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.model.user_roles.get_db_config', return_value={})
-@patch('app.core.model.user_roles.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-def test_delete_db_error(mock_connect, mock_db):
+@patch('app.core.model.user_roles.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_delete_db_error(mock_connect):
     obj = UserRole(id=5, user_id=2, role='admin')
     result = obj.delete()
     assert result is False 
\ No newline at end of file
@@ -1,14 +1,26 @@
+import copy
 import logging
-import mysql.connector
+import threading
+import time
 from typing import Optional, Tuple, Literal
 from mysql.connector import Error
-from app.core.config import get_db_config
+from app.config.settings import USER_CACHE_TTL
+from app.core.config import get_connection
+from app.core.model.base import Model
 from app.core.settings.settings import Settings
 
 # Define valid role types
 UserRole = Literal['admin-parent', 'user-parent', 'child']
 
-class User:
+class User(Model):
+    # Same order as the SELECT lists below
+    __slots__ = ('id', 'username', 'text_name', 'password_hash', 'role',
+                 'failed_login_attempts', 'locked_until')
+    _fields = __slots__
+    _table = "users"
+    # role lives in user_roles; save() writes it separately, and only when it changed
+    _columns = ('username', 'text_name', 'password_hash', 'failed_login_attempts', 'locked_until', 'role')
+
     def __init__(self, id: Optional[int], username: str, password_hash: str, text_name: str = "", 
                  role: UserRole = 'child'):
         self.id = id
@@ -36,15 +48,23 @@ class User:
     def get_password_hash(self) -> Optional[str]:
         return self.password_hash
 
+    @classmethod
+    def _from_row(cls, row) -> 'User':
+        id, username, text_name, password_hash, role, failed_login_attempts, locked_until = row
+        user = cls(id=id, username=username, text_name=text_name, role=role, password_hash=password_hash)
+        user.failed_login_attempts = failed_login_attempts
+        user.locked_until = locked_until
+        user._mark_clean()
+        return user
+
     @classmethod
     def get_by_id(cls, user_id: int) -> Optional['User']:
         """Load a user from the database by ID."""
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
+            connection = get_connection()
+            cursor = connection.cursor()
             
             # Get user details
             cursor.execute("""
@@ -61,16 +81,7 @@ class User:
             if not user_data:
                 return None
                 
-            user = cls(
-                id=user_data['id'],
-                username=user_data['username'],
-                text_name=user_data['text_name'],
-                role=user_data['role'],
-                password_hash=user_data['password_hash']
-            )
-            user.failed_login_attempts = user_data['failed_login_attempts']
-            user.locked_until = user_data['locked_until']
-            return user
+            return cls._from_row(user_data)
             
         except Error as e:
             print(f"Error loading user: {e}")
@@ -81,15 +92,27 @@ class User:
             if connection is not None and connection.is_connected():
                 connection.close()
 
+    @classmethod
+    def get_by_id_cached(cls, user_id: int) -> Optional['User']:
+        """
+        Like get_by_id, but may reuse a copy loaded by this worker within the
+        last USER_CACHE_TTL seconds. Missing users are never cached.
+        """
+        user = user_cache.get(user_id)
+        if user is None:
+            user = cls.get_by_id(user_id)
+            if user is not None:
+                user_cache.put(user)
+        return user
+
     @classmethod
     def get_by_username(cls, username: str) -> Optional['User']:
         connection = None
         cursor = None
         """Load a user from the database by username."""
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
+            connection = get_connection()
+            cursor = connection.cursor()
             
             # Get user details
             cursor.execute("""
@@ -106,16 +129,7 @@ class User:
             if not user_data:
                 return None
                 
-            user = cls(
-                id=user_data['id'],
-                username=user_data['username'],
-                text_name=user_data['text_name'],
-                role=user_data['role'],
-                password_hash=user_data['password_hash']
-            )
-            user.failed_login_attempts = user_data['failed_login_attempts']
-            user.locked_until = user_data['locked_until']
-            return user
+            return cls._from_row(user_data)
             
         except Error as e:
             print(f"Error loading user: {e}")
@@ -127,13 +141,14 @@ class User:
                 connection.close()
 
     def save(self) -> bool:
-        """Save the user to the database."""
+        """Save the user to the database, writing only what changed since it was loaded."""
+        if self.id is not None and not self.is_dirty():
+            return True
         connection = None
         cursor = None
         try:
             logging.info(f"Saving user: {self.username}, {self.text_name}, {self.role}")
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
+            connection = get_connection()
             cursor = connection.cursor()
 
             logging.info(f"Saving user: database connection successful")
@@ -160,18 +175,14 @@ class User:
                     """, (self.id, self.role))
                 logging.info(f"Saving user: new user, inserted into user_roles table successfully")
             else:
-                # Update existing user
-                logging.info(f"Saving user: existing user, updating users table")
-                cursor.execute("""
-                    UPDATE users 
-                    SET username = %s, text_name = %s, password_hash = %s,
-                        failed_login_attempts = %s, locked_until = %s
-                    WHERE id = %s
-                """, (self.username, self.text_name, self.password_hash,
-                      self.failed_login_attempts, self.locked_until, self.id))
-                logging.info(f"Saving user: existing user, updated users table successfully")
-                # Update role if provided
-                if self.role:
+                fields = self.dirty_fields()
+                role_changed = 'role' in fields
+                fields.pop('role', None)
+                # Update existing user, only the columns that changed
+                if self._update_dirty(cursor, fields):
+                    logging.info(f"Saving user: existing user, updated users table successfully")
+                # Update role if it changed
+                if role_changed and self.role:
                     # First check if user has any role
                     logging.info(f"Saving user: existing user, checking for existing role")
                     cursor.execute("SELECT role FROM user_roles WHERE user_id = %s", (self.id,))
@@ -197,6 +208,8 @@ class User:
             
             connection.commit()
             logging.info(f"Saving user: all operations committed successfully")
+            self._mark_clean()
+            user_cache.invalidate(self.id)
             return True
             
         except Error as e:
@@ -210,15 +223,91 @@ class User:
             if connection is not None and connection.is_connected():
                 connection.close()   
 
+    @classmethod
+    def record_failed_login(cls, user_id: int, max_attempts: int, lockout_seconds: int,
+                            reset_after_seconds: int) -> Optional[Tuple[int, Optional[object]]]:
+        """
+        Count a failed login in one atomic UPDATE and return the new
+        (failed_login_attempts, locked_until), or None on error. The counter
+        starts over if the last lockout ended more than reset_after_seconds
+        ago, and the account is locked once it reaches max_attempts.
+        """
+        connection = None
+        cursor = None
+        try:
+            connection = get_connection()
+            cursor = connection.cursor()
+            # MySQL applies single-table SET clauses left to right, so the
+            # locked_until test below sees the already-incremented counter
+            cursor.execute("""
+                UPDATE users
+                SET failed_login_attempts = IF(
+                        locked_until IS NOT NULL AND locked_until + INTERVAL %s SECOND < NOW(),
+                        1, failed_login_attempts + 1),
+                    locked_until = IF(
+                        failed_login_attempts >= %s, NOW() + INTERVAL %s SECOND, locked_until)
+                WHERE id = %s
+            """, (reset_after_seconds, max_attempts, lockout_seconds, user_id))
+            cursor.execute(
+                "SELECT failed_login_attempts, locked_until FROM users WHERE id = %s",
+                (user_id,)
+            )
+            row = cursor.fetchone()
+            connection.commit()
+            user_cache.invalidate(user_id)
+            return (row[0], row[1]) if row else None
+        except Error as e:
+            print(f"Error recording failed login: {e}")
+            if connection is not None and connection.is_connected():
+                connection.rollback()
+            return None
+        finally:
+            if cursor is not None:
+                cursor.close()
+            if connection is not None and connection.is_connected():
+                connection.close()
+
+    @classmethod
+    def record_successful_login(cls, user_id: int, password_hash: Optional[str] = None) -> bool:
+        """Clear the lockout counters, and store password_hash if one is given."""
+        connection = None
+        cursor = None
+        try:
+            connection = get_connection()
+            cursor = connection.cursor()
+            if password_hash is None:
+                cursor.execute("""
+                    UPDATE users SET failed_login_attempts = 0, locked_until = NULL
+                    WHERE id = %s
+                """, (user_id,))
+            else:
+                cursor.execute("""
+                    UPDATE users SET failed_login_attempts = 0, locked_until = NULL,
+                                     password_hash = %s
+                    WHERE id = %s
+                """, (password_hash, user_id))
+            connection.commit()
+            user_cache.invalidate(user_id)
+            return True
+        except Error as e:
+            print(f"Error recording login: {e}")
+            if connection is not None and connection.is_connected():
+                connection.rollback()
+            return False
+        finally:
+            if cursor is not None:
+                cursor.close()
+            if connection is not None and connection.is_connected():
+                connection.close()
+
     @classmethod
     def get_all_children(cls):
         """Return all users with role 'child'."""
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
+            connection = get_connection()
+            cursor = connection.cursor()
             cursor.execute('''
                 SELECT u.id, u.username, u.text_name, u.password_hash, ur.role,
                        u.failed_login_attempts, u.locked_until
@@ -229,15 +318,7 @@ class User:
             ''')
             users = []
             for user_data in cursor.fetchall():
-                user = cls(
-                    id=user_data['id'],
-                    username=user_data['username'],
-                    text_name=user_data['text_name'],
-                    role=user_data['role'],
-                    password_hash=user_data['password_hash']
-                )
-                user.failed_login_attempts = user_data['failed_login_attempts']
-                user.locked_until = user_data['locked_until']
+                user = cls._from_row(user_data)
                 users.append(user)
             return users
         except Error as e:
@@ -247,4 +328,48 @@ class User:
             if cursor is not None:
                 cursor.close()
             if connection is not None and connection.is_connected():
-                connection.close()   
\ No newline at end of file
+                connection.close()
+
+
+class UserCache:
+    """
+    Short-TTL per-worker cache of users by id. Entries are copied in and out
+    so callers can modify what they get back without affecting other requests.
+    User.save() invalidates the entry in this worker; other workers pick up
+    the change once their entry expires.
+    """
+
+    def __init__(self, ttl: float = USER_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, user_id) -> Optional[User]:
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return None
+        return copy.copy(user)
+
+    def put(self, user: User):
+        if self.ttl <= 0 or user.id is None:
+            return
+        with self._lock:
+            self._entries[user.id] = (copy.copy(user), time.monotonic() + self.ttl)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+
+
+user_cache = UserCache()
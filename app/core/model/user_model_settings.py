@@ -1,9 +1,14 @@
-import mysql.connector
 from typing import Optional, List
 from mysql.connector import Error
-from app.core.config import get_db_config
+from app.core.config import get_connection
+from app.core.model.base import Model
+
+class UserModelSettings(Model):
+    __slots__ = ('id', 'user_id', 'system_instructions', 'created_at', 'updated_at')
+    _fields = __slots__
+    _table = "user_model_settings"
+    _columns = ('user_id', 'system_instructions')
 
-class UserModelSettings:
     def __init__(self, id: Optional[int], user_id: int, system_instructions: str, created_at: Optional[str] = None, updated_at: Optional[str] = None):
         self.id = id
         self.user_id = user_id
@@ -16,14 +21,13 @@ class UserModelSettings:
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM user_model_settings WHERE id = %s", (id,))
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {cls._select} FROM user_model_settings WHERE id = %s", (id,))
             data = cursor.fetchone()
             if not data:
                 return None
-            return cls(**data)
+            return cls._from_row(data)
         except Error as e:
             print(f"Error loading user model settings: {e}")
             return None
@@ -38,14 +42,13 @@ class UserModelSettings:
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM user_model_settings WHERE user_id = %s", (user_id,))
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {cls._select} FROM user_model_settings WHERE user_id = %s", (user_id,))
             data = cursor.fetchone()
             if not data:
                 return None
-            return cls(**data)
+            return cls._from_row(data)
         except Error as e:
             print(f"Error loading user model settings: {e}")
             return None
@@ -56,11 +59,12 @@ class UserModelSettings:
                 connection.close()
 
     def save(self) -> bool:
+        if self.id is not None and not self.is_dirty():
+            return True
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
+            connection = get_connection()
             cursor = connection.cursor()
             if self.id is None:
                 cursor.execute(
@@ -69,11 +73,9 @@ class UserModelSettings:
                 )
                 self.id = cursor.lastrowid
             else:
-                cursor.execute(
-                    "UPDATE user_model_settings SET user_id = %s, system_instructions = %s WHERE id = %s",
-                    (self.user_id, self.system_instructions, self.id)
-                )
+                self._update_dirty(cursor)
             connection.commit()
+            self._mark_clean()
             return True
         except Error as e:
             print(f"Error saving user model settings: {e}")
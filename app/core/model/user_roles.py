@@ -1,9 +1,14 @@
-import mysql.connector
 from typing import Optional, List
 from mysql.connector import Error
-from app.core.config import get_db_config
+from app.core.config import get_connection
+from app.core.model.base import Model
+
+class UserRole(Model):
+    __slots__ = ('id', 'user_id', 'role', 'created_at')
+    _fields = __slots__
+    _table = "user_roles"
+    _columns = ('user_id', 'role')
 
-class UserRole:
     def __init__(self, id: Optional[int], user_id: int, role: str, created_at: Optional[str] = None):
         self.id = id
         self.user_id = user_id
@@ -15,14 +20,13 @@ class UserRole:
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM user_roles WHERE id = %s", (id,))
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {cls._select} FROM user_roles WHERE id = %s", (id,))
             data = cursor.fetchone()
             if not data:
                 return None
-            return cls(**data)
+            return cls._from_row(data)
         except Error as e:
             print(f"Error loading user role: {e}")
             return None
@@ -37,11 +41,10 @@ class UserRole:
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM user_roles WHERE user_id = %s", (user_id,))
-            roles = [cls(**row) for row in cursor.fetchall()]
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {cls._select} FROM user_roles WHERE user_id = %s", (user_id,))
+            roles = [cls._from_row(row) for row in cursor.fetchall()]
             return roles
         except Error as e:
             print(f"Error loading user roles: {e}")
@@ -57,11 +60,10 @@ class UserRole:
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM user_roles ORDER BY id ASC")
-            return [cls(**row) for row in cursor.fetchall()]
+            connection = get_connection()
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {cls._select} FROM user_roles ORDER BY id ASC")
+            return [cls._from_row(row) for row in cursor.fetchall()]
         except Error as e:
             print(f"Error loading user roles: {e}")
             return []
@@ -72,11 +74,12 @@ class UserRole:
                 connection.close()
 
     def save(self) -> bool:
+        if self.id is not None and not self.is_dirty():
+            return True
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
+            connection = get_connection()
             cursor = connection.cursor()
             if self.id is None:
                 cursor.execute(
@@ -85,11 +88,9 @@ class UserRole:
                 )
                 self.id = cursor.lastrowid
             else:
-                cursor.execute(
-                    "UPDATE user_roles SET user_id = %s, role = %s WHERE id = %s",
-                    (self.user_id, self.role, self.id)
-                )
+                self._update_dirty(cursor)
             connection.commit()
+            self._mark_clean()
             return True
         except Error as e:
             print(f"Error saving user role: {e}")
@@ -106,8 +107,7 @@ class UserRole:
         connection = None
         cursor = None
         try:
-            db_config = get_db_config()
-            connection = mysql.connector.connect(**db_config)
+            connection = get_connection()
             cursor = connection.cursor()
             cursor.execute("DELETE FROM user_roles WHERE id = %s", (self.id,))
             connection.commit()
@@ -0,0 +1,170 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+from flask import g, has_app_context, request
+from app.config.settings import ACCESS_LOG, SERVER_TIMING
+from app.core.slow_query import slow_query_log
+
+
+class QueryStats:
+    """
+    Database work done by one request (or inside capture_queries): how many
+    statements ran, how long they took, and how many pooled connections
+    were checked out. With keep_sql the statements themselves are kept too.
+    """
+
+    def __init__(self, keep_sql: bool = False):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.db_time = 0.0
+        self.connections = 0
+        self.queries: Optional[List[str]] = [] if keep_sql else None
+
+    def record_statement(self, sql: str, seconds: float):
+        self.statements += 1
+        self.db_time += seconds
+        if self.queries is not None:
+            self.queries.append(" ".join(str(sql).split()))
+
+    def record_connection(self):
+        self.connections += 1
+
+    def server_timing(self, total: float) -> str:
+        """Value for the Server-Timing response header."""
+        return (f'db;dur={self.db_time * 1000:.1f};desc="{self.statements} queries, '
+                f'{self.connections} connections", total;dur={total * 1000:.1f}')
+
+
+_local = threading.local()
+
+
+def _captures() -> list:
+    stack = getattr(_local, "captures", None)
+    if stack is None:
+        stack = _local.captures = []
+    return stack
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """The active request's QueryStats, if any."""
+    if not has_app_context():
+        return None
+    return g.get("query_stats")
+
+
+def _targets():
+    stats = current_query_stats()
+    captures = _captures()
+    if stats is None:
+        return captures
+    return [stats, *captures]
+
+
+def record_statement(sql: str, seconds: float):
+    for stats in _targets():
+        stats.record_statement(sql, seconds)
+
+
+def record_connection():
+    for stats in _targets():
+        stats.record_connection()
+
+
+class InstrumentedCursor:
+    """
+    Cursor proxy that times every statement and reports it to
+    record_statement() and the slow query log.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - started
+            record_statement(operation, seconds)
+            slow_query_log.observe(operation, params, seconds)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - started
+            record_statement(operation, seconds)
+            slow_query_log.observe(operation, seq_params, seconds, many=True)
+
+
+@contextmanager
+def capture_queries():
+    """Collect every statement run on this thread inside the block."""
+    stats = QueryStats(keep_sql=True)
+    stack = _captures()
+    stack.append(stats)
+    try:
+        yield stats
+    finally:
+        stack.remove(stats)
+
+
+@contextmanager
+def query_budget(max_statements: int, max_connections: Optional[int] = None):
+    """
+    Test helper: fail if the block runs more than max_statements statements
+    (or checks out more than max_connections connections), listing what ran
+    so an N+1 regression is easy to spot.
+
+        with query_budget(8):
+            client.post("/chat", json=...)
+    """
+    with capture_queries() as stats:
+        yield stats
+    problems = []
+    if stats.statements > max_statements:
+        problems.append(f"{stats.statements} statements (budget {max_statements})")
+    if max_connections is not None and stats.connections > max_connections:
+        problems.append(f"{stats.connections} connections (budget {max_connections})")
+    if problems:
+        listing = "\n".join(f"  {i + 1}. {sql}" for i, sql in enumerate(stats.queries))
+        raise AssertionError(f"Query budget exceeded: {', '.join(problems)}\n{listing}")
+
+
+def init_query_stats(app):
+    """
+    Count each request's database work and report it in a Server-Timing
+    header and an access log line. Register before other hooks so its
+    after_request runs last and sees everything they did.
+    """
+    @app.before_request
+    def _start_query_stats():
+        g.query_stats = QueryStats()
+
+    @app.after_request
+    def _report_query_stats(response):
+        stats = g.get("query_stats")
+        if stats is None:
+            return response
+        if SERVER_TIMING:
+            # Streamed bodies are produced later, so this covers the work up to the headers
+            response.headers.add("Server-Timing", stats.server_timing(time.perf_counter() - stats.started))
+        if ACCESS_LOG:
+            line = f'{request.remote_addr} "{request.method} {request.path}" {response.status_code}'
+
+            def log_access():
+                # Runs once the body is sent, so streamed work is included
+                total = time.perf_counter() - stats.started
+                logging.info(f"{line} {total * 1000:.1f}ms db={stats.statements}q/{stats.db_time * 1000:.1f}ms "
+                             f"conns={stats.connections}")
+            response.call_on_close(log_access)
+        return response
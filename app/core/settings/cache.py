@@ -0,0 +1,44 @@
+import threading
+from typing import Any, Callable
+
+
+class SettingsCache:
+    """
+    Read-through cache of settings rows for one worker process. Every entry
+    belongs to a single settings version; the first lookup with a newer
+    version drops them all. Loads run outside the lock, so a slow query never
+    blocks readers of other keys.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._values = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, version: int, key, load: Callable[[], Any]):
+        with self._lock:
+            if self._version == version and key in self._values:
+                self.hits += 1
+                return self._values[key]
+            self.misses += 1
+        value = load()
+        with self._lock:
+            if self._version is not None and version < self._version:
+                # Loaded for a version that has already been superseded
+                return value
+            if self._version != version:
+                self._version = version
+                self._values = {}
+            self._values[key] = value
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._version = None
+            self._values = {}
+
+
+# Per-worker cache shared by every Settings instance in this process
+settings_cache = SettingsCache()
@@ -1,7 +1,11 @@
-from app.core.config import get_db_config
-import mysql.connector
+from flask import g, has_app_context
+from app.core.config import get_db_config, get_connection
 from app.core.model.banned_word import BannedWord
 from app.core.model.persona import Persona
+from app.core.settings.cache import settings_cache
+
+# Bumped by every Settings mutator; workers drop their cached settings when it moves
+SETTINGS_VERSION_KEY = "settings_version"
 
 class Settings:
     def __init__(self):
@@ -11,7 +15,10 @@ class Settings:
         return self.db_config
 
     def get_global_system_instructions(self) -> str:
-        connection = mysql.connector.connect(**self.db_config)
+        return self._cached("global_system_instructions", self._load_global_system_instructions)
+
+    def _load_global_system_instructions(self) -> str:
+        connection = get_connection()
         cursor = connection.cursor()
         try:
             cursor.execute("SELECT setting_value FROM global_settings WHERE setting_key = %s", ("system_instructions",))
@@ -22,7 +29,7 @@ class Settings:
             connection.close()
 
     def set_global_system_instructions(self, instructions: str):
-        connection = mysql.connector.connect(**self.db_config)
+        connection = get_connection()
         cursor = connection.cursor()
         try:
             cursor.execute("""
@@ -30,23 +37,82 @@ class Settings:
                 VALUES (%s, %s)
                 ON DUPLICATE KEY UPDATE setting_value = VALUES(setting_value)
             """, ("system_instructions", instructions))
+            self._bump_version(cursor, SETTINGS_VERSION_KEY)
             connection.commit()
         finally:
             cursor.close()
             connection.close()
 
+    # --- Version stamps ---
+    # Monotonic counters kept in global_settings. Workers compare them to
+    # decide when their in-process caches are stale.
+    def get_version(self, key: str) -> int:
+        connection = get_connection()
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT setting_value FROM global_settings WHERE setting_key = %s", (key,))
+            row = cursor.fetchone()
+            return int(row[0]) if row else 0
+        finally:
+            cursor.close()
+            connection.close()
+
+    def bump_version(self, key: str):
+        connection = get_connection()
+        cursor = connection.cursor()
+        try:
+            self._bump_version(cursor, key)
+            connection.commit()
+        finally:
+            cursor.close()
+            connection.close()
+
+    @staticmethod
+    def _bump_version(cursor, key: str):
+        # Runs on the caller's cursor so the bump commits with the change it describes
+        cursor.execute("""
+            INSERT INTO global_settings (setting_key, setting_value)
+            VALUES (%s, '1')
+            ON DUPLICATE KEY UPDATE setting_value = CAST(setting_value AS UNSIGNED) + 1
+        """, (key,))
+        if key == SETTINGS_VERSION_KEY:
+            _settings_changed()
+
+    # --- Cached reads ---
+    # Inside a request, reads are served from the per-worker settings cache
+    # and settings_version is read at most once per request. Outside a
+    # request (CLI, background threads) every read goes to the database.
+    def get_settings_version(self) -> int:
+        if not has_app_context():
+            return self.get_version(SETTINGS_VERSION_KEY)
+        version = g.get("settings_version")
+        if version is None:
+            version = g.settings_version = self.get_version(SETTINGS_VERSION_KEY)
+        return version
+
+    def _cached(self, key, load):
+        # A request that changed settings reads its own uncommitted writes directly
+        if not has_app_context() or g.get("settings_changed"):
+            return load()
+        return settings_cache.get(self.get_settings_version(), key, load)
+
     # --- Personas ---
     def get_personas(self, _):
-        return [vars(p) for p in Persona.get_all()]
+        return list(self._cached("personas", lambda: [p.to_dict() for p in Persona.get_all()]))
+
+    def get_persona(self, persona_id):
+        """Return one persona as a dict, or None."""
+        personas = self._cached("personas_by_id", lambda: {p["id"]: p for p in self.get_personas(None)})
+        return personas.get(persona_id)
 
     def add_persona(self, name, system_prompt):
         p = Persona(id=None, name=name, system_prompt=system_prompt)
-        return p.save()
+        return self._bump_if(p.save())
 
     def delete_persona(self, persona_id):
         p = Persona.get_by_id(persona_id)
         if p:
-            return p.delete()
+            return self._bump_if(p.delete())
         return False
 
     def edit_persona(self, persona_id, name, system_prompt):
@@ -54,16 +120,24 @@ class Settings:
         if p:
             p.name = name
             p.system_prompt = system_prompt
-            return p.save()
+            if not p.is_dirty():
+                return True
+            return self._bump_if(p.save())
         return False
 
+    def _bump_if(self, changed: bool) -> bool:
+        # For changes saved through a model, which commits on its own connection
+        if changed:
+            self.bump_version(SETTINGS_VERSION_KEY)
+        return changed
+
     # --- Banned Words ---
     def get_banned_words(self):
-        return [vars(w) for w in BannedWord.get_all()]
+        return list(self._cached("banned_words", lambda: [w.to_dict() for w in BannedWord.get_all()]))
 
     def add_banned_word(self, word):
         bw = BannedWord(id=None, word=word)
-        return bw.save()
+        return self._bump_if(bw.save())
 
     def delete_banned_word(self, banned_word_id):
         connection = None
@@ -71,10 +145,10 @@ class Settings:
         bw = BannedWord.get_by_id(banned_word_id)
         if bw:
             try:
-                db_config = get_db_config()
-                connection = mysql.connector.connect(**db_config)
+                connection = get_connection()
                 cursor = connection.cursor()
                 cursor.execute("DELETE FROM banned_words WHERE id = %s", (banned_word_id,))
+                self._bump_version(cursor, SETTINGS_VERSION_KEY)
                 connection.commit()
                 return True
             except Exception as e:
@@ -89,7 +163,10 @@ class Settings:
 
     # --- Per-child system instructions ---
     def get_child_instructions(self, child_id):
-        connection = mysql.connector.connect(**self.db_config)
+        return self._cached(("child_instructions", child_id), lambda: self._load_child_instructions(child_id))
+
+    def _load_child_instructions(self, child_id):
+        connection = get_connection()
         cursor = connection.cursor()
         try:
             cursor.execute("SELECT system_instructions FROM user_model_settings WHERE user_id = %s", (child_id,))
@@ -100,7 +177,7 @@ class Settings:
             connection.close()
 
     def set_child_instructions(self, child_id, instructions):
-        connection = mysql.connector.connect(**self.db_config)
+        connection = get_connection()
         cursor = connection.cursor()
         try:
             cursor.execute("""
@@ -108,6 +185,7 @@ class Settings:
                 VALUES (%s, %s)
                 ON DUPLICATE KEY UPDATE system_instructions = VALUES(system_instructions)
             """, (child_id, instructions))
+            self._bump_version(cursor, SETTINGS_VERSION_KEY)
             connection.commit()
         finally:
             cursor.close()
@@ -115,7 +193,10 @@ class Settings:
 
     # --- Child Personas Assignment ---
     def get_child_persona_ids(self, child_id):
-        connection = mysql.connector.connect(**self.db_config)
+        return list(self._cached(("child_persona_ids", child_id), lambda: self._load_child_persona_ids(child_id)))
+
+    def _load_child_persona_ids(self, child_id):
+        connection = get_connection()
         cursor = connection.cursor()
         try:
             cursor.execute("SELECT persona_id FROM child_personas WHERE child_user_id = %s", (child_id,))
@@ -125,24 +206,33 @@ class Settings:
             connection.close()
 
     def set_child_personas(self, child_id, persona_ids):
-        connection = mysql.connector.connect(**self.db_config)
+        connection = get_connection()
         cursor = connection.cursor()
         try:
             cursor.execute("DELETE FROM child_personas WHERE child_user_id = %s", (child_id,))
             for persona_id in persona_ids:
                 cursor.execute("INSERT INTO child_personas (child_user_id, persona_id) VALUES (%s, %s)", (child_id, persona_id))
+            self._bump_version(cursor, SETTINGS_VERSION_KEY)
             connection.commit()
         finally:
             cursor.close()
             connection.close()
 
     def create_blank_instructions(self, user_id):
-        connection = mysql.connector.connect(**self.db_config)
+        connection = get_connection()
         cursor = connection.cursor()
         try:
             cursor.execute("INSERT IGNORE INTO user_model_settings (user_id, system_instructions) VALUES (%s, '')", (user_id,))
+            self._bump_version(cursor, SETTINGS_VERSION_KEY)
             connection.commit()
         finally:
             cursor.close()
             connection.close()
 
+
+def _settings_changed():
+    """Forget this worker's cached settings after a local change."""
+    settings_cache.clear()
+    if has_app_context():
+        g.settings_changed = True
+        g.pop("settings_version", None)
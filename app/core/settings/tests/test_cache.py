@@ -0,0 +1,36 @@
+from unittest.mock import MagicMock
+from app.core.settings.cache import SettingsCache
+
+
+def test_cache_reuses_value_for_same_version():
+    cache = SettingsCache()
+    load = MagicMock(return_value='hello')
+    assert cache.get(1, 'k', load) == 'hello'
+    assert cache.get(1, 'k', load) == 'hello'
+    load.assert_called_once()
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+def test_cache_drops_everything_on_new_version():
+    cache = SettingsCache()
+    cache.get(1, 'a', lambda: 'old a')
+    cache.get(1, 'b', lambda: 'old b')
+    assert cache.get(2, 'a', lambda: 'new a') == 'new a'
+    assert cache.get(2, 'b', lambda: 'new b') == 'new b'
+
+def test_cache_does_not_store_superseded_version():
+    cache = SettingsCache()
+    cache.get(3, 'a', lambda: 'current')
+    assert cache.get(2, 'b', lambda: 'stale') == 'stale'
+    load = MagicMock(return_value='fresh')
+    assert cache.get(3, 'b', load) == 'fresh'
+    load.assert_called_once()
+    assert cache.get(3, 'a', MagicMock()) == 'current'
+
+def test_cache_clear():
+    cache = SettingsCache()
+    cache.get(1, 'a', lambda: 'x')
+    cache.clear()
+    load = MagicMock(return_value='y')
+    assert cache.get(1, 'a', load) == 'y'
+    load.assert_called_once()
@@ -2,11 +2,12 @@ import pytest
 from unittest.mock import patch, MagicMock
 from app.core.settings.settings import Settings
 import mysql.connector
+from app.core.model.persona import Persona
+from app.core.model.banned_word import BannedWord
 
 # --- get_global_system_instructions ---
-@patch('app.core.settings.settings.mysql.connector.connect')
-@patch('app.core.settings.settings.get_db_config', return_value={})
-def test_get_global_system_instructions_found(mock_db, mock_connect):
+@patch('app.core.settings.settings.get_connection')
+def test_get_global_system_instructions_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -18,9 +19,8 @@ def test_get_global_system_instructions_found(mock_db, mock_connect):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.settings.settings.mysql.connector.connect')
-@patch('app.core.settings.settings.get_db_config', return_value={})
-def test_get_global_system_instructions_empty(mock_db, mock_connect):
+@patch('app.core.settings.settings.get_connection')
+def test_get_global_system_instructions_empty(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -32,17 +32,15 @@ def test_get_global_system_instructions_empty(mock_db, mock_connect):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.settings.settings.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-@patch('app.core.settings.settings.get_db_config', return_value={})
-def test_get_global_system_instructions_db_error(mock_db, mock_connect):
+@patch('app.core.settings.settings.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_get_global_system_instructions_db_error(mock_connect):
     s = Settings()
     with pytest.raises(mysql.connector.Error):
         s.get_global_system_instructions()
 
 # --- set_global_system_instructions ---
-@patch('app.core.settings.settings.mysql.connector.connect')
-@patch('app.core.settings.settings.get_db_config', return_value={})
-def test_set_global_system_instructions_success(mock_db, mock_connect):
+@patch('app.core.settings.settings.get_connection')
+def test_set_global_system_instructions_success(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
@@ -54,9 +52,8 @@ def test_set_global_system_instructions_success(mock_db, mock_connect):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.settings.settings.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
-@patch('app.core.settings.settings.get_db_config', return_value={})
-def test_set_global_system_instructions_db_error(mock_db, mock_connect):
+@patch('app.core.settings.settings.get_connection', side_effect=mysql.connector.Error('DB error'))
+def test_set_global_system_instructions_db_error(mock_connect):
     s = Settings()
     with pytest.raises(mysql.connector.Error):
         s.set_global_system_instructions('foo')
@@ -64,7 +61,7 @@ def test_set_global_system_instructions_db_error(mock_db, mock_connect):
 # --- get_personas ---
 @patch('app.core.settings.settings.Persona')
 def test_get_personas_success(mock_persona):
-    mock_persona.get_all.return_value = [MagicMock(id=1, name='A', system_prompt='x')]
+    mock_persona.get_all.return_value = [Persona(id=1, name='A', system_prompt='x')]
     s = Settings()
     result = s.get_personas(None)
     assert isinstance(result, list)
@@ -79,8 +76,9 @@ def test_get_personas_error(mock_persona):
         s.get_personas(None)
 
 # --- add_persona ---
+@patch.object(Settings, 'bump_version')
 @patch('app.core.settings.settings.Persona')
-def test_add_persona_success(mock_persona):
+def test_add_persona_success(mock_persona, mock_bump):
     mock_obj = MagicMock()
     mock_obj.save.return_value = True
     mock_persona.return_value = mock_obj
@@ -88,9 +86,11 @@ def test_add_persona_success(mock_persona):
     result = s.add_persona('A', 'x')
     assert result is True
     mock_obj.save.assert_called_once()
+    mock_bump.assert_called_once_with('settings_version')
 
+@patch.object(Settings, 'bump_version')
 @patch('app.core.settings.settings.Persona')
-def test_add_persona_save_false(mock_persona):
+def test_add_persona_save_false(mock_persona, mock_bump):
     mock_obj = MagicMock()
     mock_obj.save.return_value = False
     mock_persona.return_value = mock_obj
@@ -98,10 +98,12 @@ def test_add_persona_save_false(mock_persona):
     result = s.add_persona('A', 'x')
     assert result is False
     mock_obj.save.assert_called_once()
+    mock_bump.assert_not_called()
 
 # --- delete_persona ---
+@patch.object(Settings, 'bump_version')
 @patch('app.core.settings.settings.Persona')
-def test_delete_persona_success(mock_persona):
+def test_delete_persona_success(mock_persona, mock_bump):
     mock_obj = MagicMock()
     mock_obj.delete.return_value = True
     mock_persona.get_by_id.return_value = mock_obj
@@ -109,17 +111,20 @@ def test_delete_persona_success(mock_persona):
     result = s.delete_persona(1)
     assert result is True
     mock_obj.delete.assert_called_once()
+    mock_bump.assert_called_once_with('settings_version')
 
+@patch.object(Settings, 'bump_version')
 @patch('app.core.settings.settings.Persona')
-def test_delete_persona_not_found(mock_persona):
+def test_delete_persona_not_found(mock_persona, mock_bump):
     mock_persona.get_by_id.return_value = None
     s = Settings()
     result = s.delete_persona(1)
     assert result is False
 
 # --- edit_persona ---
+@patch.object(Settings, 'bump_version')
 @patch('app.core.settings.settings.Persona')
-def test_edit_persona_success(mock_persona):
+def test_edit_persona_success(mock_persona, mock_bump):
     mock_obj = MagicMock()
     mock_obj.save.return_value = True
     mock_persona.get_by_id.return_value = mock_obj
@@ -130,8 +135,9 @@ def test_edit_persona_success(mock_persona):
     assert mock_obj.system_prompt == 'y'
     mock_obj.save.assert_called_once()
 
+@patch.object(Settings, 'bump_version')
 @patch('app.core.settings.settings.Persona')
-def test_edit_persona_not_found(mock_persona):
+def test_edit_persona_not_found(mock_persona, mock_bump):
     mock_persona.get_by_id.return_value = None
     s = Settings()
     result = s.edit_persona(1, 'B', 'y')
@@ -140,7 +146,7 @@ def test_edit_persona_not_found(mock_persona):
 # --- get_banned_words ---
 @patch('app.core.settings.settings.BannedWord')
 def test_get_banned_words_success(mock_bw):
-    mock_bw.get_all.return_value = [MagicMock(id=1, word='bad')]
+    mock_bw.get_all.return_value = [BannedWord(id=1, word='bad')]
     s = Settings()
     result = s.get_banned_words()
     assert isinstance(result, list)
@@ -155,8 +161,9 @@ def test_get_banned_words_error(mock_bw):
         s.get_banned_words()
 
 # --- add_banned_word ---
+@patch.object(Settings, 'bump_version')
 @patch('app.core.settings.settings.BannedWord')
-def test_add_banned_word_success(mock_bw):
+def test_add_banned_word_success(mock_bw, mock_bump):
     mock_obj = MagicMock()
     mock_obj.save.return_value = True
     mock_bw.return_value = mock_obj
@@ -164,9 +171,11 @@ def test_add_banned_word_success(mock_bw):
     result = s.add_banned_word('bad')
     assert result is True
     mock_obj.save.assert_called_once()
+    mock_bump.assert_called_once_with('settings_version')
 
+@patch.object(Settings, 'bump_version')
 @patch('app.core.settings.settings.BannedWord')
-def test_add_banned_word_save_false(mock_bw):
+def test_add_banned_word_save_false(mock_bw, mock_bump):
     mock_obj = MagicMock()
     mock_obj.save.return_value = False
     mock_bw.return_value = mock_obj
@@ -174,10 +183,11 @@ def test_add_banned_word_save_false(mock_bw):
     result = s.add_banned_word('bad')
     assert result is False
     mock_obj.save.assert_called_once()
+    mock_bump.assert_not_called()
 
 # --- delete_banned_word ---
 @patch('app.core.settings.settings.BannedWord')
-@patch('app.core.settings.settings.mysql.connector.connect')
+@patch('app.core.settings.settings.get_connection')
 def test_delete_banned_word_success(mock_connect, mock_bw):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
@@ -188,6 +198,10 @@ def test_delete_banned_word_success(mock_connect, mock_bw):
     s = Settings()
     result = s.delete_banned_word(1)
     assert result is True
+    # Delete and version bump commit together
+    assert mock_cursor.execute.call_count == 2
+    assert 'settings_version' in mock_cursor.execute.call_args[0][1]
+    mock_conn.commit.assert_called_once()
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
@@ -199,7 +213,7 @@ def test_delete_banned_word_not_found(mock_bw):
     assert result is False
 
 @patch('app.core.settings.settings.BannedWord')
-@patch('app.core.settings.settings.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
+@patch('app.core.settings.settings.get_connection', side_effect=mysql.connector.Error('DB error'))
 def test_delete_banned_word_db_error(mock_connect, mock_bw):
     mock_bw.get_by_id.return_value = MagicMock(id=1, word='bad')
     s = Settings()
@@ -207,7 +221,7 @@ def test_delete_banned_word_db_error(mock_connect, mock_bw):
     assert result is False
 
 # --- get_child_instructions ---
-@patch('app.core.settings.settings.mysql.connector.connect')
+@patch('app.core.settings.settings.get_connection')
 def test_get_child_instructions_found(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
@@ -220,7 +234,7 @@ def test_get_child_instructions_found(mock_connect):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.settings.settings.mysql.connector.connect')
+@patch('app.core.settings.settings.get_connection')
 def test_get_child_instructions_empty(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
@@ -233,14 +247,14 @@ def test_get_child_instructions_empty(mock_connect):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.settings.settings.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
+@patch('app.core.settings.settings.get_connection', side_effect=mysql.connector.Error('DB error'))
 def test_get_child_instructions_db_error(mock_connect):
     s = Settings()
     with pytest.raises(mysql.connector.Error):
         s.get_child_instructions(1)
 
 # --- set_child_instructions ---
-@patch('app.core.settings.settings.mysql.connector.connect')
+@patch('app.core.settings.settings.get_connection')
 def test_set_child_instructions_success(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
@@ -253,14 +267,14 @@ def test_set_child_instructions_success(mock_connect):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.settings.settings.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
+@patch('app.core.settings.settings.get_connection', side_effect=mysql.connector.Error('DB error'))
 def test_set_child_instructions_db_error(mock_connect):
     s = Settings()
     with pytest.raises(mysql.connector.Error):
         s.set_child_instructions(1, 'foo')
 
 # --- get_child_persona_ids ---
-@patch('app.core.settings.settings.mysql.connector.connect')
+@patch('app.core.settings.settings.get_connection')
 def test_get_child_persona_ids_success(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
@@ -273,14 +287,14 @@ def test_get_child_persona_ids_success(mock_connect):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.settings.settings.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
+@patch('app.core.settings.settings.get_connection', side_effect=mysql.connector.Error('DB error'))
 def test_get_child_persona_ids_db_error(mock_connect):
     s = Settings()
     with pytest.raises(mysql.connector.Error):
         s.get_child_persona_ids(1)
 
 # --- set_child_personas ---
-@patch('app.core.settings.settings.mysql.connector.connect')
+@patch('app.core.settings.settings.get_connection')
 def test_set_child_personas_success(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
@@ -293,14 +307,14 @@ def test_set_child_personas_success(mock_connect):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.settings.settings.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
+@patch('app.core.settings.settings.get_connection', side_effect=mysql.connector.Error('DB error'))
 def test_set_child_personas_db_error(mock_connect):
     s = Settings()
     with pytest.raises(mysql.connector.Error):
         s.set_child_personas(1, [1, 2])
 
 # --- create_blank_instructions ---
-@patch('app.core.settings.settings.mysql.connector.connect')
+@patch('app.core.settings.settings.get_connection')
 def test_create_blank_instructions_success(mock_connect):
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
@@ -313,8 +327,105 @@ def test_create_blank_instructions_success(mock_connect):
     mock_cursor.close.assert_called_once()
     mock_conn.close.assert_called_once()
 
-@patch('app.core.settings.settings.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
+@patch('app.core.settings.settings.get_connection', side_effect=mysql.connector.Error('DB error'))
 def test_create_blank_instructions_db_error(mock_connect):
     s = Settings()
     with pytest.raises(mysql.connector.Error):
-        s.create_blank_instructions(1) 
\ No newline at end of file
+        s.create_blank_instructions(1) 
+# --- version stamps ---
+@patch('app.core.settings.settings.get_connection')
+def test_get_version_missing_is_zero(mock_connect):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connect.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchone.return_value = None
+    assert Settings().get_version('settings_version') == 0
+
+@patch('app.core.settings.settings.get_connection')
+def test_get_version_found(mock_connect):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connect.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchone.return_value = ('7',)
+    assert Settings().get_version('settings_version') == 7
+
+@patch('app.core.settings.settings.get_connection')
+def test_bump_version(mock_connect):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connect.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    Settings().bump_version('settings_version')
+    sql, params = mock_cursor.execute.call_args[0]
+    assert 'ON DUPLICATE KEY UPDATE' in sql
+    assert params == ('settings_version',)
+    mock_conn.commit.assert_called_once()
+    mock_conn.close.assert_called_once()
+
+# --- per-worker settings cache ---
+from flask import Flask
+from app.core.settings.cache import settings_cache
+
+
+@pytest.fixture
+def settings_app():
+    settings_cache.clear()
+    yield Flask(__name__)
+    settings_cache.clear()
+
+def test_cached_reads_check_version_once_per_request(settings_app):
+    s = Settings()
+    with patch.object(Settings, 'get_version', return_value=4) as mock_version, \
+            patch.object(Settings, '_load_child_instructions', return_value='be nice') as mock_load:
+        with settings_app.test_request_context():
+            assert s.get_child_instructions(1) == 'be nice'
+            assert s.get_child_instructions(1) == 'be nice'
+        with settings_app.test_request_context():
+            assert s.get_child_instructions(1) == 'be nice'
+    assert mock_version.call_count == 2
+    mock_load.assert_called_once_with(1)
+
+def test_cached_reads_reload_after_version_bump(settings_app):
+    s = Settings()
+    with patch.object(Settings, 'get_version', side_effect=[4, 5]), \
+            patch.object(Settings, '_load_global_system_instructions', side_effect=['old', 'new']):
+        with settings_app.test_request_context():
+            assert s.get_global_system_instructions() == 'old'
+        with settings_app.test_request_context():
+            assert s.get_global_system_instructions() == 'new'
+
+@patch('app.core.settings.settings.get_connection')
+def test_mutation_bypasses_cache_for_rest_of_request(mock_connect, settings_app):
+    s = Settings()
+    with patch.object(Settings, 'get_version', return_value=4), \
+            patch.object(Settings, '_load_child_instructions', side_effect=['old', 'new']) as mock_load:
+        with settings_app.test_request_context():
+            assert s.get_child_instructions(1) == 'old'
+            s.set_child_instructions(1, 'new')
+            assert s.get_child_instructions(1) == 'new'
+    sql, params = mock_connect.return_value.cursor.return_value.execute.call_args[0]
+    assert params == ('settings_version',)
+    assert mock_load.call_count == 2
+
+@patch('app.core.settings.settings.Persona')
+def test_get_persona_by_id(mock_persona, settings_app):
+    mock_persona.get_all.return_value = [Persona(id=1, name='A', system_prompt='x'),
+                                         Persona(id=2, name='B', system_prompt='y')]
+    s = Settings()
+    with patch.object(Settings, 'get_version', return_value=1):
+        with settings_app.test_request_context():
+            assert s.get_persona(2)['system_prompt'] == 'y'
+            assert s.get_persona(3) is None
+            assert s.get_personas(None)[0]['id'] == 1
+    mock_persona.get_all.assert_called_once()
+
+@patch.object(Settings, 'bump_version')
+@patch.object(Persona, 'save')
+@patch.object(Persona, 'get_by_id')
+def test_edit_persona_unchanged_writes_nothing(mock_get, mock_save, mock_bump):
+    mock_get.return_value = Persona._from_row((1, 'A', 'x', None))
+    assert Settings().edit_persona(1, 'A', 'x') is True
+    mock_save.assert_not_called()
+    mock_bump.assert_not_called()
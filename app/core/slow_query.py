@@ -0,0 +1,207 @@
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
+from app.config.settings import SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_LOG, SLOW_QUERY_EXPLAIN_RATE
+
+# Records go to their own logger (and file, see init_slow_query_log) as one JSON object per line
+slow_query_logger = logging.getLogger("kidgpt.slow_query")
+
+# The same statement shape is EXPLAINed at most once per this many seconds
+EXPLAIN_COOLDOWN = 300
+# EXPLAINs waiting for a connection; slow statements beyond this are logged without one
+MAX_PENDING_EXPLAINS = 4
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|%\(\w+\)s")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_EXPLAINABLE = ("SELECT", "UPDATE", "DELETE")
+# Frames in these modules are the DB plumbing, not the code that issued the statement
+_PLUMBING = ("app.core.query_stats", "app.core.slow_query", "app.core.config")
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Collapse a statement to its shape: literals and placeholders become ?,
+    IN lists become (?+) and whitespace is squeezed, so every run of the
+    same query groups together.
+    """
+    sql = _STRING.sub("?", str(sql))
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(?+)", sql)
+    return " ".join(sql.split())
+
+
+def _shape(value) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def param_shapes(params):
+    """Types (and lengths of strings) of the bound parameters; never the values, which may be chat text."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: _shape(value) for key, value in params.items()}
+    return [_shape(value) for value in params]
+
+
+def _qualname(frame) -> str:
+    code = frame.f_code
+    # co_qualname is 3.11+; before that, qualify methods by their cls/self argument
+    qualname = getattr(code, "co_qualname", None)
+    if qualname is not None:
+        return qualname
+    if code.co_argcount:
+        first = frame.f_locals.get(code.co_varnames[0])
+        if code.co_varnames[0] == "cls" and isinstance(first, type):
+            return f"{first.__name__}.{code.co_name}"
+        if code.co_varnames[0] == "self" and first is not None:
+            return f"{type(first).__name__}.{code.co_name}"
+    return code.co_name
+
+
+def calling_method() -> Optional[str]:
+    """The innermost app function outside the DB plumbing, e.g. app.core.model.message:Message.save."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("app.") and not module.startswith(_PLUMBING):
+            return f"{module}:{_qualname(frame)}"
+        frame = frame.f_back
+    return None
+
+
+class SlowQueryLog:
+    """
+    Writes statements slower than threshold_ms to the slow query log with
+    their normalized SQL, parameter shapes and calling method. A sample
+    (explain_rate) of SELECT/UPDATE/DELETE statements also gets an EXPLAIN,
+    run on a background thread with its own pooled connection so the
+    request that was already slow does not wait on it.
+    """
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_THRESHOLD_MS,
+                 explain_rate: float = SLOW_QUERY_EXPLAIN_RATE):
+        self.threshold = threshold_ms / 1000
+        self.explain_rate = explain_rate
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._executor = None
+        self._pending = 0
+        self._explained = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def observe(self, sql, params, seconds: float, many: bool = False):
+        """Called for every statement; cheap unless it was slow."""
+        if not self.enabled or seconds < self.threshold or getattr(self._local, "explaining", False):
+            return
+        try:
+            entry = {
+                "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+                "duration_ms": round(seconds * 1000, 1),
+                "sql": normalize_sql(sql),
+                "params": ({"rows": len(params), "row": param_shapes(params[0]) if params else None}
+                           if many and params is not None else param_shapes(params)),
+                "caller": calling_method(),
+            }
+            if not many and self._should_explain(entry["sql"]):
+                self._submit_explain(entry, sql, params)
+            else:
+                self._write(entry)
+        except Exception as e:
+            logging.error(f"Error recording slow query: {e}")
+
+    def _should_explain(self, normalized: str) -> bool:
+        if self.explain_rate <= 0 or not normalized.upper().startswith(_EXPLAINABLE):
+            return False
+        if random.random() >= self.explain_rate:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset_state()
+            last = self._explained.get(normalized)
+            if last is not None and now - last < EXPLAIN_COOLDOWN:
+                return False
+            if self._pending >= MAX_PENDING_EXPLAINS:
+                return False
+            if len(self._explained) >= 1000:
+                self._explained = {k: v for k, v in self._explained.items() if now - v < EXPLAIN_COOLDOWN}
+            self._explained[normalized] = now
+            self._pending += 1
+        return True
+
+    def _submit_explain(self, entry: dict, sql, params):
+        with self._lock:
+            # Threads do not survive fork, so each worker process starts its own
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+            executor = self._executor
+        executor.submit(self._explain_and_write, entry, sql, params)
+
+    def _explain_and_write(self, entry: dict, sql, params):
+        try:
+            entry["explain"] = self._explain(sql, params)
+        except Exception as e:
+            entry["explain_error"] = str(e)
+        finally:
+            with self._lock:
+                self._pending -= 1
+        self._write(entry)
+
+    def _explain(self, sql, params) -> list:
+        # Imported here: config imports this module (through query_stats)
+        from app.core.config import get_pool
+        connection = get_pool().get_connection()
+        cursor = None
+        self._local.explaining = True
+        try:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute(f"EXPLAIN {sql}", params)
+            return cursor.fetchall()
+        finally:
+            self._local.explaining = False
+            if cursor is not None:
+                cursor.close()
+            connection.close()
+
+    def _write(self, entry: dict):
+        slow_query_logger.warning(json.dumps(entry, default=str))
+
+
+slow_query_log = SlowQueryLog()
+
+
+def init_slow_query_log(app):
+    """Send slow query records to their own file instead of the main log."""
+    path = app.config.get("SLOW_QUERY_LOG", SLOW_QUERY_LOG)
+    if not slow_query_log.enabled or not path or slow_query_logger.handlers:
+        return
+    try:
+        handler = logging.FileHandler(path, encoding="utf-8")
+    except OSError as e:
+        logging.warning(f"Slow query log {path} unavailable, logging to the main log instead: {e}")
+        return
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    slow_query_logger.addHandler(handler)
+    slow_query_logger.propagate = False
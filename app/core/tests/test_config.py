@@ -37,4 +37,403 @@ def test_get_db_config_all_missing(monkeypatch):
     monkeypatch.delenv("MYSQL_PASSWORD", raising=False)
     monkeypatch.delenv("MYSQL_DATABASE", raising=False)
     cfg = get_db_config()
-    assert all(v is None for v in cfg.values()) 
\ No newline at end of file
+    assert all(v is None for v in cfg.values()) 
+
+# --- ConnectionPool ---
+import os
+from unittest.mock import patch, MagicMock
+import mysql.connector
+from app.core.config import ConnectionPool, PoolTimeoutError, get_pool_config
+
+
+def make_raw():
+    raw = MagicMock()
+    raw.in_transaction = False
+    return raw
+
+def test_get_pool_config_defaults(monkeypatch):
+    for name in ("MYSQL_POOL_SIZE", "MYSQL_POOL_TIMEOUT", "MYSQL_POOL_RECYCLE", "MYSQL_POOL_PING_AFTER"):
+        monkeypatch.delenv(name, raising=False)
+    cfg = get_pool_config()
+    assert cfg == {"size": 8, "timeout": 30.0, "recycle": 3600.0, "ping_after": 30.0}
+
+@patch('app.core.config.mysql.connector.connect')
+def test_pool_reuses_released_connection(mock_connect):
+    raw = make_raw()
+    mock_connect.return_value = raw
+    pool = ConnectionPool(size=2)
+    conn = pool.get_connection()
+    conn.close()
+    conn = pool.get_connection()
+    conn.close()
+    assert mock_connect.call_count == 1
+    raw.close.assert_not_called()
+    stats = pool.stats()
+    assert stats["checkouts"] == 2
+    assert stats["connects"] == 1
+    assert stats["idle"] == 1
+
+@patch('app.core.config.mysql.connector.connect')
+def test_pool_delegates_to_raw_connection(mock_connect):
+    raw = make_raw()
+    mock_connect.return_value = raw
+    pool = ConnectionPool(size=1)
+    conn = pool.get_connection()
+    conn.cursor(dictionary=True)
+    conn.commit()
+    raw.cursor.assert_called_once_with(dictionary=True)
+    raw.commit.assert_called_once()
+    conn.close()
+    # Closing twice must not release the slot twice
+    conn.close()
+    assert pool.stats()["idle"] == 1
+
+@patch('app.core.config.mysql.connector.connect')
+def test_pool_rolls_back_open_transaction_on_release(mock_connect):
+    raw = make_raw()
+    raw.in_transaction = True
+    mock_connect.return_value = raw
+    pool = ConnectionPool(size=1)
+    pool.get_connection().close()
+    raw.rollback.assert_called_once()
+
+@patch('app.core.config.mysql.connector.connect')
+def test_pool_recycles_old_connections(mock_connect):
+    old, new = make_raw(), make_raw()
+    mock_connect.side_effect = [old, new]
+    pool = ConnectionPool(size=1, recycle=0)
+    pool.get_connection().close()
+    conn = pool.get_connection()
+    assert conn._raw is new
+    old.close.assert_called_once()
+    assert pool.stats()["recycled"] == 1
+
+@patch('app.core.config.mysql.connector.connect')
+def test_pool_replaces_connection_that_fails_ping(mock_connect):
+    stale, fresh = make_raw(), make_raw()
+    stale.ping.side_effect = mysql.connector.Error('gone away')
+    mock_connect.side_effect = [stale, fresh]
+    pool = ConnectionPool(size=1, ping_after=0)
+    pool.get_connection().close()
+    conn = pool.get_connection()
+    assert conn._raw is fresh
+
+@patch('app.core.config.mysql.connector.connect')
+def test_pool_times_out_when_exhausted(mock_connect):
+    mock_connect.return_value = make_raw()
+    pool = ConnectionPool(size=1, timeout=0.01)
+    pool.get_connection()
+    with pytest.raises(PoolTimeoutError):
+        pool.get_connection()
+
+@patch('app.core.config.mysql.connector.connect', side_effect=mysql.connector.Error('DB error'))
+def test_pool_releases_slot_when_connect_fails(mock_connect):
+    pool = ConnectionPool(size=1, timeout=0.01)
+    with pytest.raises(mysql.connector.Error):
+        pool.get_connection()
+    with pytest.raises(mysql.connector.Error):
+        pool.get_connection()
+    assert mock_connect.call_count == 2
+
+@patch('app.core.config.mysql.connector.connect')
+def test_pool_resets_after_fork(mock_connect, monkeypatch):
+    parent_raw, child_raw = make_raw(), make_raw()
+    mock_connect.side_effect = [parent_raw, child_raw]
+    pool = ConnectionPool(size=1)
+    pool.get_connection().close()
+    monkeypatch.setattr(os, 'getpid', lambda: -1)
+    conn = pool.get_connection()
+    assert conn._raw is child_raw
+    # Inherited sockets belong to the parent and must not be closed by the child
+    parent_raw.close.assert_not_called()
+
+
+# --- UnitOfWork ---
+from flask import Flask, jsonify, stream_with_context
+from app.core.config import (UnitOfWork, init_unit_of_work, get_connection, call_after_commit,
+                             begin_unit_of_work, commit_unit_of_work, current_unit_of_work)
+
+
+def make_pool():
+    pool = MagicMock()
+    pooled = MagicMock()
+    pool.get_connection.return_value = pooled
+    return pool, pooled
+
+def test_unit_of_work_shares_one_connection_and_commits_once():
+    pool, pooled = make_pool()
+    uow = UnitOfWork(pool)
+    first = uow.get_connection()
+    first.commit()
+    first.close()
+    second = uow.get_connection()
+    second.commit()
+    second.close()
+    pool.get_connection.assert_called_once()
+    pooled.commit.assert_not_called()
+    pooled.close.assert_not_called()
+    assert uow.finish() is True
+    pooled.commit.assert_called_once()
+    pooled.close.assert_called_once()
+
+def test_unit_of_work_rollback_poisons_unit():
+    pool, pooled = make_pool()
+    uow = UnitOfWork(pool)
+    conn = uow.get_connection()
+    conn.commit()
+    conn.rollback()
+    assert uow.finish() is False
+    pooled.commit.assert_not_called()
+    assert pooled.rollback.call_count == 2
+
+def test_unit_of_work_rolled_back_on_request_is_not_a_failure():
+    pool, pooled = make_pool()
+    uow = UnitOfWork(pool)
+    uow.get_connection().rollback()
+    assert uow.finish(commit=False) is True
+
+def test_unit_of_work_commit_failure_rolls_back():
+    pool, pooled = make_pool()
+    pooled.commit.side_effect = mysql.connector.Error('deadlock')
+    uow = UnitOfWork(pool)
+    uow.get_connection().commit()
+    assert uow.finish() is False
+    pooled.rollback.assert_called_once()
+    pooled.close.assert_called_once()
+
+def test_unit_of_work_without_queries_skips_checkout():
+    pool, _ = make_pool()
+    assert UnitOfWork(pool).finish() is True
+    pool.get_connection.assert_not_called()
+
+def test_unit_of_work_runs_after_commit_callbacks_after_commit():
+    pool, pooled = make_pool()
+    uow = UnitOfWork(pool)
+    uow.get_connection().commit()
+    calls = []
+    uow.after_commit(lambda: calls.append(pooled.commit.called))
+    assert uow.finish() is True
+    assert calls == [True]
+
+def test_unit_of_work_drops_after_commit_callbacks_on_rollback():
+    pool, pooled = make_pool()
+    uow = UnitOfWork(pool)
+    uow.get_connection().rollback()
+    callback = MagicMock()
+    uow.after_commit(callback)
+    uow.finish()
+    callback.assert_not_called()
+
+def test_unit_of_work_drops_after_commit_callbacks_on_commit_failure():
+    pool, pooled = make_pool()
+    pooled.commit.side_effect = mysql.connector.Error('deadlock')
+    uow = UnitOfWork(pool)
+    uow.get_connection().commit()
+    callback = MagicMock()
+    uow.after_commit(callback)
+    assert uow.finish() is False
+    callback.assert_not_called()
+
+def test_call_after_commit_runs_immediately_outside_request():
+    callback = MagicMock()
+    call_after_commit(callback)
+    callback.assert_called_once()
+
+@pytest.fixture
+def uow_app():
+    app = Flask(__name__)
+    init_unit_of_work(app)
+    return app
+
+@patch('app.core.config.get_pool')
+def test_request_commits_unit_of_work(mock_get_pool, uow_app):
+    pool, pooled = make_pool()
+    mock_get_pool.return_value = pool
+
+    @uow_app.route('/write')
+    def write():
+        for _ in range(3):
+            conn = get_connection()
+            conn.commit()
+            conn.close()
+        return jsonify({'ok': True})
+
+    resp = uow_app.test_client().get('/write')
+    assert resp.status_code == 200
+    pool.get_connection.assert_called_once()
+    pooled.commit.assert_called_once()
+    pooled.close.assert_called_once()
+
+@patch('app.core.config.get_pool')
+def test_request_error_rolls_back_unit_of_work(mock_get_pool, uow_app):
+    pool, pooled = make_pool()
+    mock_get_pool.return_value = pool
+
+    @uow_app.route('/boom')
+    def boom():
+        conn = get_connection()
+        conn.commit()
+        raise RuntimeError('boom')
+
+    resp = uow_app.test_client().get('/boom')
+    assert resp.status_code == 500
+    pooled.commit.assert_not_called()
+    pooled.rollback.assert_called_once()
+    pooled.close.assert_called_once()
+
+@patch('app.core.config.get_pool')
+def test_request_commit_failure_returns_500(mock_get_pool, uow_app):
+    pool, pooled = make_pool()
+    pooled.commit.side_effect = mysql.connector.Error('lost connection')
+    mock_get_pool.return_value = pool
+
+    @uow_app.route('/write')
+    def write():
+        get_connection().commit()
+        return jsonify({'ok': True})
+
+    resp = uow_app.test_client().get('/write')
+    assert resp.status_code == 500
+
+@patch('app.core.config.get_pool')
+def test_request_defers_after_commit_callbacks(mock_get_pool, uow_app):
+    pool, pooled = make_pool()
+    mock_get_pool.return_value = pool
+    callback = MagicMock()
+
+    @uow_app.route('/write')
+    def write():
+        get_connection().commit()
+        call_after_commit(callback)
+        callback.assert_not_called()
+        return jsonify({'ok': True})
+
+    resp = uow_app.test_client().get('/write')
+    assert resp.status_code == 200
+    callback.assert_called_once()
+
+# --- Read replica ---
+from app.core.config import get_replica_pool
+
+
+def test_get_db_config_replica_unset(monkeypatch):
+    monkeypatch.delenv("MYSQL_REPLICA_HOST", raising=False)
+    assert get_db_config(replica=True) is None
+
+def test_get_db_config_replica_falls_back_to_primary(monkeypatch):
+    monkeypatch.setenv("MYSQL_HOST", "primary")
+    monkeypatch.setenv("MYSQL_PORT", "3306")
+    monkeypatch.setenv("MYSQL_USER", "user")
+    monkeypatch.setenv("MYSQL_PASSWORD", "pass")
+    monkeypatch.setenv("MYSQL_DATABASE", "db")
+    monkeypatch.setenv("MYSQL_REPLICA_HOST", "replica")
+    monkeypatch.setenv("MYSQL_REPLICA_USER", "reader")
+    monkeypatch.delenv("MYSQL_REPLICA_PORT", raising=False)
+    monkeypatch.delenv("MYSQL_REPLICA_PASSWORD", raising=False)
+    assert get_db_config(replica=True) == {
+        "host": "replica",
+        "port": "3306",
+        "user": "reader",
+        "password": "pass",
+        "database": "db"
+    }
+
+@patch('app.core.config.mysql.connector.connect')
+def test_replica_pool_connects_to_replica(mock_connect, monkeypatch):
+    monkeypatch.setenv("MYSQL_REPLICA_HOST", "replica")
+    mock_connect.return_value = make_raw()
+    ConnectionPool(size=1, replica=True).get_connection().close()
+    assert mock_connect.call_args.kwargs["host"] == "replica"
+
+def test_get_replica_pool_none_without_replica(monkeypatch):
+    monkeypatch.delenv("MYSQL_REPLICA_HOST", raising=False)
+    assert get_replica_pool() is None
+
+@patch('app.core.config.get_replica_pool', return_value=None)
+@patch('app.core.config.get_pool')
+def test_read_only_uses_primary_without_replica(mock_get_pool, mock_get_replica_pool):
+    pool, pooled = make_pool()
+    mock_get_pool.return_value = pool
+    assert get_connection(read_only=True) is pooled
+
+@patch('app.core.config.get_replica_pool')
+@patch('app.core.config.get_pool')
+def test_read_only_outside_request_uses_replica(mock_get_pool, mock_get_replica_pool):
+    replica, replica_conn = make_pool()
+    mock_get_replica_pool.return_value = replica
+    assert get_connection(read_only=True) is replica_conn
+    mock_get_pool.return_value.get_connection.assert_not_called()
+
+@patch('app.core.config.get_replica_pool')
+@patch('app.core.config.get_pool')
+def test_request_reads_from_replica_until_it_writes(mock_get_pool, mock_get_replica_pool, uow_app):
+    pool, pooled = make_pool()
+    replica, replica_conn = make_pool()
+    mock_get_pool.return_value = pool
+    mock_get_replica_pool.return_value = replica
+
+    @uow_app.route('/turn')
+    def turn():
+        for _ in range(2):
+            conn = get_connection(read_only=True)
+            conn.cursor().execute("SELECT 1")
+            conn.close()
+        conn = get_connection()
+        conn.commit()
+        conn.close()
+        get_connection(read_only=True).cursor().execute("SELECT 2")
+        return jsonify({'ok': True})
+
+    resp = uow_app.test_client().get('/turn')
+    assert resp.status_code == 200
+    # Both early reads share one replica connection, returned at the end of the request
+    replica.get_connection.assert_called_once()
+    assert replica_conn.cursor.return_value.execute.call_count == 2
+    replica_conn.close.assert_called_once()
+    # The read after the write sees the primary
+    pooled.cursor.return_value.execute.assert_called_once_with("SELECT 2")
+
+@patch('app.core.config.get_replica_pool')
+@patch('app.core.config.get_pool')
+def test_reads_stay_on_primary_after_unit_of_work_finishes(mock_get_pool, mock_get_replica_pool, uow_app):
+    pool, pooled = make_pool()
+    replica, replica_conn = make_pool()
+    mock_get_pool.return_value = pool
+    mock_get_replica_pool.return_value = replica
+    seen = []
+
+    @uow_app.route('/stream')
+    def stream():
+        get_connection().commit()
+
+        def generate():
+            # Runs after the unit of work has committed, like /chat/stream
+            seen.append(get_connection(read_only=True))
+            yield "done"
+        return uow_app.response_class(stream_with_context(generate()))
+
+    resp = uow_app.test_client().get('/stream')
+    assert resp.get_data(as_text=True) == "done"
+    replica.get_connection.assert_not_called()
+    assert seen == [pool.get_connection.return_value]
+
+@patch('app.core.config.get_pool')
+def test_commit_unit_of_work_ends_unit_before_slow_step(mock_get_pool, uow_app):
+    pool, pooled = make_pool()
+    mock_get_pool.return_value = pool
+    seen = {}
+
+    @uow_app.route('/turn')
+    def turn():
+        get_connection().commit()
+        assert commit_unit_of_work() is True
+        seen['committed'] = pooled.commit.call_count
+        seen['unit'] = current_unit_of_work()
+        begin_unit_of_work()
+        get_connection().commit()
+        return jsonify({'ok': True})
+
+    resp = uow_app.test_client().get('/turn')
+    assert resp.status_code == 200
+    assert seen == {'committed': 1, 'unit': None}
+    assert pooled.commit.call_count == 2
@@ -0,0 +1,82 @@
+import json
+import pytest
+from unittest.mock import patch, MagicMock
+from mysql.connector import Error
+from app.core import idempotency
+
+
+@pytest.fixture
+def pool_conn():
+    with patch('app.core.idempotency.get_pool') as mock_get_pool:
+        conn = MagicMock()
+        cursor = MagicMock()
+        conn.cursor.return_value = cursor
+        mock_get_pool.return_value.get_connection.return_value = conn
+        yield conn, cursor
+
+def test_request_fingerprint_covers_path_and_body():
+    assert idempotency.request_fingerprint("/chat", b"{}") == idempotency.request_fingerprint("/chat", b"{}")
+    assert idempotency.request_fingerprint("/chat", b"{}") != idempotency.request_fingerprint("/chat/stream", b"{}")
+    assert idempotency.request_fingerprint("/chat", b"{}") != idempotency.request_fingerprint("/chat", b"{ }")
+
+def test_claim_new_key(pool_conn):
+    conn, cursor = pool_conn
+    cursor.rowcount = 1
+    assert idempotency.claim(1, "k", "fp") == (idempotency.CLAIMED, None)
+    sql = [c[0][0] for c in cursor.execute.call_args_list]
+    assert "DELETE FROM idempotency_keys" in sql[0]
+    assert "INSERT IGNORE INTO idempotency_keys" in sql[1]
+    conn.commit.assert_called_once()
+    conn.close.assert_called_once()
+
+def test_claim_finished_key_returns_stored_body(pool_conn):
+    conn, cursor = pool_conn
+    cursor.rowcount = 0
+    cursor.fetchone.return_value = ("fp", "done", json.dumps({"response": "hi", "conversation_id": 3}))
+    assert idempotency.claim(1, "k", "fp") == (idempotency.DONE, {"response": "hi", "conversation_id": 3})
+
+def test_claim_key_used_for_other_request(pool_conn):
+    conn, cursor = pool_conn
+    cursor.rowcount = 0
+    cursor.fetchone.return_value = ("other", "done", "{}")
+    assert idempotency.claim(1, "k", "fp") == (idempotency.MISMATCH, None)
+
+def test_claim_running_key_returns_at_once(pool_conn):
+    conn, cursor = pool_conn
+    cursor.rowcount = 0
+    cursor.fetchone.return_value = ("fp", "pending", None)
+    assert idempotency.claim(1, "k", "fp") == (idempotency.IN_PROGRESS, None)
+    # One look at the key, no polling
+    cursor.fetchone.assert_called_once()
+
+def test_claim_database_error_is_unavailable(pool_conn):
+    conn, cursor = pool_conn
+    cursor.execute.side_effect = Error("boom")
+    assert idempotency.claim(1, "k", "fp") == (idempotency.UNAVAILABLE, None)
+    conn.rollback.assert_called_once()
+
+@patch('app.core.idempotency.purge_expired_keys')
+def test_claim_purges_expired_keys_periodically(mock_purge, pool_conn):
+    conn, cursor = pool_conn
+    cursor.rowcount = 1
+    for _ in range(idempotency.CLEANUP_EVERY):
+        idempotency.claim(1, "k", "fp")
+    mock_purge.assert_called_once()
+
+@patch('app.core.idempotency.get_connection')
+def test_complete_stores_body(mock_get_conn):
+    conn = MagicMock()
+    mock_get_conn.return_value = conn
+    assert idempotency.complete(1, "k", {"response": "hi"}) is True
+    sql, params = conn.cursor.return_value.execute.call_args[0]
+    assert "SET status = 'done'" in sql
+    assert params == ('{"response": "hi"}', 1, "k")
+    conn.commit.assert_called_once()
+
+def test_release_deletes_only_pending_claim(pool_conn):
+    conn, cursor = pool_conn
+    assert idempotency.release(1, "k") is True
+    sql, params = cursor.execute.call_args[0]
+    assert "status = 'pending'" in sql
+    assert params == (1, "k")
+    conn.commit.assert_called_once()
@@ -0,0 +1,153 @@
+import os
+import pytest
+from flask import Flask
+from unittest.mock import patch, MagicMock
+import mysql.connector
+from app.core import migrate as migrate_module
+from app.core.migrate import discover_migrations, split_statements, migrate, MIGRATIONS_DIR
+
+
+def write(tmp_path, name, sql):
+    (tmp_path / name).write_text(sql)
+
+
+def make_connection(applied=(), locked=True, fail_on=None):
+    """Mock connection; statements containing fail_on raise the given errno."""
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value = mock_cursor
+    mock_conn.is_connected.return_value = True
+    mock_cursor.fetchone.return_value = (1 if locked else 0,)
+    mock_cursor.fetchall.return_value = [(v,) for v in applied]
+
+    def execute(sql, params=None):
+        if fail_on:
+            for text, errno in fail_on.items():
+                if text in sql:
+                    raise mysql.connector.Error(msg=f"failed: {text}", errno=errno)
+
+    mock_cursor.execute.side_effect = execute
+    return mock_conn, mock_cursor
+
+
+def executed(mock_cursor):
+    return [c[0][0] for c in mock_cursor.execute.call_args_list]
+
+
+def test_split_statements_ignores_comments_and_quoted_semicolons():
+    sql = """
+    -- a comment; with a semicolon
+    CREATE INDEX a ON t(x);
+    INSERT INTO t (s) VALUES ('x;y -- not a comment');
+    """
+    assert split_statements(sql) == [
+        "CREATE INDEX a ON t(x)",
+        "INSERT INTO t (s) VALUES ('x;y -- not a comment')",
+    ]
+
+
+def test_discover_migrations_sorted(tmp_path):
+    write(tmp_path, "0002_b.sql", "SELECT 2;")
+    write(tmp_path, "0001_a.sql", "SELECT 1;")
+    write(tmp_path, "notes.txt", "")
+    assert [(m.version, m.name) for m in discover_migrations(str(tmp_path))] == [(1, "a"), (2, "b")]
+
+
+def test_shipped_migrations_are_numbered_and_indexes_online():
+    migrations = discover_migrations(MIGRATIONS_DIR)
+    assert [m.version for m in migrations] == list(range(1, len(migrations) + 1))
+    for m in migrations:
+        for statement in split_statements(open(m.path).read()):
+            if statement.upper().startswith(("CREATE INDEX", "DROP INDEX")):
+                assert "ALGORITHM=INPLACE LOCK=NONE" in statement, m.path
+
+
+def test_setup_sql_records_every_shipped_migration():
+    setup = open(os.path.join(os.path.dirname(MIGRATIONS_DIR), "initdb", "setup.sql")).read()
+    for m in discover_migrations(MIGRATIONS_DIR):
+        assert f"({m.version}, '{m.name}')" in setup
+
+
+@patch("app.core.migrate.get_connection")
+def test_migrate_applies_pending_in_order(mock_connect, tmp_path):
+    write(tmp_path, "0001_a.sql", "CREATE INDEX a ON t(x);")
+    write(tmp_path, "0002_b.sql", "CREATE INDEX b ON t(y);\nDROP INDEX c ON t;")
+    write(tmp_path, "0003_c.sql", "CREATE INDEX d ON t(z);")
+    mock_conn, mock_cursor = make_connection(applied=[1])
+    mock_connect.return_value = mock_conn
+    result = migrate(str(tmp_path))
+    assert result["applied"] == [2, 3]
+    assert result["error"] is None
+    sql = executed(mock_cursor)
+    assert "CREATE INDEX a ON t(x)" not in sql
+    assert sql.index("CREATE INDEX b ON t(y)") < sql.index("DROP INDEX c ON t") < sql.index("CREATE INDEX d ON t(z)")
+    inserts = [c[0][1] for c in mock_cursor.execute.call_args_list if "INSERT INTO schema_migrations" in c[0][0]]
+    assert inserts == [(2, "b"), (3, "c")]
+    assert "RELEASE_LOCK" in sql[-1]
+
+
+@patch("app.core.migrate.get_connection")
+def test_migrate_skips_changes_already_in_place(mock_connect, tmp_path):
+    write(tmp_path, "0001_a.sql", "ALTER TABLE t ADD COLUMN x INT;\nCREATE INDEX a ON t(x);")
+    mock_conn, mock_cursor = make_connection(fail_on={"ADD COLUMN": 1060, "CREATE INDEX": 1061})
+    mock_connect.return_value = mock_conn
+    result = migrate(str(tmp_path))
+    assert result["applied"] == [1]
+    assert result["error"] is None
+
+
+@patch("app.core.migrate.get_connection")
+def test_migrate_stops_at_first_failure(mock_connect, tmp_path):
+    write(tmp_path, "0001_a.sql", "CREATE INDEX a ON t(x);")
+    write(tmp_path, "0002_b.sql", "CREATE INDEX b ON t(y);")
+    mock_conn, mock_cursor = make_connection(fail_on={"ON t(x)": 1146})
+    mock_connect.return_value = mock_conn
+    result = migrate(str(tmp_path))
+    assert result["applied"] == []
+    assert "ON t(x)" in result["error"]
+    assert "CREATE INDEX b ON t(y)" not in executed(mock_cursor)
+    assert not any("INSERT INTO schema_migrations" in s for s in executed(mock_cursor))
+
+
+@patch("app.core.migrate.get_connection")
+def test_migrate_skipped_when_lock_not_taken(mock_connect, tmp_path):
+    write(tmp_path, "0001_a.sql", "CREATE INDEX a ON t(x);")
+    mock_conn, mock_cursor = make_connection(locked=False)
+    mock_connect.return_value = mock_conn
+    result = migrate(str(tmp_path), lock_timeout=0)
+    assert result["skipped"] is True
+    assert len(executed(mock_cursor)) == 1
+
+
+def test_init_migrations_runs_on_startup_unless_disabled():
+    with patch.object(migrate_module, "migrate", return_value={"skipped": False, "error": None}) as mock_migrate:
+        app = Flask(__name__)
+        app.config["MIGRATE_ON_STARTUP"] = False
+        migrate_module.init_migrations(app)
+        mock_migrate.assert_not_called()
+        assert "migrate" in app.cli.commands
+
+        app = Flask(__name__)
+        app.config["MIGRATE_ON_STARTUP"] = True
+        migrate_module.init_migrations(app)
+        mock_migrate.assert_called_once()
+
+
+@pytest.mark.parametrize("result", [{"skipped": False, "error": "Table 'kidgpt.x' doesn't exist"},
+                                    {"skipped": True, "error": None}])
+def test_init_migrations_aborts_startup_when_migration_fails(result):
+    app = Flask(__name__)
+    app.config["MIGRATE_ON_STARTUP"] = True
+    with patch.object(migrate_module, "migrate", return_value=result):
+        with pytest.raises(migrate_module.MigrationError):
+            migrate_module.init_migrations(app)
+
+
+@patch("app.core.migrate.pending_migrations")
+def test_migrate_command_dry_run(mock_pending, tmp_path):
+    mock_pending.return_value = [migrate_module.Migration(5, "hot_query_indexes", "x")]
+    app = Flask(__name__)
+    app.config["MIGRATE_ON_STARTUP"] = False
+    migrate_module.init_migrations(app)
+    out = app.test_cli_runner().invoke(args=["migrate", "--dry-run"])
+    assert "0005_hot_query_indexes" in out.output
@@ -0,0 +1,98 @@
+import logging
+import pytest
+from unittest.mock import patch, MagicMock
+from flask import Flask, jsonify
+from app.core.config import ConnectionPool
+from app.core.query_stats import (
+    QueryStats, InstrumentedCursor, capture_queries, query_budget, init_query_stats, current_query_stats
+)
+
+
+def make_raw():
+    raw = MagicMock()
+    raw.in_transaction = False
+    return raw
+
+def test_instrumented_cursor_counts_and_delegates():
+    raw_cursor = MagicMock()
+    raw_cursor.fetchone.return_value = (1,)
+    cursor = InstrumentedCursor(raw_cursor)
+    with capture_queries() as stats:
+        cursor.execute("SELECT 1 FROM   users\n WHERE id = %s", (1,))
+        cursor.executemany("INSERT INTO t VALUES (%s)", [(1,), (2,)])
+        assert cursor.fetchone() == (1,)
+    raw_cursor.execute.assert_called_once_with("SELECT 1 FROM   users\n WHERE id = %s", (1,))
+    assert stats.statements == 2
+    assert stats.queries == ["SELECT 1 FROM users WHERE id = %s", "INSERT INTO t VALUES (%s)"]
+
+def test_failed_statement_is_still_counted():
+    raw_cursor = MagicMock()
+    raw_cursor.execute.side_effect = RuntimeError("boom")
+    with capture_queries() as stats:
+        with pytest.raises(RuntimeError):
+            InstrumentedCursor(raw_cursor).execute("SELECT 1")
+    assert stats.statements == 1
+
+def test_nothing_recorded_outside_capture_or_request():
+    assert current_query_stats() is None
+    InstrumentedCursor(MagicMock()).execute("SELECT 1")
+
+@patch('app.core.config.mysql.connector.connect')
+def test_pool_cursors_and_checkouts_are_counted(mock_connect):
+    mock_connect.return_value = make_raw()
+    pool = ConnectionPool(size=1)
+    with capture_queries() as stats:
+        conn = pool.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.execute("SELECT 2")
+        conn.close()
+    assert stats.statements == 2
+    assert stats.connections == 1
+
+def test_query_budget_passes_within_budget():
+    with query_budget(2, max_connections=0):
+        InstrumentedCursor(MagicMock()).execute("SELECT 1")
+
+def test_query_budget_lists_statements_when_exceeded():
+    cursor = InstrumentedCursor(MagicMock())
+    with pytest.raises(AssertionError) as excinfo:
+        with query_budget(1):
+            for i in range(3):
+                cursor.execute("SELECT * FROM messages WHERE id = %s", (i,))
+    message = str(excinfo.value)
+    assert "3 statements (budget 1)" in message
+    assert message.count("SELECT * FROM messages WHERE id = %s") == 3
+
+def test_server_timing_value():
+    stats = QueryStats()
+    stats.record_statement("SELECT 1", 0.0025)
+    stats.record_connection()
+    assert stats.server_timing(0.01) == 'db;dur=2.5;desc="1 queries, 1 connections", total;dur=10.0'
+
+@pytest.fixture
+def stats_app():
+    app = Flask(__name__)
+    init_query_stats(app)
+
+    @app.route('/work')
+    def work():
+        cursor = InstrumentedCursor(MagicMock())
+        cursor.execute("SELECT 1")
+        cursor.execute("SELECT 2")
+        return jsonify({'ok': True})
+    return app
+
+def test_request_reports_server_timing_header(stats_app):
+    resp = stats_app.test_client().get('/work')
+    assert resp.status_code == 200
+    assert 'desc="2 queries, 0 connections"' in resp.headers['Server-Timing']
+
+def test_request_writes_access_log(stats_app, caplog):
+    with caplog.at_level(logging.INFO):
+        stats_app.test_client().get('/work').close()
+    lines = [r.getMessage() for r in caplog.records if '"GET /work"' in r.getMessage()]
+    assert len(lines) == 1
+    assert " 200 " in lines[0]
+    assert "db=2q/" in lines[0]
+    assert "conns=0" in lines[0]
@@ -0,0 +1,119 @@
+import json
+import logging
+import pytest
+from unittest.mock import patch, MagicMock
+from app.core.query_stats import InstrumentedCursor
+from app.core.slow_query import SlowQueryLog, normalize_sql, param_shapes, slow_query_logger
+
+
+def test_normalize_sql_replaces_literals_and_placeholders():
+    sql = """
+        SELECT * FROM messages
+        WHERE conversation_id = %s AND sender = 'user' AND id > 42 AND id IN (%s, %s, %s)
+    """
+    assert normalize_sql(sql) == ("SELECT * FROM messages WHERE conversation_id = ? AND sender = ? "
+                                  "AND id > ? AND id IN (?+)")
+
+def test_normalize_sql_keeps_identifiers_with_digits():
+    assert normalize_sql("SELECT t1.id FROM idx_2") == "SELECT t1.id FROM idx_2"
+
+def test_param_shapes_hide_values():
+    assert param_shapes((5, "secret chat text", None, b"ab")) == ["int", "str[16]", "null", "bytes[2]"]
+    assert param_shapes({"id": 1}) == {"id": "int"}
+    assert param_shapes(None) is None
+
+def records(caplog):
+    return [json.loads(r.getMessage()) for r in caplog.records if r.name == slow_query_logger.name]
+
+def test_fast_statements_are_not_logged(caplog):
+    log = SlowQueryLog(threshold_ms=100, explain_rate=0)
+    with caplog.at_level(logging.WARNING, logger=slow_query_logger.name):
+        log.observe("SELECT 1", None, 0.05)
+    assert records(caplog) == []
+
+def test_zero_threshold_disables(caplog):
+    log = SlowQueryLog(threshold_ms=0, explain_rate=0)
+    with caplog.at_level(logging.WARNING, logger=slow_query_logger.name):
+        log.observe("SELECT 1", None, 10)
+    assert records(caplog) == []
+
+def test_slow_statement_is_logged_with_shape_and_caller(caplog):
+    log = SlowQueryLog(threshold_ms=100, explain_rate=0)
+    with caplog.at_level(logging.WARNING, logger=slow_query_logger.name):
+        log.observe("SELECT * FROM messages WHERE conversation_id = %s", (7,), 0.25)
+    [entry] = records(caplog)
+    assert entry["duration_ms"] == 250.0
+    assert entry["sql"] == "SELECT * FROM messages WHERE conversation_id = ?"
+    assert entry["params"] == ["int"]
+    assert "explain" not in entry
+
+def test_slow_executemany_logs_row_count(caplog):
+    log = SlowQueryLog(threshold_ms=100, explain_rate=1)
+    with caplog.at_level(logging.WARNING, logger=slow_query_logger.name):
+        log.observe("INSERT INTO t VALUES (%s)", [(1,), (2,)], 0.25, many=True)
+    [entry] = records(caplog)
+    assert entry["params"] == {"rows": 2, "row": ["int"]}
+
+@patch('app.core.config.get_pool')
+def test_sampled_slow_select_gets_explain(mock_get_pool, caplog):
+    connection = MagicMock()
+    mock_get_pool.return_value.get_connection.return_value = connection
+    connection.cursor.return_value.fetchall.return_value = [{"type": "ALL", "key": None, "rows": 5000}]
+    log = SlowQueryLog(threshold_ms=100, explain_rate=1)
+    with caplog.at_level(logging.WARNING, logger=slow_query_logger.name):
+        log.observe("SELECT * FROM messages WHERE conversation_id = %s", (7,), 0.25)
+        log._executor.shutdown(wait=True)
+    [entry] = records(caplog)
+    connection.cursor.return_value.execute.assert_called_once_with(
+        "EXPLAIN SELECT * FROM messages WHERE conversation_id = %s", (7,))
+    connection.close.assert_called_once()
+    assert entry["explain"] == [{"type": "ALL", "key": None, "rows": 5000}]
+
+@patch('app.core.config.get_pool')
+def test_same_statement_is_explained_once_per_cooldown(mock_get_pool, caplog):
+    mock_get_pool.return_value.get_connection.return_value.cursor.return_value.fetchall.return_value = []
+    log = SlowQueryLog(threshold_ms=100, explain_rate=1)
+    with caplog.at_level(logging.WARNING, logger=slow_query_logger.name):
+        log.observe("SELECT * FROM users WHERE id = %s", (1,), 0.25)
+        log.observe("SELECT * FROM users WHERE id = %s", (2,), 0.25)
+        log._executor.shutdown(wait=True)
+    entries = records(caplog)
+    assert len(entries) == 2
+    assert sum("explain" in entry for entry in entries) == 1
+
+@patch('app.core.model.message.get_connection')
+def test_caller_is_the_model_method(mock_get_conn, caplog):
+    mock_conn = MagicMock()
+    raw_cursor = MagicMock()
+    raw_cursor.fetchone.return_value = None
+    mock_conn.cursor.return_value = InstrumentedCursor(raw_cursor)
+    mock_get_conn.return_value = mock_conn
+    from app.core.model.message import Message
+    with patch('app.core.query_stats.slow_query_log', SlowQueryLog(threshold_ms=1e-9, explain_rate=0)):
+        with caplog.at_level(logging.WARNING, logger=slow_query_logger.name):
+            Message.get_by_id(1)
+    [entry] = records(caplog)
+    assert entry["caller"] == "app.core.model.message:Message.get_by_id"
+
+@patch('app.core.query_stats.slow_query_log')
+def test_instrumented_cursor_reports_to_slow_query_log(mock_log):
+    cursor = InstrumentedCursor(MagicMock())
+    cursor.execute("SELECT 1 FROM users WHERE id = %s", (3,))
+    mock_log.observe.assert_called_once()
+    args = mock_log.observe.call_args[0]
+    assert args[:2] == ("SELECT 1 FROM users WHERE id = %s", (3,))
+
+def test_caller_name_without_co_qualname():
+    # Python 3.10 code objects have no co_qualname
+    from app.core.slow_query import _qualname
+
+    class Frame:
+        def __init__(self, name, varnames, argcount, local_vars):
+            self.f_code = type("Code", (), {"co_name": name, "co_varnames": varnames, "co_argcount": argcount})()
+            self.f_locals = local_vars
+
+    class Message:
+        pass
+    assert _qualname(Frame("get_by_id", ("cls", "id"), 2, {"cls": Message})) == "Message.get_by_id"
+    assert _qualname(Frame("save", ("self",), 1, {"self": Message()})) == "Message.save"
+    assert _qualname(Frame("has_users", (), 0, {})) == "has_users"
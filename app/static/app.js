@@ -38,101 +38,187 @@ window.addEventListener('DOMContentLoaded', () => {
       return fetch(path, opts);
     }
   
-    async function loadConversations() {
-      // Show loading message
-      sidebar.innerHTML = '<h4>Conversations</h4><div class="text-muted">Loading conversations...</div>';
-      const resp = await apiFetch('/conversations');
+    // Random key for one chat turn (getRandomValues, unlike randomUUID, also works over plain http)
+    function newIdempotencyKey() {
+      const bytes = crypto.getRandomValues(new Uint8Array(16));
+      return Array.from(bytes, b => b.toString(16).padStart(2, '0')).join('');
+    }
+
+    // Keyset pagination state for the sidebar and the open conversation
+    let conversationsCursor = null;
+    let loadingConversations = false;
+    let messagesCursor = null;
+    let loadingMessages = false;
+
+    async function fetchJsonOrLogout(path) {
+      const resp = await apiFetch(path);
       const contentType = resp.headers.get('content-type');
       if (!resp.ok || !contentType || !contentType.includes('application/json')) {
         alert('Session expired or server error. Please log in again.');
         await apiFetch('/auth/logout', { method: 'POST' });
         window.location.href = '/login';
-        return;
+        return null;
       }
-      let data;
       try {
-        data = await resp.json();
+        return await resp.json();
       } catch (e) {
         alert('Session expired or server error. Please log in again.');
         await apiFetch('/auth/logout', { method: 'POST' });
         window.location.href = '/login';
-        return;
-      }
-      // Defensive: sort conversations by started_at descending (most recent first)
-      if (data.conversations) {
-        data.conversations.sort((a, b) => new Date(b.started_at) - new Date(a.started_at));
+        return null;
       }
-      // Replace loading message with conversation list
+    }
+
+    function renderConversationItem(conv) {
+      const li = document.createElement('li');
+      li.className = 'list-group-item conversation-summary d-flex justify-content-between align-items-center';
+      li.dataset.conversationId = conv.id;
+      const snippetSpan = document.createElement('span');
+      snippetSpan.className = 'conversation-snippet';
+      snippetSpan.textContent = conv.snippet || '(No message)';
+      snippetSpan.style.cursor = 'pointer';
+      snippetSpan.onclick = () => loadConversation(conv.id);
+      li.appendChild(snippetSpan);
+      // Delete button
+      const delBtn = document.createElement('button');
+      delBtn.className = 'btn btn-danger btn-sm ms-2';
+      delBtn.textContent = '×';
+      delBtn.title = 'Delete conversation';
+      delBtn.onclick = (e) => {
+        console.log('Delete button clicked for conversation', conv.id);
+        e.stopPropagation();
+        pendingDeleteId = conv.id;
+        if (!deleteModal) {
+          // fallback: try to initialize if not already
+          const modalElem = document.getElementById('deleteConfirmModal');
+          if (modalElem && window.bootstrap) {
+            deleteModal = new window.bootstrap.Modal(modalElem);
+          }
+        }
+        if (deleteModal) deleteModal.show();
+      };
+      li.appendChild(delBtn);
+      if (conv.id === currentConversationId) li.classList.add('active');
+      return li;
+    }
+
+    async function loadConversations() {
+      // Show loading message
+      sidebar.innerHTML = '<h4>Conversations</h4><div class="text-muted">Loading conversations...</div>';
+      conversationsCursor = null;
+      const data = await fetchJsonOrLogout('/conversations');
+      if (!data) return;
+      // Replace loading message with conversation list (server returns most recently active first)
       sidebar.innerHTML = '<h4>Conversations</h4>';
       const list = document.createElement('ul');
       list.className = 'list-group';
-      (data.conversations || []).forEach(conv => {
-        const li = document.createElement('li');
-        li.className = 'list-group-item conversation-summary d-flex justify-content-between align-items-center';
-        const snippetSpan = document.createElement('span');
-        snippetSpan.textContent = conv.snippet || '(No message)';
-        snippetSpan.style.cursor = 'pointer';
-        snippetSpan.onclick = () => loadConversation(conv.id);
-        li.appendChild(snippetSpan);
-        // Delete button
-        const delBtn = document.createElement('button');
-        delBtn.className = 'btn btn-danger btn-sm ms-2';
-        delBtn.textContent = '×';
-        delBtn.title = 'Delete conversation';
-        delBtn.onclick = (e) => {
-          console.log('Delete button clicked for conversation', conv.id);
-          e.stopPropagation();
-          pendingDeleteId = conv.id;
-          if (!deleteModal) {
-            // fallback: try to initialize if not already
-            const modalElem = document.getElementById('deleteConfirmModal');
-            if (modalElem && window.bootstrap) {
-              deleteModal = new window.bootstrap.Modal(modalElem);
-            }
-          }
-          if (deleteModal) deleteModal.show();
-        };
-        li.appendChild(delBtn);
-        if (conv.id === currentConversationId) li.classList.add('active');
-        list.appendChild(li);
-      });
+      list.id = 'conversation-list';
+      (data.conversations || []).forEach(conv => list.appendChild(renderConversationItem(conv)));
       sidebar.appendChild(list);
+      conversationsCursor = data.has_more ? data.next_before : null;
       const newBtn = document.createElement('button');
       newBtn.className = 'btn btn-primary btn-sm mt-3';
       newBtn.textContent = 'New Conversation';
       newBtn.onclick = startNewConversation;
       sidebar.appendChild(newBtn);
+      schedulePendingSummaries(data.conversations || []);
     }
-  
+
+    // Summaries are generated in the background; poll a few times to swap
+    // the placeholders for the real titles without redrawing the sidebar
+    const SUMMARY_POLL_DELAYS = [2000, 5000, 10000];
+    let summaryPollTimer = null;
+
+    function schedulePendingSummaries(conversations, attempt = 0) {
+      clearTimeout(summaryPollTimer);
+      const pending = conversations.filter(conv => conv.summary_pending).map(conv => conv.id);
+      if (!pending.length || attempt >= SUMMARY_POLL_DELAYS.length) return;
+      summaryPollTimer = setTimeout(async () => {
+        const resp = await apiFetch('/conversations');
+        if (!resp.ok) return;
+        const data = await resp.json();
+        const list = document.getElementById('conversation-list');
+        if (!list) return;
+        const refreshed = (data.conversations || []).filter(conv => pending.includes(conv.id));
+        refreshed.forEach(conv => {
+          const span = list.querySelector(`[data-conversation-id="${conv.id}"] .conversation-snippet`);
+          if (span) span.textContent = conv.snippet || '(No message)';
+        });
+        schedulePendingSummaries(refreshed, attempt + 1);
+      }, SUMMARY_POLL_DELAYS[attempt]);
+    }
+
+    async function loadMoreConversations() {
+      if (loadingConversations || conversationsCursor === null) return;
+      const list = document.getElementById('conversation-list');
+      if (!list) return;
+      loadingConversations = true;
+      try {
+        const data = await fetchJsonOrLogout(`/conversations?before=${encodeURIComponent(conversationsCursor)}`);
+        if (!data) return;
+        (data.conversations || []).forEach(conv => {
+          // A conversation may have moved between pages if it saw new activity
+          if (!list.querySelector(`[data-conversation-id="${conv.id}"]`)) {
+            list.appendChild(renderConversationItem(conv));
+          }
+        });
+        conversationsCursor = data.has_more ? data.next_before : null;
+      } finally {
+        loadingConversations = false;
+      }
+    }
+
+    function renderMessage(m) {
+      const div = document.createElement('div');
+      div.className = 'message ' + (m.sender === 'user' ? 'user' : 'bot');
+      div.textContent = m.content;
+      return div;
+    }
+
     async function loadConversation(conversationId) {
       currentConversationId = conversationId;
+      messagesCursor = null;
       win.innerHTML = '';
-      const resp = await apiFetch(`/conversations/${conversationId}`);
-      const contentType = resp.headers.get('content-type');
-      if (!resp.ok || !contentType || !contentType.includes('application/json')) {
-        alert('Session expired or server error. Please log in again.');
-        await apiFetch('/auth/logout', { method: 'POST' });
-        window.location.href = '/login';
-        return;
-      }
-      let data;
-      try {
-        data = await resp.json();
-      } catch (e) {
-        alert('Session expired or server error. Please log in again.');
-        window.location.href = '/login';
-        return;
-      }
-      (data.messages || []).forEach(m => {
-        const div = document.createElement('div');
-        div.className = 'message ' + (m.sender === 'user' ? 'user' : 'bot');
-        div.textContent = m.content;
-        win.appendChild(div);
-      });
+      const data = await fetchJsonOrLogout(`/conversations/${conversationId}`);
+      if (!data) return;
+      (data.messages || []).forEach(m => win.appendChild(renderMessage(m)));
+      messagesCursor = data.has_more ? data.next_before_id : null;
       highlightActiveConversation();
       win.scrollTop = win.scrollHeight;
     }
-  
+
+    async function loadOlderMessages() {
+      if (loadingMessages || messagesCursor === null || !currentConversationId) return;
+      const conversationId = currentConversationId;
+      loadingMessages = true;
+      try {
+        const data = await fetchJsonOrLogout(`/conversations/${conversationId}?before_id=${messagesCursor}`);
+        // Ignore the page if the user switched conversations meanwhile
+        if (!data || conversationId !== currentConversationId) return;
+        // Prepend older messages without moving what the user is looking at
+        const previousHeight = win.scrollHeight;
+        const fragment = document.createDocumentFragment();
+        (data.messages || []).forEach(m => fragment.appendChild(renderMessage(m)));
+        win.insertBefore(fragment, win.firstChild);
+        win.scrollTop += win.scrollHeight - previousHeight;
+        messagesCursor = data.has_more ? data.next_before_id : null;
+      } finally {
+        loadingMessages = false;
+      }
+    }
+
+    // Load further pages when scrolling near the end of either list
+    sidebar.addEventListener('scroll', () => {
+      if (sidebar.scrollTop + sidebar.clientHeight >= sidebar.scrollHeight - 100) {
+        loadMoreConversations();
+      }
+    });
+    win.addEventListener('scroll', () => {
+      if (win.scrollTop < 100) {
+        loadOlderMessages();
+      }
+    });
+
     function highlightActiveConversation() {
       document.querySelectorAll('.conversation-summary').forEach(li => {
         li.classList.remove('active');
@@ -159,10 +245,45 @@ window.addEventListener('DOMContentLoaded', () => {
         return;
       }
       currentConversationId = data.id;
+      messagesCursor = null;
       win.innerHTML = '';
       await loadConversations();
     }
   
+    // Read Server-Sent Events from /chat/stream and render the reply as it arrives
+    async function readChatStream(resp, target) {
+      const reader = resp.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let text = '';
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const raw = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          if (!raw.startsWith('data: ')) continue;
+          const event = JSON.parse(raw.slice(6));
+          if (event.type === 'start' && event.conversation_id) {
+            currentConversationId = event.conversation_id;
+          } else if (event.type === 'delta') {
+            text += event.content;
+          } else if (event.type === 'replace') {
+            text = event.content;
+          } else {
+            continue;
+          }
+          target.innerHTML = marked.parse(text || '...');
+          win.scrollTop = win.scrollHeight;
+        }
+      }
+      if (!text) {
+        throw new Error('Failed to send message. Please try again.');
+      }
+    }
+
     // Configure marked for safe rendering
     marked.setOptions({
       breaks: true,  // Convert \n to <br>
@@ -213,26 +334,49 @@ window.addEventListener('DOMContentLoaded', () => {
           await startNewConversation();
         }
 
-        // Fetch bot response and save both messages
-        const resp = await apiFetch('/chat', {
+        // Stream the bot response; the server saves both messages. The
+        // Idempotency-Key lets a retry after a dropped connection get the
+        // same reply back instead of sending the message twice.
+        const chatRequest = {
           method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
+          headers: {
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream',
+            'Idempotency-Key': newIdempotencyKey()
+          },
           body: JSON.stringify({ message, persona_id, conversation_id: currentConversationId })
-        });
+        };
+        let resp;
+        try {
+          resp = await apiFetch('/chat/stream', chatRequest);
+        } catch (e) {
+          // Network error before any response: retry once with the same key
+          resp = await apiFetch('/chat/stream', chatRequest);
+          // 409 means the first attempt is still being answered; ask again when told to
+          for (let tries = 0; resp.status === 409 && tries < 60; tries++) {
+            const wait = Number(resp.headers.get('Retry-After')) || 1;
+            await new Promise(resolve => setTimeout(resolve, wait * 1000));
+            resp = await apiFetch('/chat/stream', chatRequest);
+          }
+        }
         const contentType = resp.headers.get('content-type');
-        if (!resp.ok || !contentType || !contentType.includes('application/json')) {
+        if (!resp.ok || !contentType) {
           throw new Error('Session expired or server error.');
         }
-        let j;
-        try {
-          j = await resp.json();
-        } catch (e) {
+        if (contentType.includes('text/event-stream') && resp.body) {
+          await readChatStream(resp, pendingBot);
+        } else if (contentType.includes('application/json')) {
+          let j;
+          try {
+            j = await resp.json();
+          } catch (e) {
+            throw new Error('Session expired or server error.');
+          }
+          if (j.conversation_id) currentConversationId = j.conversation_id;
+          pendingBot.innerHTML = marked.parse(j.response || j.error);
+        } else {
           throw new Error('Session expired or server error.');
         }
-        if (j.conversation_id) currentConversationId = j.conversation_id;
-
-        // Update UI with real bot response
-        pendingBot.innerHTML = marked.parse(j.response || j.error);
 
         // Update only the current conversation's summary in the sidebar
         try {
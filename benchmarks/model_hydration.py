@@ -0,0 +1,96 @@
+"""
+Memory and time to hydrate model objects from cursor rows.
+
+Compares the old path (dictionary cursor rows, cls(**row), one __dict__ per
+object) with the current one (tuple rows, cls._from_row(row), __slots__)
+for Message and Conversation. No database is needed; rows are synthesized.
+
+    python -m benchmarks.model_hydration [rows] [repeats]
+"""
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from app.core.model.conversation import Conversation
+from app.core.model.message import Message
+
+
+class LegacyMessage:
+    def __init__(self, id, conversation_id, sender, content, created_at=None):
+        self.id = id
+        self.conversation_id = conversation_id
+        self.sender = sender
+        self.content = content
+        self.created_at = created_at
+
+
+class LegacyConversation:
+    def __init__(self, id, user_id, started_at=None, summary=None, message_count=0, last_message_at=None,
+                 first_user_message_id=None, context_summary=None, context_summary_through_id=None):
+        self.id = id
+        self.user_id = user_id
+        self.started_at = started_at
+        self.summary = summary
+        self.message_count = message_count
+        self.last_message_at = last_message_at
+        self.first_user_message_id = first_user_message_id
+        self.context_summary = context_summary
+        self.context_summary_through_id = context_summary_through_id
+
+
+def message_rows(n):
+    now = datetime(2024, 1, 1)
+    return [(i, 1, 'user' if i % 2 else 'assistant', f"message {i} " * 8, now) for i in range(n)]
+
+
+def conversation_rows(n):
+    now = datetime(2024, 1, 1)
+    return [(i, 1, now, f"Conversation {i}", 12, now, i * 10, None, None) for i in range(n)]
+
+
+def legacy_build(legacy, fields):
+    # A dictionary cursor turns each tuple into a fresh dict (as
+    # MySQLCursorDict does), then the model was built with cls(**row)
+    return lambda rows: [legacy(**dict(zip(fields, row))) for row in rows]
+
+
+def measure(build, make_rows, repeats):
+    """
+    Return (best seconds, bytes retained per row) for build(make_rows()).
+    Rows are made outside the timer; build() includes any per-row
+    conversion the cursor would do.
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        rows = make_rows()
+        started = time.perf_counter()
+        objects = build(rows)
+        best = min(best, time.perf_counter() - started)
+        del objects, rows
+    rows = make_rows()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = build(rows)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return best, retained / len(objects)
+
+
+def main(n=10_000, repeats=5):
+    cases = [
+        ("Message", Message, LegacyMessage, message_rows),
+        ("Conversation", Conversation, LegacyConversation, conversation_rows),
+    ]
+    print(f"{n} rows, best of {repeats}")
+    print(f"{'model':<14}{'path':<8}{'ms':>10}{'bytes/row':>12}")
+    for name, model, legacy, make in cases:
+        fields = model._fields
+        before = measure(legacy_build(legacy, fields), lambda: make(n), repeats)
+        after = measure(lambda rows: [model._from_row(row) for row in rows], lambda: make(n), repeats)
+        for label, (seconds, per_row) in (("before", before), ("after", after)):
+            print(f"{name:<14}{label:<8}{seconds * 1000:>10.2f}{per_row:>12.0f}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
@@ -26,6 +26,13 @@ CREATE TABLE conversations (
     user_id INT NOT NULL,
     started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     summary TEXT,
+    -- Activity counters maintained by Message.save()
+    message_count INT NOT NULL DEFAULT 0,
+    last_message_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+    first_user_message_id INT NULL,
+    -- Rolling summary of turns that no longer fit in the context window
+    context_summary TEXT NULL,
+    context_summary_through_id INT NULL,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
@@ -71,6 +78,19 @@ CREATE TABLE sessions (
     UNIQUE(session_token)
 );
 
+-- Idempotency-Key claims for /chat, kept until expires_at
+CREATE TABLE idempotency_keys (
+    user_id INT NOT NULL,
+    idempotency_key VARCHAR(255) NOT NULL,
+    request_hash CHAR(64) NOT NULL,
+    status ENUM('pending', 'done') NOT NULL DEFAULT 'pending',
+    response_body MEDIUMTEXT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (user_id, idempotency_key),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
 -- Create global_settings table
 CREATE TABLE global_settings (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -100,9 +120,25 @@ CREATE TABLE banned_words (
 
 -- Create indexes for better query performance
 CREATE INDEX idx_users_username ON users(username);
-CREATE INDEX idx_user_roles_user_id ON user_roles(user_id);
-CREATE INDEX idx_conversations_user_id ON conversations(user_id);
-CREATE INDEX idx_messages_conversation_id ON messages(conversation_id);
+CREATE INDEX idx_user_roles_user_created ON user_roles(user_id, created_at);
+CREATE INDEX idx_conversations_user_last_message ON conversations(user_id, last_message_at);
+CREATE INDEX idx_messages_conversation_id_id ON messages(conversation_id, id);
 CREATE INDEX idx_messages_created_at ON messages(created_at);
 CREATE INDEX idx_user_model_settings_user_id ON user_model_settings(user_id);
 CREATE INDEX idx_api_keys_model_vendor ON api_keys(model_vendor);
+CREATE INDEX idx_sessions_expires_at ON sessions(expires_at);
+CREATE INDEX idx_idempotency_keys_expires_at ON idempotency_keys(expires_at);
+
+-- Migrations already folded into this file; the runner applies only newer ones
+CREATE TABLE schema_migrations (
+    version INT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO schema_migrations (version, name) VALUES
+    (1, 'conversation_activity'),
+    (2, 'message_keyset_index'),
+    (3, 'conversation_context_summary'),
+    (4, 'sessions_expires_at_index'),
+    (5, 'hot_query_indexes'),
+    (6, 'idempotency_keys');
@@ -0,0 +1,24 @@
+-- Denormalized activity counters on conversations, maintained by Message.save()
+ALTER TABLE conversations
+    ADD COLUMN message_count INT NOT NULL DEFAULT 0,
+    ADD COLUMN last_message_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+    ADD COLUMN first_user_message_id INT NULL;
+
+-- Backfill existing rows from messages
+UPDATE conversations c
+LEFT JOIN (
+    SELECT conversation_id, COUNT(*) AS message_count, MAX(created_at) AS last_message_at
+    FROM messages
+    GROUP BY conversation_id
+) m ON m.conversation_id = c.id
+LEFT JOIN (
+    SELECT conversation_id, MIN(id) AS first_user_message_id
+    FROM messages
+    WHERE sender = 'user'
+    GROUP BY conversation_id
+) f ON f.conversation_id = c.id
+SET c.message_count = COALESCE(m.message_count, 0),
+    c.last_message_at = COALESCE(m.last_message_at, c.started_at),
+    c.first_user_message_id = f.first_user_message_id;
+
+CREATE INDEX idx_conversations_user_last_message ON conversations(user_id, last_message_at) ALGORITHM=INPLACE LOCK=NONE;
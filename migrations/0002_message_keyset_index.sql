@@ -0,0 +1,6 @@
+-- Keyset pagination of a conversation's messages seeks on (conversation_id, id).
+-- The new index also backs the conversation_id foreign key, so the old
+-- single-column index can go once it exists. Built online so chat keeps
+-- writing to messages while it runs.
+CREATE INDEX idx_messages_conversation_id_id ON messages(conversation_id, id) ALGORITHM=INPLACE LOCK=NONE;
+DROP INDEX idx_messages_conversation_id ON messages ALGORITHM=INPLACE LOCK=NONE;
@@ -0,0 +1,5 @@
+-- Rolling summary of the turns that no longer fit in the model's context window.
+-- context_summary_through_id is the newest message folded into the summary.
+ALTER TABLE conversations
+    ADD COLUMN context_summary TEXT NULL,
+    ADD COLUMN context_summary_through_id INT NULL;
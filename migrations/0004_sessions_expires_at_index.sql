@@ -0,0 +1,2 @@
+-- Lets the expired-session purge find old rows without scanning the table
+CREATE INDEX idx_sessions_expires_at ON sessions(expires_at) ALGORITHM=INPLACE LOCK=NONE;
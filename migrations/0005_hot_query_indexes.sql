@@ -0,0 +1,13 @@
+-- Composite indexes so the hot list queries read rows in order instead of
+-- filesorting. Each single-column index dropped here is a prefix of a
+-- composite one, which still backs the user_id foreign key. Built online so signed-in
+-- users are not blocked while they run.
+
+-- Conversation.get_recent_by_user_id: WHERE user_id = ? ORDER BY last_message_at DESC, id DESC
+-- already reads idx_conversations_user_last_message from 0001 (InnoDB appends
+-- the id to it), which also backs the foreign key, so the single-column index goes
+DROP INDEX idx_conversations_user_id ON conversations ALGORITHM=INPLACE LOCK=NONE;
+
+-- User lookups: JOIN user_roles ON user_id ... ORDER BY created_at DESC LIMIT 1
+CREATE INDEX idx_user_roles_user_created ON user_roles(user_id, created_at) ALGORITHM=INPLACE LOCK=NONE;
+DROP INDEX idx_user_roles_user_id ON user_roles ALGORITHM=INPLACE LOCK=NONE;
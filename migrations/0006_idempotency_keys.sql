@@ -0,0 +1,14 @@
+-- Idempotency-Key claims for /chat and /chat/stream, so a retried turn
+-- replays the stored reply instead of saving the message and calling the model again
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    user_id INT NOT NULL,
+    idempotency_key VARCHAR(255) NOT NULL,
+    request_hash CHAR(64) NOT NULL,
+    status ENUM('pending', 'done') NOT NULL DEFAULT 'pending',
+    response_body MEDIUMTEXT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (user_id, idempotency_key),
+    INDEX idx_idempotency_keys_expires_at (expires_at),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
@@ -6,4 +6,11 @@ done
 
 echo "MySQL is ready, continuing..."
 
+# Migrate once here, before gunicorn forks: a long online index build would
+# outlast the worker timeout if every worker ran it (or waited on it) itself
+if [ "${MIGRATE_ON_STARTUP:-true}" = "true" ]; then
+  MIGRATE_ON_STARTUP=false flask --app run migrate || exit 1
+fi
+export MIGRATE_ON_STARTUP=false
+
 exec "$@"